@@ -0,0 +1 @@
+"""Chaîne de build des classements Geozone (Data/Category -> Rankings.csv)"""
@@ -0,0 +1,822 @@
+"""Point d'entrée en ligne de commande : python -m rankings build"""
+
+import argparse
+import csv
+import time
+from pathlib import Path
+
+from .build import build
+from .categories import BUNDLE_DIR, CATEGORY_DIR, HISTORY_DIR, RANKINGS_PATH
+
+BINARY_PATH = RANKINGS_PATH.with_suffix(".bin")
+SEEDS_PATH = RANKINGS_PATH.with_name("seeds.bin")
+ANALYTICS_PATH = RANKINGS_PATH.with_name("analytics.checkpoint.json")
+VERIFY_PATH = RANKINGS_PATH.with_name("verify.checkpoint.json")
+VALUES_PATH = RANKINGS_PATH.with_suffix(".values.bin")
+SIMILARITY_PATH = RANKINGS_PATH.with_name("similarity.bin")
+COMBOS_PATH = RANKINGS_PATH.with_name("combos.bin")
+
+
+def _profiler(args, command):
+    from .profiling import Profiler
+
+    if args.profile is not None:
+        args.profile.parent.mkdir(parents=True, exist_ok=True)
+    return Profiler(command, enabled=args.profile is not None, hot_stage=args.profile_stage,
+                    memory=args.profile_memory,
+                    dump_prefix=str(args.profile.with_suffix("")) if args.profile else None)
+
+
+def _write_profile(args, profiler):
+    if args.profile is not None:
+        profiler.write(args.profile)
+        print(f"Profil: {args.profile}")
+
+
+def _cmd_build(args):
+    profiler = _profiler(args, "build")
+    start = time.perf_counter()
+    report = build(output_path=args.output, category_dir=args.categories,
+                   force=args.force, jobs=args.jobs, executor=args.executor,
+                   history_dir=None if args.no_history else args.history,
+                   bundle_dir=None if args.no_bundles else args.bundles, profiler=profiler,
+                   engine=args.engine, merge=args.merge,
+                   memory_limit=args.memory_mb << 20 if args.memory_mb else None)
+    elapsed = (time.perf_counter() - start) * 1000
+    _write_profile(args, profiler)
+
+    for column in report.missing:
+        print(f"File not found: {column}")
+    for column, message in report.failed.items():
+        print(f"✗ {column} : lecture impossible ({message})")
+    for column, names in report.unresolved.items():
+        listed = ", ".join(f"{name.strip()!r} x{count}" if count > 1 else repr(name.strip())
+                           for name, count in names.items())
+        print(f"⚠ {column} : pays non résolus ignorés : {listed}")
+    for column, countries in report.duplicates.items():
+        listed = ", ".join(f"{country} ({' / '.join(repr(name.strip()) for name in names)})"
+                           for country, names in countries.items())
+        print(f"⚠ {column} : pays en double, première ligne gardée : {listed}")
+    if report.up_to_date:
+        print(f"✓ Rankings.csv à jour ({elapsed:.1f} ms)")
+        return 0
+    for column in report.computed:
+        print(f"Processing {column}...")
+    print(f"\n{'⚠' if report.failed else '✓'} Fichier Rankings.csv créé ({elapsed:.1f} ms)")
+    print(f"Catégories recalculées: {len(report.computed)}, depuis le cache: {len(report.cached)}")
+    print(f"Nombre de pays: {report.countries}")
+    print(f"Chemin: {report.output_path}")
+    print(f"Matrice binaire: {report.binary_path}")
+    if report.partitions is not None:
+        print(f"Fusion hors mémoire: {report.partitions} partitions (ni valeurs, ni historique, ni bundle)")
+    else:
+        print(f"Valeurs: {report.values_path} (moteur {report.engine})")
+    if report.bundle_path is not None:
+        print(f"Bundle client: {report.bundle_path}")
+    if report.version is not None:
+        print(f"Version d'historique: {report.version}")
+    return 1 if report.failed else 0
+
+
+def _cmd_history(args):
+    from .binary import write_binary
+    from .history import RankingHistory
+
+    history = RankingHistory(args.history)
+    if not len(history):
+        print(f"Historique vide : {args.history}")
+        return 1
+
+    if args.show is not None:
+        for country, category, old, new in history.changes(args.show):
+            print(f"{country} / {category} : {'NULL' if old is None else old} -> {'NULL' if new is None else new}")
+        return 0
+
+    if args.as_of is not None:
+        start = time.perf_counter()
+        try:
+            if args.as_of.lstrip("-").isdigit():
+                matrix = history.matrix_at(version=int(args.as_of))
+            else:
+                matrix = history.matrix_at(timestamp=args.as_of)
+        except (LookupError, ValueError) as error:
+            print(f"✗ {error}")
+            return 1
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.output.suffix == ".bin":
+            write_binary(matrix, args.output)
+        else:
+            matrix.to_csv(args.output)
+        print(f"✓ Matrice au {args.as_of} reconstruite en {elapsed:.1f} ms -> {args.output}")
+        return 0
+
+    for entry in history.versions:
+        note = f"  {entry['note']}" if "note" in entry else ""
+        print(f"{entry['version']:>4}  {entry['timestamp']}  {entry['fingerprint'][:12]}  "
+              f"{len(entry['countries'])} pays x {len(entry['categories'])} catégories, "
+              f"{entry['end'] - entry['start']} changements{note}")
+    return 0
+
+
+def _cmd_rerank(args):
+    from .binary import load_values, write_binary
+
+    values = load_values(args.values)
+    try:
+        mask = values.region_mask(*args.region) if args.region else None
+        if args.countries:
+            countries = values.country_mask(args.countries)
+            mask = countries if mask is None else mask & countries
+    except ValueError as error:
+        print(f"✗ {error}")
+        return 1
+    start = time.perf_counter()
+    matrix = values.rank_matrix(mask)
+    elapsed = (time.perf_counter() - start) * 1e6
+    if args.output.suffix == ".bin":
+        write_binary(matrix, args.output)
+    else:
+        matrix.to_csv(args.output)
+    print(f"✓ {len(matrix.countries)} pays reclassés en {elapsed:.0f} µs -> {args.output}")
+    return 0
+
+
+def _cmd_solve(args):
+    from .binary import load_matrix
+    from .games import games_to_arrays, read_games
+    from .solver import backfill
+
+    matrix = load_matrix(args.matrix)
+    if args.games.suffix == ".games":
+        from .codec import read_archive
+
+        codec, records = read_archive(args.games, fields=("id", "score", "flags", "categories", "countries"))
+        games = codec.to_game_arrays(records, matrix)
+    else:
+        games = games_to_arrays(read_games(args.games), matrix)
+    for game_id, reason in games.rejected:
+        print(f"⚠ Partie {game_id} ignorée : {reason}")
+
+    start = time.perf_counter()
+    optimal, regret = backfill(matrix, games, jobs=args.jobs)
+    elapsed = time.perf_counter() - start
+
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["id", "score", "optimal_score", "regret"])
+        writer.writerows(zip(games.ids, games.scores.tolist(), optimal.tolist(), regret.tolist()))
+
+    print(f"✓ {len(games)} parties résolues en {elapsed:.2f} s -> {args.output}")
+    if len(games):
+        print(f"Regret moyen: {regret.mean():.1f}, score optimal moyen: {optimal.mean():.1f}")
+    return 0
+
+
+def _cmd_simulate(args):
+    import json
+
+    from .simulate import simulate
+
+    start = time.perf_counter()
+    result = simulate(args.matrix, args.games, strategies=args.strategy, threshold=args.threshold,
+                      jobs=args.jobs, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    report = result.report(top=args.top, min_games=args.min_games)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+    print(f"✓ {result.games} parties simulées en {elapsed:.1f} s -> {args.output}")
+    for strategy, stats in report["strategies"].items():
+        print(f"{strategy:>8}: score moyen {stats['mean_score']:.1f}, "
+              f"victoires (score < {args.threshold}) {stats['win_rate']:.1%}")
+    return 0
+
+
+def _cmd_advise(args):
+    import numpy as np
+
+    from .advisor import Advisor
+    from .binary import load_matrix
+    from .games import category_lookup
+    from .solver import best_score
+
+    matrix = load_matrix(args.matrix)
+    try:
+        advisor = Advisor(matrix, args.categories, samples=args.samples, seed=args.seed)
+    except ValueError as error:
+        print(f"✗ {error}")
+        return 1
+    rng = np.random.default_rng(args.seed)
+    drawn = list(args.countries or [])
+    played = []
+    for round_number in range(1, len(args.categories) + 1):
+        if len(drawn) < round_number:
+            # Tirage du jeu : un pays pas encore joué
+            remaining = [name for name in matrix.countries if name not in played]
+            drawn.append(remaining[rng.integers(len(remaining))])
+        country = drawn[round_number - 1]
+        start = time.perf_counter()
+        try:
+            advice = advisor.advise(country)
+        except ValueError as error:
+            print(f"✗ {error}")
+            return 1
+        elapsed = time.perf_counter() - start
+        print(f"Manche {round_number}: {country} ({elapsed * 1000:.1f} ms)")
+        for i, (category, expected) in enumerate(advice.items()):
+            print(f"  {'✓' if i == 0 else ' '} {category:<32} {expected:8.1f}")
+        category = next(iter(advice))
+        rank = advisor.place(category, country)
+        played.append(country)
+        print(f"  -> {category} (rang {rank}), score {advisor.score}")
+
+    lookup = category_lookup(matrix)
+    optimal, _ = best_score(matrix, [matrix.categories[lookup[name]] for name in args.categories], played)
+    print(f"✓ Score final {advisor.score}, meilleur score a posteriori {optimal}")
+    return 0
+
+
+def _cmd_distribution(args):
+    from .binary import load_matrix
+    from .distribution import distribution
+
+    matrix = load_matrix(args.matrix)
+    rows = []
+    for strategy in args.strategy:
+        start = time.perf_counter()
+        try:
+            result = distribution(matrix, args.categories, strategy)
+        except ValueError as error:
+            print(f"✗ {error}")
+            return 1
+        elapsed = time.perf_counter() - start
+        print(f"{strategy:>11}: score moyen {result.mean:.1f} (écart type {result.std:.1f}), "
+              f"P(score < {args.threshold}) = {result.win_probability(args.threshold):.3e} "
+              f"en {elapsed * 1000:.1f} ms")
+        rows.append((strategy, result))
+    if args.output is not None:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["strategy", "score", "pmf", "cdf"])
+            for strategy, result in rows:
+                for score, (p, c) in enumerate(zip(result.pmf.tolist(), result.cdf().tolist())):
+                    if p > 0:
+                        writer.writerow([strategy, score, repr(p), repr(c)])
+        print(f"✓ Lois écrites dans {args.output}")
+    return 0
+
+
+def _cmd_games_pack(args):
+    from .binary import load_matrix
+    from .codec import GameCodec, write_archive
+    from .games import read_games
+    from .history import RankingHistory
+
+    history = RankingHistory(args.history)
+    # Identifiants globaux de l'historique (stables d'une version à l'autre), sinon ceux de la matrice
+    codec = GameCodec.for_build(history if len(history) else load_matrix(args.matrix))
+
+    def games():
+        for path in args.games:
+            yield from read_games(path)
+
+    start = time.perf_counter()
+    written, rejected = write_archive(args.output, games(), codec)
+    elapsed = time.perf_counter() - start
+    for game_id, reason in rejected[:20]:
+        print(f"⚠ Partie {game_id} non archivée : {reason}")
+    if len(rejected) > 20:
+        print(f"⚠ ... {len(rejected) - 20} autres")
+    size = args.output.stat().st_size
+    print(f"✓ {written} parties archivées en {elapsed:.2f} s -> {args.output} "
+          f"({size / 1e6:.1f} Mo, {size / max(written, 1):.0f} octets par partie)")
+    return 0
+
+
+def _cmd_games_unpack(args):
+    import json
+
+    from .codec import iter_archive
+
+    try:
+        codec, blocks = iter_archive(args.archive)
+    except ValueError as error:
+        print(f"✗ {error}")
+        return 1
+    count = 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        for block in blocks:
+            for game in codec.decode(block):
+                f.write(json.dumps(game, ensure_ascii=False) + "\n")
+                count += 1
+    print(f"✓ {count} parties -> {args.output}")
+    return 0
+
+
+def _cmd_upload(args):
+    from .binary import load_matrix
+    from .upload import rest_url_from_env, run_upload
+
+    env_url, env_key = rest_url_from_env()
+    url, key = args.url or env_url, args.key or env_key
+    if not url:
+        print("Variables d'environnement manquantes (PUBLIC_SUPABASE_URL) ou --url")
+        return 1
+
+    profiler = _profiler(args, "upload")
+    start = time.perf_counter()
+    with profiler.stage("load") as stage:
+        matrix = load_matrix(args.matrix)
+        stage.record(rows_out=len(matrix.countries))
+    report = run_upload(matrix, url, key, batch_size=args.batch_size, concurrency=args.concurrency,
+                        prune=args.prune, dry_run=args.dry_run, profiler=profiler)
+    elapsed = time.perf_counter() - start
+    _write_profile(args, profiler)
+    verb = "à envoyer" if args.dry_run else "envoyées"
+    print(f"✓ {report.existing} lignes en base, {report.unchanged} inchangées")
+    print(f"Lignes upsertées {verb}: {report.upserted}, supprimées: {report.deleted}")
+    print(f"{report.requests} requêtes ({report.retries} reprises) en {elapsed:.2f} s")
+    return 0
+
+
+def _add_profile_arguments(parser, stages):
+    parser.add_argument("--profile", type=Path, metavar="REPORT.json",
+                        help="Écrit un rapport JSON des mesures par étape")
+    parser.add_argument("--profile-stage", choices=stages,
+                        help="Étape passée sous cProfile (dump .prof à côté du rapport)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Pic mémoire par étape et allocations de l'étape profilée (tracemalloc)")
+
+
+def _cmd_seeds_generate(args):
+    from .seeds import generate, write_pool
+
+    start = time.perf_counter()
+    pool = generate(args.matrix, args.games, buckets=args.buckets, seed=args.seed, jobs=args.jobs)
+    write_pool(pool, args.output)
+    elapsed = time.perf_counter() - start
+    print(f"✓ {len(pool)} graines en {elapsed:.1f} s -> {args.output} (graine maîtresse {pool.master_seed})")
+    for difficulty in range(pool.buckets):
+        low, high = pool.score_range(difficulty)
+        print(f"Difficulté {difficulty}: meilleur score {low}..{high}, {len(pool.bucket(difficulty))} graines")
+    return 0
+
+
+def _cmd_seeds_pick(args):
+    import json
+
+    from .binary import load_matrix
+    from .seeds import load_pool
+
+    try:
+        pool = load_pool(args.pool)
+        seed = pool.daily(args.day, args.difficulty) if args.day else pool.random(args.difficulty)
+        game = pool.describe(seed, load_matrix(args.matrix))
+    except (LookupError, ValueError) as error:
+        print(f"✗ {error}")
+        return 1
+    print(json.dumps(game, ensure_ascii=False))
+    return 0
+
+
+def _cmd_combos_build(args):
+    from .binary import load_matrix
+    from .combos import build_index, write_index
+
+    start = time.perf_counter()
+    try:
+        index = build_index(load_matrix(args.matrix), samples=args.samples, buckets=args.buckets, seed=args.seed)
+    except ValueError as error:
+        print(f"✗ {error}")
+        return 1
+    write_index(index, args.output)
+    elapsed = time.perf_counter() - start
+    print(f"✓ {len(index)} combinaisons en {elapsed:.1f} s -> {args.output} (graine {index.seed})")
+    for difficulty in range(index.buckets):
+        low, high = index.score_range(difficulty)
+        redundancy = index.bucket(difficulty)["redundancy"]
+        print(f"Difficulté {difficulty}: meilleur score moyen {low:.1f}..{high:.1f}, "
+              f"redondance {redundancy.min():.2f}..{redundancy.max():.2f}")
+    return 0
+
+
+def _cmd_combos_pick(args):
+    import json
+
+    import numpy as np
+
+    from .binary import load_matrix
+    from .combos import REDUNDANCY_LEVELS, load_index
+
+    redundancy = args.redundancy
+    if redundancy is not None and redundancy not in REDUNDANCY_LEVELS:
+        try:
+            redundancy = float(redundancy)
+        except ValueError:
+            print(f"✗ Redondance {redundancy!r} : {', '.join(REDUNDANCY_LEVELS)} ou une valeur maximale")
+            return 1
+    try:
+        index = load_index(args.index)
+        combo = index.pick(args.difficulty, redundancy, np.random.default_rng(args.seed))
+        result = index.describe(combo, load_matrix(args.matrix))
+    except (LookupError, ValueError) as error:
+        print(f"✗ {error}")
+        return 1
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+def _cmd_similar_build(args):
+    from .binary import load_matrix
+    from .similarity import build_index, write_index
+
+    start = time.perf_counter()
+    index = build_index(load_matrix(args.matrix), metric=args.metric, k=args.k, min_common=args.min_common)
+    write_index(index, args.output)
+    elapsed = time.perf_counter() - start
+    isolated = int((index.neighbors[:, 0] == 0xFFFF).sum()) if index.k else len(index)
+    print(f"✓ {index.k} voisins ({index.metric}) pour {len(index)} pays en {elapsed * 1000:.1f} ms -> {args.output}")
+    if isolated:
+        print(f"⚠ {isolated} pays sans voisin comparable (moins de {args.min_common} catégories communes)")
+    return 0
+
+
+def _cmd_similar_query(args):
+    import json
+
+    import numpy as np
+
+    from .binary import load_matrix
+    from .similarity import load_index
+
+    index = load_index(args.index)
+    matrix = load_matrix(args.matrix)
+    unknown = [name for name in args.countries if name not in matrix.country_index]
+    if unknown:
+        print(f"✗ Pays inconnus : {unknown}")
+        return 1
+    rows = [matrix.country_index[name] for name in args.countries]
+    try:
+        if args.dissimilar:
+            country = index.dissimilar(rows, np.random.default_rng(args.seed), k=args.k)
+            result = {"seen": args.countries, "country": None if country is None else matrix.countries[country]}
+        else:
+            result = {name: index.describe(row, matrix, args.k) for name, row in zip(args.countries, rows)}
+    except ValueError as error:
+        print(f"✗ {error}")
+        return 1
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+def _cmd_serve(args):
+    from .binary import load_matrix
+    from .combos import load_index
+    from .seeds import load_pool
+    from .service import RankingService, serve
+
+    matrix = load_matrix(args.matrix)
+    pool = None
+    if args.seeds.exists():
+        try:
+            pool = load_pool(args.seeds)
+        except ValueError as error:
+            print(f"⚠ {error} : parties par difficulté désactivées")
+        else:
+            if pool.fingerprint != matrix.fingerprint():
+                print(f"⚠ {args.seeds} ne correspond pas à la matrice : parties par difficulté désactivées")
+                pool = None
+    combos = None
+    if args.combos.exists():
+        try:
+            combos = load_index(args.combos)
+        except ValueError as error:
+            print(f"⚠ {error} : /category-sets/new désactivé")
+        else:
+            if combos.fingerprint != matrix.fingerprint():
+                print(f"⚠ {args.combos} ne correspond pas à la matrice : /category-sets/new désactivé")
+                combos = None
+    service = RankingService(matrix, pool, solver_cache=args.solver_cache, combos=combos)
+    print(f"✓ {len(matrix.countries)} pays x {len(matrix.categories)} catégories, version {service.version}")
+    print(f"Écoute sur http://{args.host}:{args.port} (Ctrl-C pour arrêter)")
+    try:
+        serve(service, args.host, args.port)
+    except RuntimeError as error:
+        print(f"✗ {error}")
+        return 1
+    return 0
+
+
+def _cmd_analytics(args):
+    import json
+
+    from .analytics import refresh
+
+    start = time.perf_counter()
+    try:
+        analytics, added = refresh(args.games, None if args.no_checkpoint else args.checkpoint, top=args.top_games)
+    except ValueError as error:
+        print(f"✗ {error}")
+        return 1
+    elapsed = time.perf_counter() - start
+    report = analytics.report(top=args.top, min_games=args.min_games)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+    print(f"✓ {added} nouvelles parties en {elapsed:.2f} s ({analytics.games} au total) -> {args.output}")
+    if analytics.skipped:
+        print(f"⚠ {analytics.skipped} parties ignorées (score ou joueur manquant)")
+    for row in report["leaderboard"][:5]:
+        print(f"{row['user_id']}: meilleur {row['best_score']}, moyenne {row['average_score']:.1f} "
+              f"sur {row['total_games']} parties")
+    return 0
+
+
+def _cmd_verify(args):
+    from .binary import load_matrix
+    from .history import RankingHistory
+    from .verify import Verifier, verify_exports
+
+    matrix = load_matrix(args.matrix)
+    history = RankingHistory(args.history) if args.history is not None else None
+    if history is not None and not len(history):
+        print(f"⚠ Historique vide dans {args.history} : vérification contre la matrice courante")
+    verifier = Verifier(matrix, history=history, threshold=args.threshold)
+    start = time.perf_counter()
+    try:
+        state, checked = verify_exports(verifier, args.games, args.output,
+                                        None if args.no_checkpoint else args.checkpoint, args.batch_size)
+    except ValueError as error:
+        print(f"✗ {error}")
+        return 1
+    elapsed = time.perf_counter() - start
+    rate = f" ({checked / elapsed:,.0f} parties/s)" if elapsed > 0 and checked else ""
+    print(f"✓ {checked} parties vérifiées en {elapsed:.2f} s{rate} ({state.games} au total)")
+    if state.flagged:
+        details = ", ".join(f"{name} {count}" for name, count in state.counts.items() if count)
+        print(f"⚠ {state.flagged} parties en échec au total ({details}) -> {args.output}")
+    return 0
+
+
+def _cmd_bench(args):
+    import shutil
+    import tempfile
+
+    from .bench import RESULTS_PATH, SCALES, load_results, record, regressions, run
+
+    if args.categories or args.entities:
+        scales = {"custom": (args.categories or SCALES["real"][0], args.entities or SCALES["real"][1])}
+    else:
+        scales = {name: SCALES[name] for name in args.scale}
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="rankings-bench-"))
+    results_path = args.results or RESULTS_PATH
+    recorded = load_results(results_path)
+
+    status, results = 0, {}
+    try:
+        for scale, (categories, count) in scales.items():
+            print(f"== {scale} : {categories} catégories x {count} entités")
+            result = run(scale, categories, count, workdir, repeat=args.repeat, seed=args.seed, jobs=args.jobs)
+            results[scale] = result
+            for stage, elapsed in result["timings"].items():
+                before = recorded.get(scale, {}).get("timings", {}).get(stage)
+                delta = f"  ({(elapsed / before - 1):+.0%})" if before else ""
+                print(f"{stage:>18}: {elapsed * 1000:10.1f} ms{delta}")
+            for check, ok in result["checks"].items():
+                print(f"{'✓' if ok else '✗'} {check}")
+                if not ok:
+                    status = 1
+            for stage, before, elapsed in regressions(result, recorded.get(scale)):
+                print(f"⚠ Régression {stage} : {before * 1000:.1f} ms -> {elapsed * 1000:.1f} ms")
+                if args.check:
+                    status = 1
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.record:
+        record(results, results_path)
+        print(f"Résultats enregistrés: {results_path}")
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="rankings", description="Outils de build des classements Geozone")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Reconstruit Rankings.csv de façon incrémentale")
+    build_parser.add_argument("--output", type=Path, default=RANKINGS_PATH)
+    build_parser.add_argument("--categories", type=Path, default=CATEGORY_DIR)
+    build_parser.add_argument("--force", action="store_true", help="Ignore le cache et recalcule tout")
+    build_parser.add_argument("--jobs", type=int, default=None,
+                              help="Nombre de workers pour lire les fichiers (défaut : nombre de cœurs)")
+    build_parser.add_argument("--executor", choices=["auto", "inline", "thread", "process"], default="auto",
+                              help="Sur place, threads ou processus (centaines de fichiers) ; "
+                                   "auto : sur place pour un petit build, threads sinon")
+    build_parser.add_argument("--engine", choices=["auto", "compact", "numpy"], default="auto",
+                              help="Fusion sans NumPy (compact) ou avec ; auto : compact jusqu'à 4 Mo de sources")
+    build_parser.add_argument("--merge", choices=["memory", "chunked"], default="memory",
+                              help="chunked : fusion hors mémoire par partitions sur disque (très grandes sources)")
+    build_parser.add_argument("--memory-mb", type=int, default=None,
+                              help="Budget mémoire d'une partition de la fusion hors mémoire (défaut : 64)")
+    build_parser.add_argument("--history", type=Path, default=HISTORY_DIR, help="Dossier de l'historique versionné")
+    build_parser.add_argument("--no-history", action="store_true", help="N'ajoute pas de version à l'historique")
+    build_parser.add_argument("--bundles", type=Path, default=BUNDLE_DIR,
+                              help="Dossier des bundles statiques du client")
+    build_parser.add_argument("--no-bundles", action="store_true", help="Ne produit pas de bundle client")
+    _add_profile_arguments(build_parser, ["scan", "compute", "cache", "merge", "write", "history", "bundle"])
+    build_parser.set_defaults(func=_cmd_build)
+
+    history_parser = commands.add_parser("history", help="Versions de la matrice et reconstruction à une date")
+    history_parser.add_argument("--history", type=Path, default=HISTORY_DIR)
+    history_parser.add_argument("--show", type=int, metavar="VERSION", help="Cases modifiées par une version")
+    history_parser.add_argument("--as-of", metavar="VERSION|DATE",
+                                help="Reconstruit la matrice à une version ou une date ISO 8601")
+    history_parser.add_argument("--output", type=Path, default=Path("Rankings.as-of.csv"),
+                                help="Sortie de --as-of (.csv ou .bin)")
+    history_parser.set_defaults(func=_cmd_history)
+
+    rerank_parser = commands.add_parser("rerank", help="Reclasse les catégories sur une région ou des pays")
+    rerank_parser.add_argument("--region", nargs="+", help="Régions (union) : Africa, Americas, Asia, Europe, "
+                                                           "Oceania, Islands")
+    rerank_parser.add_argument("--countries", nargs="+", help="Pays retenus (intersection avec --region)")
+    rerank_parser.add_argument("--values", type=Path, default=VALUES_PATH)
+    rerank_parser.add_argument("--output", type=Path, default=Path("Rankings.region.csv"), help=".csv ou .bin")
+    rerank_parser.set_defaults(func=_cmd_rerank)
+
+    solve_parser = commands.add_parser("solve", help="Meilleur score atteignable et regret des parties jouées")
+    solve_parser.add_argument("games", type=Path, help="Export de la table games (JSON, NDJSON ou archive .games)")
+    solve_parser.add_argument("--output", type=Path, default=Path("optimal_scores.csv"))
+    solve_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    solve_parser.add_argument("--jobs", type=int, default=1, help="Processus pour les gros lots")
+    solve_parser.set_defaults(func=_cmd_solve)
+
+    simulate_parser = commands.add_parser("simulate", help="Simulation Monte-Carlo de parties")
+    simulate_parser.add_argument("--games", type=int, default=1_000_000)
+    simulate_parser.add_argument("--strategy", nargs="+", default=["random", "greedy", "optimal"],
+                                 choices=["random", "greedy", "optimal"])
+    simulate_parser.add_argument("--threshold", type=int, default=200, help="Victoire si score < seuil")
+    simulate_parser.add_argument("--jobs", type=int, default=1)
+    simulate_parser.add_argument("--seed", type=int, default=None)
+    simulate_parser.add_argument("--top", type=int, default=20, help="Combinaisons extrêmes à lister")
+    simulate_parser.add_argument("--min-games", type=int, default=20,
+                                 help="Parties minimum pour classer une combinaison")
+    simulate_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    simulate_parser.add_argument("--output", type=Path, default=Path("simulation.json"))
+    simulate_parser.set_defaults(func=_cmd_simulate)
+
+    advise_parser = commands.add_parser("advise", help="Score final espéré de chaque catégorie, manche par manche")
+    advise_parser.add_argument("categories", nargs="+", help="Catégories de la partie (colonne de la base ou en-tête)")
+    advise_parser.add_argument("--countries", nargs="+", help="Pays tirés, dans l'ordre (au hasard après)")
+    advise_parser.add_argument("--samples", type=int, default=512, help="Tirages futurs simulés")
+    advise_parser.add_argument("--seed", type=int, default=None)
+    advise_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    advise_parser.set_defaults(func=_cmd_advise)
+
+    distribution_parser = commands.add_parser("distribution", help="Loi exacte du score d'un jeu de catégories")
+    distribution_parser.add_argument("categories", nargs="+", help="Catégories (colonne de la base ou en-tête)")
+    distribution_parser.add_argument("--strategy", nargs="+", default=["random", "independent"],
+                                     choices=["random", "independent"])
+    distribution_parser.add_argument("--threshold", type=int, default=200, help="Victoire si score < seuil")
+    distribution_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    distribution_parser.add_argument("--output", type=Path, help="CSV des lois (score, pmf, cdf)")
+    distribution_parser.set_defaults(func=_cmd_distribution)
+
+    upload_parser = commands.add_parser("upload", help="Synchronise la table rankings (upsert du différentiel)")
+    upload_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    upload_parser.add_argument("--url", help="URL REST PostgREST (défaut : $PUBLIC_SUPABASE_URL/rest/v1)")
+    upload_parser.add_argument("--key", help="Clé API (défaut : $SUPABASE_SERVICE_ROLE_KEY ou anon)")
+    upload_parser.add_argument("--batch-size", type=int, default=100)
+    upload_parser.add_argument("--concurrency", type=int, default=4, help="Lots envoyés en parallèle")
+    upload_parser.add_argument("--prune", action="store_true", help="Supprime les pays absents de la matrice")
+    upload_parser.add_argument("--dry-run", action="store_true", help="Calcule le différentiel sans rien envoyer")
+    _add_profile_arguments(upload_parser, ["load", "fetch", "diff", "send"])
+    upload_parser.set_defaults(func=_cmd_upload)
+
+    seeds_parser = commands.add_parser("seeds", help="Réserve de parties pré-tirées indexée par difficulté")
+    seeds_commands = seeds_parser.add_subparsers(dest="seeds_command", required=True)
+    generate_parser = seeds_commands.add_parser("generate", help="Tire et classe les graines")
+    generate_parser.add_argument("--games", type=int, default=1_000_000)
+    generate_parser.add_argument("--buckets", type=int, default=10, help="Tranches de difficulté")
+    generate_parser.add_argument("--seed", type=int, default=None, help="Graine maîtresse (reproductibilité)")
+    generate_parser.add_argument("--jobs", type=int, default=1)
+    generate_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    generate_parser.add_argument("--output", type=Path, default=SEEDS_PATH)
+    generate_parser.set_defaults(func=_cmd_seeds_generate)
+    pick_parser = seeds_commands.add_parser("pick", help="Une partie d'une difficulté donnée (JSON)")
+    pick_parser.add_argument("difficulty", type=int, help="0 = la plus facile")
+    pick_parser.add_argument("--day", help="Défi du jour : même partie pour tous à cette date")
+    pick_parser.add_argument("--pool", type=Path, default=SEEDS_PATH)
+    pick_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    pick_parser.set_defaults(func=_cmd_seeds_pick)
+
+    combos_parser = commands.add_parser("combos", help="Index de toutes les combinaisons de catégories")
+    combos_commands = combos_parser.add_subparsers(dest="combos_command", required=True)
+    combos_build_parser = combos_commands.add_parser("build", help="Évalue et classe toutes les combinaisons")
+    combos_build_parser.add_argument("--samples", type=int, default=256,
+                                     help="Tirages de pays pour le meilleur score moyen")
+    combos_build_parser.add_argument("--buckets", type=int, default=10, help="Tranches de difficulté")
+    combos_build_parser.add_argument("--seed", type=int, default=None, help="Graine des tirages (reproductibilité)")
+    combos_build_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    combos_build_parser.add_argument("--output", type=Path, default=COMBOS_PATH)
+    combos_build_parser.set_defaults(func=_cmd_combos_build)
+    combos_pick_parser = combos_commands.add_parser("pick", help="Catégories d'un jeu d'une difficulté (JSON)")
+    combos_pick_parser.add_argument("difficulty", type=int, help="0 = la plus facile")
+    combos_pick_parser.add_argument("--redundancy", help="low, medium, high ou redondance maximale (|ρ| moyen)")
+    combos_pick_parser.add_argument("--seed", type=int, default=None)
+    combos_pick_parser.add_argument("--index", type=Path, default=COMBOS_PATH)
+    combos_pick_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    combos_pick_parser.set_defaults(func=_cmd_combos_pick)
+
+    similar_parser = commands.add_parser("similar", help="Pays aux profils de rangs proches (indices, tirages)")
+    similar_commands = similar_parser.add_subparsers(dest="similar_command", required=True)
+    index_parser = similar_commands.add_parser("build", help="Calcule l'index des plus proches voisins")
+    index_parser.add_argument("--metric", choices=["spearman", "euclidean"], default="spearman")
+    index_parser.add_argument("--k", type=int, default=20, help="Voisins gardés par pays")
+    index_parser.add_argument("--min-common", type=int, default=5,
+                              help="Catégories communes minimales pour comparer deux pays")
+    index_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    index_parser.add_argument("--output", type=Path, default=SIMILARITY_PATH)
+    index_parser.set_defaults(func=_cmd_similar_build)
+    query_parser = similar_commands.add_parser("query", help="Pays les plus proches (JSON)")
+    query_parser.add_argument("countries", nargs="+")
+    query_parser.add_argument("--k", type=int, default=None, help="Voisins (défaut : tous ceux de l'index)")
+    query_parser.add_argument("--dissimilar", action="store_true",
+                              help="Tire un pays éloigné de tous ceux donnés (pays déjà vus)")
+    query_parser.add_argument("--seed", type=int, default=None)
+    query_parser.add_argument("--index", type=Path, default=SIMILARITY_PATH)
+    query_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    query_parser.set_defaults(func=_cmd_similar_query)
+
+    serve_parser = commands.add_parser("serve", help="Service HTTP en lecture seule des classements")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8787)
+    serve_parser.add_argument("--solver-cache", type=int, default=4096, help="Meilleurs scores gardés en cache (LRU)")
+    serve_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    serve_parser.add_argument("--seeds", type=Path, default=SEEDS_PATH,
+                              help="Réserve de graines pour /games/new?difficulty= (ignorée si absente)")
+    serve_parser.add_argument("--combos", type=Path, default=COMBOS_PATH,
+                              help="Index des combinaisons pour /category-sets/new (ignoré si absent)")
+    serve_parser.set_defaults(func=_cmd_serve)
+
+    analytics_parser = commands.add_parser("analytics", help="Statistiques incrémentales des parties jouées")
+    analytics_parser.add_argument("games", type=Path, nargs="+",
+                                  help="Exports de la table games (JSON, NDJSON, CSV ou archive .games)")
+    analytics_parser.add_argument("--checkpoint", type=Path, default=ANALYTICS_PATH,
+                                  help="Point de reprise : seules les parties plus récentes sont traitées")
+    analytics_parser.add_argument("--no-checkpoint", action="store_true", help="Recalcule tout sans rien sauvegarder")
+    analytics_parser.add_argument("--top", type=int, default=20, help="Lignes du classement dans le rapport")
+    analytics_parser.add_argument("--top-games", type=int, default=100, help="Meilleures parties conservées")
+    analytics_parser.add_argument("--min-games", type=int, default=1, help="Parties minimum pour être classé")
+    analytics_parser.add_argument("--output", type=Path, default=Path("analytics_report.json"))
+    analytics_parser.set_defaults(func=_cmd_analytics)
+
+    games_parser = commands.add_parser("games", help="Archives binaires des parties (codec compact)")
+    games_commands = games_parser.add_subparsers(dest="games_command", required=True)
+    pack_parser = games_commands.add_parser("pack", help="Encode des exports en archive en colonnes")
+    pack_parser.add_argument("games", type=Path, nargs="+", help="Exports de la table games (JSON, NDJSON ou CSV)")
+    pack_parser.add_argument("--output", type=Path, required=True, help="Archive à écrire (.games)")
+    pack_parser.add_argument("--history", type=Path, default=HISTORY_DIR,
+                             help="Identifiants internés de l'historique (sinon ceux de --matrix)")
+    pack_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    pack_parser.set_defaults(func=_cmd_games_pack)
+    unpack_parser = games_commands.add_parser("unpack", help="Décode une archive en NDJSON (format de la table)")
+    unpack_parser.add_argument("archive", type=Path)
+    unpack_parser.add_argument("--output", type=Path, required=True)
+    unpack_parser.set_defaults(func=_cmd_games_unpack)
+
+    verify_parser = commands.add_parser("verify", help="Revérifie les parties soumises contre la matrice")
+    verify_parser.add_argument("games", type=Path, nargs="+",
+                               help="Exports de la table games (JSON, NDJSON, CSV ou archive .games)")
+    verify_parser.add_argument("--matrix", type=Path, default=BINARY_PATH)
+    verify_parser.add_argument("--history", type=Path, nargs="?", const=HISTORY_DIR,
+                               help="Vérifie chaque partie contre la version en vigueur à sa date")
+    verify_parser.add_argument("--checkpoint", type=Path, default=VERIFY_PATH,
+                               help="Point de reprise : les exports NDJSON reprennent après la dernière partie lue")
+    verify_parser.add_argument("--no-checkpoint", action="store_true", help="Revérifie tout sans rien sauvegarder")
+    verify_parser.add_argument("--threshold", type=int, default=200, help="Victoire si score < seuil")
+    verify_parser.add_argument("--batch-size", type=int, default=65536, help="Parties par lot vectorisé")
+    verify_parser.add_argument("--output", type=Path, default=Path("flagged_games.csv"),
+                               help="CSV des parties en échec (complété à chaque exécution)")
+    verify_parser.set_defaults(func=_cmd_verify)
+
+    bench_parser = commands.add_parser("bench", help="Benchmarks sur des données synthétiques")
+    bench_parser.add_argument("--scale", nargs="+", default=["real"], choices=["real", "medium", "large"],
+                              help="real : 21 x 193, medium : 100 x 5 000, large : 1 000 x 50 000")
+    bench_parser.add_argument("--categories", type=int, help="Échelle sur mesure : nombre de catégories")
+    bench_parser.add_argument("--entities", type=int, help="Échelle sur mesure : nombre d'entités")
+    bench_parser.add_argument("--repeat", type=int, default=3, help="Essais par mesure (le meilleur est retenu)")
+    bench_parser.add_argument("--seed", type=int, default=0)
+    bench_parser.add_argument("--jobs", type=int, default=None)
+    bench_parser.add_argument("--workdir", type=Path, help="Dossier des fichiers générés (défaut : temporaire)")
+    bench_parser.add_argument("--results", type=Path, help="Fichier des mesures (défaut : python/benchmarks.json)")
+    bench_parser.add_argument("--record", action="store_true", help="Enregistre les mesures dans --results")
+    bench_parser.add_argument("--check", action="store_true", help="Code de sortie 1 en cas de régression")
+    bench_parser.set_defaults(func=_cmd_bench)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,107 @@
+"""Conseiller en cours de partie : score final espéré selon la catégorie choisie
+
+À chaque manche, le joueur place le pays tiré dans une catégorie libre. Pour
+chaque catégorie libre, le conseiller estime le score final si le pays y est
+placé : score acquis, plus le rang du pays dans cette catégorie, plus
+l'espérance du meilleur placement des pays encore à tirer (sans remise, parmi
+les pays non joués) dans les autres catégories libres. C'est le meilleur
+résultat théorique en fonction des catégories restantes (cf. To-Do.md) : une
+borne a posteriori, comme la stratégie `optimal` de rankings.simulate, estimée
+par Monte-Carlo sur SAMPLES tirages.
+
+Les tirages sont faits une fois, en début de partie : pour chaque échantillon,
+les GAME_SIZE premiers pays d'un ordre aléatoire de tous les pays, et leurs
+rangs dans les catégories de la partie (tenseur de coûts). Jouer un pays le
+retire simplement de ces suites : ce qui reste d'un tirage uniforme sans
+remise est un tirage uniforme parmi les pays restants. D'une manche à l'autre,
+rien n'est donc retiré au sort ni relu dans la matrice, et les conseils ne
+varient pas au hasard. Tous les choix d'une manche sont évalués sur les mêmes
+échantillons par une seule programmation dynamique sur les sous-ensembles de
+catégories libres (`rankings.solver.remainders`). Les relances ne changent
+rien : le pays relancé n'est pas joué et reste tirable.
+"""
+
+import numpy as np
+
+from .compact import NULL_COST
+from .games import category_lookup
+from .simulate import draw_countries
+from .solver import cost_tensor, remainders
+
+SAMPLES = 512
+
+
+class Advisor:
+    """État d'une partie en cours : catégories libres, pays joués et tirages futurs"""
+
+    def __init__(self, matrix, categories, samples=SAMPLES, seed=None, null_cost=NULL_COST):
+        lookup = category_lookup(matrix)
+        unknown = [name for name in categories if name not in lookup]
+        if unknown:
+            raise ValueError(f"Catégories inconnues : {unknown}")
+        size = len(categories)
+        if not 1 <= size <= len(matrix.countries):
+            raise ValueError(f"De 1 à {len(matrix.countries)} catégories")
+        self.matrix = matrix
+        self.categories = list(categories)
+        self.null_cost = null_cost
+        self._ids = np.array([lookup[name] for name in categories], dtype=np.intp)
+        self._position = {name: j for j, name in enumerate(self.categories)}
+        self._open = list(range(size))
+        self._played = set()
+        self.placements = {}
+        self.score = 0
+
+        # Au plus `size` pays sont joués, dont le pays courant : `size` pays par échantillon suffisent
+        rng = np.random.default_rng(seed)
+        self._draws = draw_countries(rng, len(matrix.countries), samples, size)
+        self._cost = cost_tensor(matrix, np.broadcast_to(self._ids, (samples, size)), self._draws, self.null_cost)
+        self._alive = np.ones(self._draws.shape, dtype=bool)
+
+    @property
+    def open_categories(self):
+        return [self.categories[j] for j in self._open]
+
+    def _country(self, name):
+        row = self.matrix.country_index.get(name)
+        if row is None:
+            raise ValueError(f"Pays inconnu : {name!r}")
+        if row in self._played:
+            raise ValueError(f"{name} a déjà été joué")
+        return row
+
+    def _rank(self, row, j):
+        rank = int(self.matrix.ranks[row, self._ids[j]])
+        return self.null_cost if rank < 0 else rank
+
+    def advise(self, country):
+        """{catégorie libre: score final espéré} si `country` y est placé, du meilleur au moins bon"""
+        row = self._country(country)
+        current = np.array([self._rank(row, j) for j in self._open])
+        future = len(self._open) - 1
+        if future:
+            alive = self._alive & (self._draws != row)
+            # Les `future` premiers pays encore tirables de chaque échantillon
+            picked = np.argsort(~alive, axis=1, kind="stable")[:, :future]
+            samples = np.arange(len(picked))[:, None, None]
+            cost = self._cost[samples, picked[:, :, None], np.array(self._open)[None, None, :]]
+            rest = remainders(cost).mean(axis=0)
+        else:
+            rest = np.zeros(1)
+        expected = self.score + current + rest
+        order = np.argsort(expected, kind="stable")
+        return {self.categories[self._open[i]]: round(float(expected[i]), 1) for i in order.tolist()}
+
+    def place(self, category, country):
+        """Joue `country` dans `category` ; retourne son rang (coût NULL si non classé)"""
+        j = self._position.get(category)
+        if j is None or j not in self._open:
+            raise ValueError(f"Catégorie non libre : {category!r}")
+        row = self._country(country)
+        rank = self._rank(row, j)
+        self._open.remove(j)
+        self._played.add(row)
+        self._alive &= self._draws != row
+        self.placements[category] = country
+        self.score += rank
+        return rank
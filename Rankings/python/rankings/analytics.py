@@ -0,0 +1,266 @@
+"""Statistiques incrémentales sur l'historique des parties
+
+Les exports de la table `games` (JSON, NDJSON ou CSV) traversent une chaîne de
+générateurs et mettent à jour des agrégats en ligne, sans jamais garder les
+parties en mémoire :
+
+    par joueur      parties, meilleur score, moyenne et écart-type (Welford),
+                    victoires : les champs du type `Leaderboard` du jeu
+    par catégorie   nombre de fois jouée, rang moyen obtenu
+    par pays        nombre de fois placé, rang moyen obtenu
+    meilleures parties   tas des k plus bas scores
+
+L'état est sauvegardé dans un point de reprise : l'exécution suivante ne
+traite que les parties plus récentes (`created_at`) que la dernière vue. Sur
+un export NDJSON en ajout seul, la lecture reprend directement à l'octet où
+elle s'était arrêtée : le coût ne dépend que du nombre de nouvelles parties.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+
+from .games import read_games
+
+TOP_GAMES = 100
+CHECKPOINT_VERSION = 1
+# Octets précédant la position de reprise, hachés pour vérifier que l'export n'a pas été réécrit
+_TAIL = 4096
+
+
+class RunningStats:
+    """Moyenne et variance en ligne (algorithme de Welford), minimum et victoires"""
+
+    __slots__ = ("count", "mean", "m2", "best", "wins")
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, best=None, wins=0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.best = best
+        self.wins = wins
+
+    def add(self, value, won=False):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.best is None or value < self.best:
+            self.best = value
+        self.wins += bool(won)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def to_list(self):
+        return [self.count, self.mean, self.m2, self.best, self.wins]
+
+
+def _timestamp(game):
+    return game.get("created_at") or game.get("completed_at") or ""
+
+
+def _tail_digest(path, offset):
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - _TAIL))
+        return hashlib.sha256(f.read(min(offset, _TAIL))).hexdigest()
+
+
+class GameAnalytics:
+    """Agrégats en ligne et point de reprise"""
+
+    def __init__(self, top=TOP_GAMES):
+        self.top = top
+        self.games = 0
+        self.skipped = 0
+        self.users = {}
+        self.categories = {}
+        self.countries = {}
+        # Tas des meilleures parties : (-score, date, id, joueur), la pire à la racine
+        self.top_games = []
+        # Dernière date traitée et identifiants vus à cette date exacte
+        self.watermark = ""
+        self.boundary = set()
+        # Export NDJSON -> position de reprise
+        self.sources = {}
+
+    def is_new(self, game, watermark=None, boundary=None):
+        """Vrai si la partie est postérieure au point de reprise (watermark, boundary)"""
+        if watermark is None:
+            watermark, boundary = self.watermark, self.boundary
+        timestamp = _timestamp(game)
+        if timestamp != watermark:
+            return timestamp > watermark
+        return game.get("id") not in boundary
+
+    def update(self, game):
+        """Ajoute une partie aux agrégats"""
+        score = game.get("score")
+        if not isinstance(score, int) or not game.get("user_id"):
+            self.skipped += 1
+            return
+        won = bool(game.get("won"))
+        self.games += 1
+        self.users.setdefault(game["user_id"], RunningStats()).add(score, won)
+
+        selections = game.get("country_selections") or {}
+        if isinstance(selections, str):
+            selections = json.loads(selections)
+        for category, selection in selections.items():
+            ranking = selection.get("ranking") if isinstance(selection, dict) else None
+            if not isinstance(ranking, int):
+                continue
+            self.categories.setdefault(category, RunningStats()).add(ranking, won)
+            country = selection.get("country")
+            if country:
+                self.countries.setdefault(country, RunningStats()).add(ranking, won)
+
+        entry = (-score, _timestamp(game), str(game.get("id")), game["user_id"])
+        if len(self.top_games) < self.top:
+            heapq.heappush(self.top_games, entry)
+        elif entry > self.top_games[0]:
+            heapq.heapreplace(self.top_games, entry)
+
+        timestamp = _timestamp(game)
+        if timestamp > self.watermark:
+            self.watermark, self.boundary = timestamp, set()
+        if timestamp == self.watermark:
+            self.boundary.add(game.get("id"))
+
+    def consume(self, games):
+        """Ajoute les nouvelles parties d'un flux, retourne leur nombre
+
+        Le flux n'a pas besoin d'être trié : le filtre utilise le point de
+        reprise tel qu'il était au début du flux.
+        """
+        before = self.games
+        watermark, boundary = self.watermark, set(self.boundary)
+        for game in games:
+            if self.is_new(game, watermark, boundary):
+                self.update(game)
+        return self.games - before
+
+    def leaderboard(self, min_games=1):
+        """Lignes du classement des joueurs (champs du type `Leaderboard`), meilleurs d'abord"""
+        rows = [
+            {"user_id": user, "total_games": stats.count, "best_score": stats.best,
+             "average_score": round(stats.mean, 2), "std_score": round(stats.std, 2),
+             "win_count": stats.wins, "win_rate": round(stats.wins / stats.count, 4)}
+            for user, stats in self.users.items() if stats.count >= min_games
+        ]
+        rows.sort(key=lambda row: (row["best_score"], row["average_score"], row["user_id"]))
+        return rows
+
+    def report(self, top=20, min_games=1):
+        """Rapport sérialisable en JSON"""
+
+        def describe(table):
+            return sorted(({"name": name, "picks": stats.count, "average_rank": round(stats.mean, 2),
+                            "win_rate": round(stats.wins / stats.count, 4)}
+                           for name, stats in table.items()),
+                          key=lambda row: (-row["picks"], row["name"]))
+
+        return {
+            "games": self.games,
+            "skipped": self.skipped,
+            "users": len(self.users),
+            "watermark": self.watermark,
+            "leaderboard": self.leaderboard(min_games)[:top],
+            "top_games": [{"id": game_id, "user_id": user, "score": -score, "created_at": timestamp}
+                          for score, timestamp, game_id, user in sorted(self.top_games, reverse=True)][:top],
+            "categories": describe(self.categories),
+            "countries": describe(self.countries),
+        }
+
+    def save(self, path):
+        """Écrit le point de reprise (écriture atomique)"""
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "top": self.top,
+            "games": self.games,
+            "skipped": self.skipped,
+            "watermark": self.watermark,
+            "boundary": sorted(self.boundary, key=str),
+            "sources": self.sources,
+            "users": {user: stats.to_list() for user, stats in self.users.items()},
+            "categories": {name: stats.to_list() for name, stats in self.categories.items()},
+            "countries": {name: stats.to_list() for name, stats in self.countries.items()},
+            "top_games": self.top_games,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, top=TOP_GAMES):
+        """Reprend l'état d'un point de reprise, ou un état vide s'il n'existe pas"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return cls(top)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} : version de point de reprise non supportée")
+        analytics = cls(state["top"])
+        analytics.games = state["games"]
+        analytics.skipped = state["skipped"]
+        analytics.watermark = state["watermark"]
+        analytics.boundary = set(state["boundary"])
+        analytics.sources = state["sources"]
+        analytics.users = {user: RunningStats(*values) for user, values in state["users"].items()}
+        analytics.categories = {name: RunningStats(*values) for name, values in state["categories"].items()}
+        analytics.countries = {name: RunningStats(*values) for name, values in state["countries"].items()}
+        analytics.top_games = [tuple(entry) for entry in state["top_games"]]
+        heapq.heapify(analytics.top_games)
+        return analytics
+
+    def stream(self, path):
+        """Parties d'un export, en reprenant après la dernière lue si possible"""
+        return stream_export(path, self.sources)
+
+
+def _resume_offset(path, sources):
+    source = sources.get(str(path.resolve()))
+    if not source:
+        return 0
+    if path.stat().st_size < source["offset"] or _tail_digest(path, source["offset"]) != source["tail"]:
+        # Export réécrit : relecture complète, le filtre par date évite les doublons
+        return 0
+    return source["offset"]
+
+
+def stream_export(path, sources):
+    """Parties d'un export ; un export NDJSON reprend à sa position dans `sources` (mise à jour)"""
+    if path.suffix.lower() not in (".ndjson", ".jsonl"):
+        yield from read_games(path)
+        return
+    offset = _resume_offset(path, sources)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            # Une dernière ligne incomplète (export en cours) sera relue la prochaine fois
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                yield json.loads(line)
+    sources[str(path.resolve())] = {"offset": offset, "tail": _tail_digest(path, offset)}
+
+
+def refresh(paths, checkpoint, top=TOP_GAMES):
+    """Met à jour le point de reprise avec les exports `paths`
+
+    Retourne (GameAnalytics, nombre de nouvelles parties).
+    """
+    analytics = GameAnalytics.load(checkpoint, top) if checkpoint else GameAnalytics(top)
+    added = 0
+    for path in paths:
+        added += analytics.consume(analytics.stream(path))
+    if checkpoint:
+        analytics.save(checkpoint)
+    return analytics, added
@@ -0,0 +1,348 @@
+"""Benchmarks de la chaîne de build et des outils de partie
+
+Chaque échelle génère un jeu de fichiers synthétiques (cf. rankings.synthetic)
+puis chronomètre séparément la lecture, la résolution des noms, la fusion
+(valeurs et tri global), le reclassement sur une région (Europe),
+l'écriture, le build complet (à froid et sans changement), la résolution de
+parties, la simulation, l'index de similarité, le conseiller (une partie
+conseillée à chaque manche), la loi exacte du score d'un jeu de catégories,
+la vérification d'un lot de parties soumises, depuis le JSON ou depuis les
+enregistrements binaires (rankings.codec), et l'index de toutes les
+combinaisons de catégories. Chaque mesure est le minimum de `repeat` essais.
+
+Le benchmark vérifie aussi que les moteurs produisent exactement la même
+sortie : Rankings.csv du build (threads et processus) comparé octet par octet
+à celui d'un moteur de référence écrit au plus simple, sorties des moteurs
+compact et NumPy et de la fusion hors mémoire identiques, et Rankings.bin
+relu identique au CSV. Il vérifie enfin que la vérification signale
+exactement les parties au score faussé, que le codec fait l'aller-retour
+sans perte et que les meilleurs scores de l'index des combinaisons sont ceux du
+solveur. Les résultats enregistrés dans benchmarks.json sont
+relus à l'exécution suivante pour signaler les régressions.
+"""
+
+import bisect
+import copy
+import csv
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from .advisor import Advisor
+from .binary import load_binary, write_binary
+from .build import build, parse_category, values_path
+from .categories import db_columns
+from .codec import GameCodec
+from .combos import MAX_COMBINATIONS
+from .combos import build_index as build_combos
+from .distribution import cost_columns, distribution
+from .matrix import NULL, RankMatrix
+from .reader import read_category
+from .similarity import build_index
+from .simulate import GAME_SIZE, draw_countries, draw_games, simulate
+from .solver import cost_tensor, solve
+from .synthetic import generate
+from .verify import Verifier
+from .values import ValueMatrix
+
+# Échelle -> (catégories, entités)
+SCALES = {
+    "real": (21, 193),
+    "medium": (100, 5_000),
+    "large": (1_000, 50_000),
+}
+SOLVE_GAMES = 100_000
+SIMULATE_GAMES = 200_000
+VERIFY_GAMES = 100_000
+RESULTS_PATH = Path(__file__).resolve().parents[1] / "benchmarks.json"
+# Une mesure est une régression si elle dépasse l'enregistrement de 25 % (et de 50 ms)
+REGRESSION_RATIO = 1.25
+REGRESSION_FLOOR = 0.05
+# Les clés de combinaison du simulateur tiennent sur int64 jusqu'à 233 catégories
+SIMULATE_MAX_CATEGORIES = 233
+# L'index de similarité est quadratique en entités (et limité à 65 535 par son format)
+SIMILARITY_MAX_ENTITIES = 10_000
+# Budget de la fusion hors mémoire vérifiée : plusieurs partitions même pour le jeu réel
+CHUNKED_MEMORY = 16 << 10
+
+
+def _timed(function, repeat, setup=None):
+    """Meilleur temps de `function` sur `repeat` essais, et son dernier résultat"""
+    best, result = None, None
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        result = function(argument) if setup else function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 6), result
+
+
+def _reference_ranks(entries, schema):
+    """{pays: (rang source, valeur)} -> {pays: rang recalculé}, par un simple tri"""
+    keys = {}
+    for country, (rank, value) in entries.items():
+        if schema.value is None:
+            keys[country] = (rank, rank)
+        elif value is not None:
+            keys[country] = (-value if schema.direction == "desc" else value, rank)
+    ordered = sorted(keys, key=lambda country: keys[country])
+    values = [keys[country][0] for country in ordered]
+    distinct = sorted(set(values))
+    ranks = {}
+    for position, country in enumerate(ordered):
+        if schema.ties == "ordinal":
+            ranks[country] = position + 1
+        elif schema.ties == "dense":
+            ranks[country] = bisect.bisect_left(distinct, values[position]) + 1
+        else:
+            ranks[country] = bisect.bisect_left(values, values[position]) + 1
+    return ranks
+
+
+def _advise_game(matrix, seed):
+    """Une partie entière jouée selon le conseiller (conseil à chaque manche)"""
+    rng = np.random.default_rng(seed)
+    categories, countries = draw_games(rng, len(matrix.categories), len(matrix.countries), 1)
+    advisor = Advisor(matrix, [matrix.categories[j] for j in categories[0].tolist()], seed=seed)
+    for row in countries[0].tolist():
+        country = matrix.countries[row]
+        advisor.place(next(iter(advisor.advise(country))), country)
+    return advisor.score
+
+
+def _check_combos(index, matrix):
+    """Meilleur score moyen de la première combinaison de chaque tranche, recalculé par le solveur"""
+    draws = draw_countries(np.random.default_rng(index.seed), len(matrix.countries), index.samples, GAME_SIZE)
+    for difficulty in range(index.buckets):
+        combo = index.bucket(difficulty)[0]
+        categories = np.broadcast_to(combo["categories"].astype(np.intp), draws.shape)
+        optimal, _ = solve(cost_tensor(matrix, categories, draws), with_assignment=False)
+        if abs(optimal.mean() - float(combo["optimal"])) > 1e-3:
+            return False
+    return True
+
+
+def _submitted_games(matrix, categories, countries, tampered):
+    """Parties telles que le jeu les insère ; le score des parties `tampered` est faussé"""
+    ranks = np.asarray(matrix.ranks)
+    games = []
+    for b, (game_categories, game_countries) in enumerate(zip(categories.tolist(), countries.tolist())):
+        selections = {}
+        for j, row in zip(game_categories, game_countries):
+            rank = int(ranks[row, j])
+            name = db_columns.get(matrix.categories[j], matrix.categories[j])
+            selections[name] = {"country": matrix.countries[row], "ranking": rank if rank >= 0 else None}
+        score = sum(selection["ranking"] or 0 for selection in selections.values())
+        games.append({"id": str(uuid.UUID(int=b)), "user_id": str(uuid.UUID(int=b % 1000)),
+                      "score": score + 1 if tampered[b] else score, "categories_used": list(selections),
+                      "country_selections": selections, "created_at": "2025-01-01T00:00:00+00:00",
+                      "completed_at": None, "won": score < 200})
+    return games
+
+
+def reference_csv(schemas, category_dir, resolver):
+    """Rankings.csv produit par un moteur de référence, sans cache ni NumPy
+
+    Un dictionnaire pays -> (rang, valeur) rempli fichier par fichier (la
+    première ligne d'un pays l'emporte), reclassé par un tri Python, lignes
+    dans l'ordre du référentiel.
+    """
+    rows = {}
+    columns = [schema.column for schema in schemas]
+    for schema in schemas:
+        path = category_dir / schema.filename
+        if not path.exists():
+            continue
+        entries = {}
+        for rank, raw, value in read_category(path, schema):
+            country = resolver.resolve(raw)
+            if country is not None:
+                entries.setdefault(country, (rank, value))
+        for country, rank in _reference_ranks(entries, schema).items():
+            rows.setdefault(country, {})[schema.column] = rank
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(["Country"] + columns)
+    for country in resolver.countries:
+        if country in rows:
+            writer.writerow([country] + [rows[country].get(column, NULL) for column in columns])
+    return output.getvalue().encode("utf-8")
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run(scale, categories, count, workdir, repeat=3, seed=0, jobs=None):
+    """Benchmark d'une échelle, retourne un dictionnaire de résultats"""
+    root = workdir / scale
+    shutil.rmtree(root, ignore_errors=True)
+    category_dir = root / "Category"
+    timings, checks = {}, {}
+
+    timings["generate"], (schemas, resolver) = _timed(
+        lambda: generate(category_dir, categories, count, seed), 1)
+
+    # Lecture et résolution fichier par fichier : rien n'est gardé en mémoire
+    timings["ingest"], timings["resolve"], rows = None, None, 0
+    for _ in range(repeat):
+        fresh = copy.deepcopy(resolver)
+        reading = resolving = 0.0
+        rows = 0
+        for schema in schemas:
+            start = time.perf_counter()
+            names = [raw for _, raw, _ in read_category(category_dir / schema.filename, schema)]
+            middle = time.perf_counter()
+            fresh.resolve_many(names)
+            resolving += time.perf_counter() - middle
+            reading += middle - start
+            rows += len(names)
+        timings["ingest"] = round(min(timings["ingest"] or reading, reading), 6)
+        timings["resolve"] = round(min(timings["resolve"] or resolving, resolving), 6)
+
+    parsed = {schema.column: parse_category(category_dir / schema.filename, schema, resolver)
+              for schema in schemas}
+    timings["merge"], values = _timed(
+        lambda: ValueMatrix.from_columns({column: (data["countries"], data["ranks"], data["values"])
+                                          for column, data in parsed.items()},
+                                         schemas, country_order=resolver.countries), repeat)
+    matrix = values.rank_matrix()
+    europe = values.region_mask("Europe")
+    timings["rerank_region"], _ = _timed(lambda: values.ranks(europe), repeat)
+
+    def write():
+        matrix.to_csv(root / "written.csv")
+        write_binary(matrix, root / "written.bin")
+
+    timings["write"], _ = _timed(write, repeat)
+
+    output = root / "Rankings.csv"
+    options = {"output_path": output, "category_dir": category_dir, "history_dir": None,
+               "bundle_dir": None, "schemas": schemas, "jobs": jobs}
+    timings["build_cold"], _ = _timed(
+        lambda fresh: build(cache_dir=root / "cache", force=True, resolver=fresh, **options),
+        repeat, setup=lambda: copy.deepcopy(resolver))
+    timings["build_noop"], report = _timed(
+        lambda fresh: build(cache_dir=root / "cache", resolver=fresh, **options),
+        repeat, setup=lambda: copy.deepcopy(resolver))
+    checks["noop_up_to_date"] = report.up_to_date
+
+    # Sorties identiques octet par octet entre moteurs
+    built = output.read_bytes()
+    checks["reference_csv"] = built == reference_csv(schemas, category_dir, copy.deepcopy(resolver))
+    process_output = root / "process" / "Rankings.csv"
+    build(cache_dir=root / "process-cache", force=True, executor="process", resolver=copy.deepcopy(resolver),
+          **{**options, "output_path": process_output})
+    checks["process_csv"] = built == process_output.read_bytes()
+    engine_outputs = []
+    for engine in ("compact", "numpy"):
+        engine_output = root / engine / "Rankings.csv"
+        build(cache_dir=root / "cache", engine=engine, resolver=copy.deepcopy(resolver),
+              **{**options, "output_path": engine_output})
+        engine_outputs.append([path.read_bytes() for path in
+                               (engine_output, engine_output.with_suffix(".bin"), values_path(engine_output))])
+    checks["engine_outputs"] = engine_outputs[0] == engine_outputs[1] and engine_outputs[0][0] == built
+    # Fusion hors mémoire, avec un budget qui force plusieurs partitions
+    chunked_output = root / "chunked" / "Rankings.csv"
+    build(cache_dir=root / "cache", merge="chunked", memory_limit=CHUNKED_MEMORY, resolver=copy.deepcopy(resolver),
+          **{**options, "output_path": chunked_output})
+    checks["chunked_outputs"] = [chunked_output.read_bytes(),
+                                 chunked_output.with_suffix(".bin").read_bytes()] == engine_outputs[0][:2]
+    binary = load_binary(output.with_suffix(".bin"))
+    from_csv = RankMatrix.from_csv(output)
+    checks["binary_roundtrip"] = (binary.countries == from_csv.countries
+                                  and binary.categories == from_csv.categories
+                                  and np.array_equal(binary.ranks, from_csv.ranks))
+
+    matrix = load_binary(output.with_suffix(".bin"))
+    rng = np.random.default_rng(seed)
+    game_categories, game_countries = draw_games(rng, len(matrix.categories), len(matrix.countries), SOLVE_GAMES)
+    timings["solve"], _ = _timed(
+        lambda: solve(cost_tensor(matrix, game_categories, game_countries), with_assignment=False), repeat)
+    if len(matrix.categories) <= SIMULATE_MAX_CATEGORIES:
+        timings["simulate"], _ = _timed(
+            lambda: simulate(output.with_suffix(".bin"), SIMULATE_GAMES, seed=seed), repeat)
+    if len(matrix.countries) <= SIMILARITY_MAX_ENTITIES:
+        timings["similarity"], _ = _timed(lambda: build_index(matrix), repeat)
+    if len(matrix.categories) >= GAME_SIZE and len(matrix.countries) >= GAME_SIZE:
+        timings["advise"], _ = _timed(lambda: _advise_game(matrix, seed), repeat)
+        # Loi exacte : sa moyenne est la somme des moyennes des colonnes (linéarité)
+        chosen = matrix.categories[:GAME_SIZE]
+        timings["distribution"], law = _timed(lambda: distribution(matrix, chosen), repeat)
+        mean = cost_columns(matrix, chosen).mean(axis=0).sum()
+        checks["distribution_mean"] = abs(law.mean - mean) <= 1e-9 * mean
+        # Vérification : exactement les parties au score faussé sont signalées
+        tampered = rng.random(VERIFY_GAMES) < 0.01
+        games = _submitted_games(matrix, game_categories[:VERIFY_GAMES], game_countries[:VERIFY_GAMES], tampered)
+        verifier = Verifier(matrix)
+        timings["verify"], verdicts = _timed(lambda: verifier.verify(games), repeat)
+        checks["verify_flags"] = np.array_equal(verdicts.flags != 0, tampered)
+        # Codec : aller-retour exact, et même verdict sur les enregistrements
+        codec = GameCodec.for_build(matrix)
+        timings["encode"], (records, rejected) = _timed(lambda: codec.encode(games), repeat)
+        timings["verify_records"], from_records = _timed(lambda: verifier.verify_records(records, codec), repeat)
+        checks["codec_roundtrip"] = not rejected and codec.decode(records) == games
+        checks["verify_records"] = np.array_equal(from_records.flags, verdicts.flags)
+    if GAME_SIZE <= len(matrix.categories) and math.comb(len(matrix.categories), GAME_SIZE) <= MAX_COMBINATIONS:
+        timings["combos"], combos = _timed(lambda: build_combos(matrix, seed=seed), repeat)
+        checks["combos_optimal"] = _check_combos(combos, matrix)
+
+    shutil.rmtree(root, ignore_errors=True)
+    return {
+        "categories": categories,
+        "entities": count,
+        "rows": rows,
+        "repeat": repeat,
+        "solve_games": SOLVE_GAMES,
+        "simulate_games": SIMULATE_GAMES,
+        "verify_games": VERIFY_GAMES,
+        "environment": environment(),
+        "timings": timings,
+        "checks": checks,
+    }
+
+
+def load_results(path=RESULTS_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record(results, path=RESULTS_PATH):
+    """Enregistre les résultats (par échelle) dans benchmarks.json"""
+    recorded = load_results(path)
+    recorded.update(results)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(recorded, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def regressions(result, recorded):
+    """Mesures plus lentes que l'enregistrement : [(étape, enregistré, mesuré)]"""
+    if not recorded or (recorded["categories"], recorded["entities"]) != (result["categories"], result["entities"]):
+        return []
+    slower = []
+    for stage, elapsed in result["timings"].items():
+        before = recorded["timings"].get(stage)
+        if before is not None and elapsed > before * REGRESSION_RATIO and elapsed - before > REGRESSION_FLOOR:
+            slower.append((stage, before, elapsed))
+    return slower
@@ -0,0 +1,253 @@
+"""Format binaire Rankings.bin, chargeable par np.memmap sans parsing
+
+Disposition du fichier (petit-boutiste) :
+
+    en-tête      HEADER (magic, version, sentinelle NULL, dimensions,
+                 taille des tables de chaînes, offset des rangs, empreinte)
+    chaînes      noms des pays puis des catégories, chacun préfixé par sa
+                 longueur en octets (uint16), encodés en UTF-8
+    rangs        bloc int16 contigu pays x catégories (ordre C), aligné sur
+                 RANKS_ALIGNMENT octets
+
+Le bloc de rangs est projeté en mémoire en lecture seule : plusieurs processus
+qui ouvrent le même fichier partagent les mêmes pages du cache système.
+
+Rankings.values.bin (matrice de valeurs, cf. rankings.values) :
+
+    en-tête      VALUES_HEADER (magic, version, dimensions, taille des
+                 métadonnées, offset des blocs)
+    métadonnées  JSON : pays, catégories, sens, règles d'égalité, régions
+    blocs        valeurs float64, rangs source int16 (pays x catégories, ordre
+                 C), puis bits de région uint64 par pays, chacun aligné sur
+                 RANKS_ALIGNMENT octets
+
+L'écriture n'utilise que la bibliothèque standard (moteur compact) ; NumPy
+n'est importé qu'à la lecture.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from array import array
+
+from .compact import NULL_RANK, little_endian
+
+MAGIC = b"GZRK"
+FORMAT_VERSION = 1
+RANKS_ALIGNMENT = 64
+RANKS_DTYPE = "<i2"
+# magic, version, sentinelle NULL, nb pays, nb catégories, taille des chaînes,
+# offset du bloc de rangs, empreinte du contenu
+HEADER = struct.Struct("<4sHhIIIQ16s")
+_LENGTH = struct.Struct("<H")
+
+VALUES_MAGIC = b"GZVL"
+VALUES_VERSION = 1
+# magic, version, nb pays, nb catégories, taille des métadonnées, offset du premier bloc
+VALUES_HEADER = struct.Struct("<4sHIIIQ")
+
+
+def _pack_strings(names):
+    parts = []
+    for name in names:
+        data = name.encode("utf-8")
+        parts.append(_LENGTH.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def _unpack_strings(buffer, count, offset=0):
+    names = []
+    for _ in range(count):
+        (length,) = _LENGTH.unpack_from(buffer, offset)
+        offset += _LENGTH.size
+        names.append(bytes(buffer[offset:offset + length]).decode("utf-8"))
+        offset += length
+    return names, offset
+
+
+def write_binary(matrix, path):
+    """Écrit la matrice au format Rankings.bin (écriture atomique)"""
+    strings = _pack_strings(matrix.countries) + _pack_strings(matrix.categories)
+    ranks_offset = HEADER.size + len(strings)
+    ranks_offset += -ranks_offset % RANKS_ALIGNMENT
+    rows, cols = matrix.shape
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, NULL_RANK, rows, cols, len(strings),
+                         ranks_offset, bytes.fromhex(matrix.fingerprint()))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(strings)
+        f.write(b"\0" * (ranks_offset - HEADER.size - len(strings)))
+        f.write(matrix.rank_bytes())
+    os.replace(tmp, path)
+
+
+def _blocks(f, size=1 << 20):
+    f.seek(0)
+    return iter(lambda: f.read(size), b"")
+
+
+class BinaryWriter:
+    """Rankings.bin écrit ligne par ligne, sans garder la matrice en mémoire
+
+    Noms et rangs passent par deux fichiers temporaires à côté de la sortie :
+    l'en-tête, qui porte leurs tailles et l'empreinte, n'est connu qu'à la fin.
+    Le fichier produit est identique à celui de `write_binary`.
+    """
+
+    def __init__(self, path, categories):
+        self.path = path
+        self.categories = list(categories)
+        self.rows = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._names = open(path.with_suffix(".names.tmp"), "w+b")
+        self._ranks = open(path.with_suffix(".ranks.tmp"), "w+b")
+        # Même empreinte que RankMatrix.fingerprint, calculée au fil des lignes
+        self._digest = hashlib.blake2b(digest_size=16)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for spool in (self._names, self._ranks):
+            spool.close()
+            os.remove(spool.name)
+
+    def add(self, country, ranks):
+        """Ajoute une ligne : nom du pays et rangs (`array('h')`, une case par catégorie)"""
+        data = country.encode("utf-8")
+        self._names.write(_LENGTH.pack(len(data)) + data)
+        self._ranks.write(little_endian(ranks))
+        self._digest.update(b"\n" + data if self.rows else data)
+        self.rows += 1
+
+    def close(self):
+        """Assemble Rankings.bin (écriture atomique), retourne l'empreinte"""
+        digest = self._digest
+        digest.update(b"\0" + "\n".join(self.categories).encode("utf-8") + b"\0")
+        for block in _blocks(self._ranks):
+            digest.update(block)
+        fingerprint = digest.hexdigest()
+
+        categories = _pack_strings(self.categories)
+        strings_size = self._names.tell() + len(categories)
+        ranks_offset = HEADER.size + strings_size
+        ranks_offset += -ranks_offset % RANKS_ALIGNMENT
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, NULL_RANK, self.rows, len(self.categories), strings_size,
+                             ranks_offset, bytes.fromhex(fingerprint))
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(header)
+            for block in _blocks(self._names):
+                f.write(block)
+            f.write(categories)
+            f.write(b"\0" * (ranks_offset - HEADER.size - strings_size))
+            for block in _blocks(self._ranks):
+                f.write(block)
+        os.replace(tmp, self.path)
+        return fingerprint
+
+
+def load_binary(path):
+    """Ouvre Rankings.bin sans copie : les rangs sont un np.memmap en lecture seule"""
+    import numpy as np
+
+    from .matrix import RankMatrix
+
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} : fichier tronqué")
+        magic, version, null_rank, rows, cols, strings_size, ranks_offset, digest = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} : ce n'est pas un fichier Rankings.bin")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} : version de format {version} non supportée")
+        if null_rank != NULL_RANK:
+            raise ValueError(f"{path} : sentinelle NULL inattendue ({null_rank})")
+        strings = f.read(strings_size)
+
+    countries, offset = _unpack_strings(strings, rows)
+    categories, _ = _unpack_strings(strings, cols, offset)
+    if rows and cols:
+        ranks = np.memmap(path, dtype=RANKS_DTYPE, mode="r", offset=ranks_offset, shape=(rows, cols))
+    else:
+        ranks = np.empty((rows, cols), dtype=RANKS_DTYPE)
+    matrix = RankMatrix(countries, categories, ranks)
+    matrix._fingerprint = digest.hex()
+    return matrix
+
+
+def load_matrix(path):
+    """Charge une matrice depuis Rankings.bin (projeté) ou, à défaut, Rankings.csv"""
+    from .matrix import RankMatrix
+
+    if path.suffix == ".bin":
+        return load_binary(path)
+    return RankMatrix.from_csv(path)
+
+
+def _block(data, typecode):
+    # array de la bibliothèque standard ou tableau NumPy natif -> octets petit-boutistes
+    if not isinstance(data, array):
+        data = array(typecode, data.tobytes() if hasattr(data, "tobytes") else data)
+    return little_endian(data)
+
+
+def _aligned(f):
+    f.write(b"\0" * (-f.tell() % RANKS_ALIGNMENT))
+
+
+def write_values(values, path):
+    """Écrit une matrice de valeurs (ValueMatrix ou CompactValues), écriture atomique"""
+    meta = json.dumps({"countries": values.countries, "categories": values.categories,
+                       "descending": [bool(flag) for flag in values.descending], "ties": values.ties,
+                       "regions": values.regions}, ensure_ascii=False).encode("utf-8")
+    blocks_offset = VALUES_HEADER.size + len(meta)
+    blocks_offset += -blocks_offset % RANKS_ALIGNMENT
+    rows, cols = len(values.countries), len(values.categories)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(VALUES_HEADER.pack(VALUES_MAGIC, VALUES_VERSION, rows, cols, len(meta), blocks_offset))
+        f.write(meta)
+        _aligned(f)
+        f.write(_block(values.values, "d"))
+        _aligned(f)
+        f.write(_block(values.source_ranks, "h"))
+        _aligned(f)
+        f.write(_block(values.bits, "Q"))
+    os.replace(tmp, path)
+
+
+def load_values(path):
+    """Charge Rankings.values.bin en ValueMatrix (NumPy)"""
+    import numpy as np
+
+    from .values import ValueMatrix
+
+    with open(path, "rb") as f:
+        header = f.read(VALUES_HEADER.size)
+        if len(header) < VALUES_HEADER.size:
+            raise ValueError(f"{path} : fichier tronqué")
+        magic, version, rows, cols, meta_size, offset = VALUES_HEADER.unpack(header)
+        if magic != VALUES_MAGIC:
+            raise ValueError(f"{path} : ce n'est pas une matrice de valeurs")
+        if version != VALUES_VERSION:
+            raise ValueError(f"{path} : version de format {version} non supportée")
+        meta = json.loads(f.read(meta_size))
+
+    blocks = []
+    for dtype, count in (("<f8", rows * cols), ("<i2", rows * cols), ("<u8", rows)):
+        blocks.append(np.fromfile(path, dtype=dtype, count=count, offset=offset))
+        offset += count * np.dtype(dtype).itemsize
+        offset += -offset % RANKS_ALIGNMENT
+    values, source_ranks, bits = blocks
+    return ValueMatrix(meta["countries"], meta["categories"], values.reshape(rows, cols),
+                       source_ranks.reshape(rows, cols), meta["descending"], meta["ties"],
+                       regions=meta["regions"], bits=bits)
@@ -0,0 +1,486 @@
+"""Build incrémental de Rankings.csv
+
+Chaque fichier de Data/Category est un nœud feuille du graphe de build, le
+fichier Rankings.csv est le nœud final qui dépend de tous les autres. Le
+résultat parsé et normalisé de chaque nœud est mis en cache sous le hash de
+son contenu : seul un fichier modifié est relu, et un build sans changement
+se limite à quelques `stat`.
+
+Les rangs publiés sont recalculés à partir des valeurs des fichiers (cf.
+rankings.values), et la matrice de valeurs est publiée à côté pour les modes
+de partie restreints à une région.
+
+Un petit build (le jeu réel) n'importe pas NumPy : la fusion et toutes les
+écritures passent par le moteur compact de la bibliothèque standard (cf.
+rankings.compact), aux sorties identiques octet par octet. Pour des sources
+trop grosses pour la mémoire, `merge="chunked"` fusionne par partitions de
+hachage sur disque (cf. rankings.partition).
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from .binary import write_binary, write_values
+from .bundle import MANIFEST, write_bundle
+from .categories import BUNDLE_DIR, CACHE_DIR, CATEGORY_DIR, HISTORY_DIR, RANKINGS_PATH, schemas
+from .compact import CompactValues
+from .countries import CountryResolver
+from .history import VERSIONS, RankingHistory
+from .profiling import disabled
+from .reader import read_category
+
+STATE_FILE = "build_state.json"
+RESOLVER_MEMO = "resolver.json"
+
+# À incrémenter à chaque changement du parsing pour invalider le cache
+PARSER_VERSION = 5
+
+ENGINES = ("auto", "compact", "numpy")
+MERGES = ("memory", "chunked")
+# Au-delà, le moteur "auto" passe de la bibliothèque standard à NumPy
+COMPACT_MAX_BYTES = 4 << 20
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _stat_signature(path):
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def config_key(resolver):
+    """Empreinte de tout ce qui influence le parsing en dehors des fichiers"""
+    return _sha256(f"{PARSER_VERSION}:{resolver.fingerprint}".encode("ascii"))
+
+
+def parse_category(path, schema, resolver, profile=False):
+    """Lit un fichier de catégorie et retourne sa colonne résolue
+
+    Le résultat contient les pays canoniques, leurs rangs et valeurs, les
+    noms bruts non résolus (avec leur nombre d'occurrences), qui sont écartés,
+    et les pays désignés par plusieurs lignes (avec leurs noms bruts) : seule la
+    première ligne est gardée.
+    Avec `profile`, il contient aussi les mesures de la lecture et de la
+    résolution (clé "profile", à retirer avant la mise en cache).
+    """
+    wall, cpu = time.perf_counter(), time.thread_time()
+    names, ranks, values = [], [], []
+    for rank, country, value in read_category(path, schema):
+        names.append(country)
+        ranks.append(rank)
+        values.append(value)
+    read_wall, read_cpu = time.perf_counter(), time.thread_time()
+    resolution = resolver.resolve_many(names)
+    kept, first, duplicates = [], {}, {}
+    for i, name in enumerate(resolution.names):
+        if name is None:
+            continue
+        if name in first:
+            duplicates.setdefault(name, [names[first[name]]]).append(names[i])
+            continue
+        first[name] = i
+        kept.append(i)
+    result = {
+        "countries": [resolution.names[i] for i in kept],
+        "ranks": [ranks[i] for i in kept],
+        "values": [values[i] for i in kept],
+        "unresolved": resolution.unresolved,
+        "duplicates": duplicates,
+    }
+    if profile:
+        result["profile"] = {
+            "read": {"wall": read_wall - wall, "cpu": read_cpu - cpu,
+                     "bytes": path.stat().st_size, "rows_out": len(names)},
+            "resolve": {"wall": time.perf_counter() - read_wall, "cpu": time.thread_time() - read_cpu,
+                        "rows_in": len(names), "rows_out": len(kept),
+                        "unresolved": sum(resolution.unresolved.values()),
+                        "duplicates": sum(len(rows) - 1 for rows in duplicates.values()),
+                        "fuzzy": len(resolution.fuzzy), "distinct_names": len(set(names)),
+                        "memo_hits": resolution.memo_hits},
+        }
+    return result
+
+
+class CategoryNode:
+    """Nœud feuille : un fichier de catégorie -> une colonne de Rankings.csv"""
+
+    def __init__(self, schema, path, resolver):
+        self.schema = schema
+        self.column = schema.column
+        self.path = path
+        self.resolver = resolver
+
+    def fingerprint(self, previous, config):
+        """Retourne (clé de cache, signature stat) du nœud
+
+        Le contenu n'est re-hashé que si la taille ou la date du fichier a changé
+        depuis le build précédent.
+        """
+        signature = _stat_signature(self.path)
+        if (previous and previous.get("stat") == signature and previous.get("config") == config
+                and previous.get("schema") == self.schema.fingerprint()):
+            return previous["key"], signature
+        key = _sha256(config.encode("ascii") + self.schema.fingerprint().encode("utf-8")
+                      + self.path.read_bytes())
+        return key, signature
+
+    def compute(self, profile=False):
+        return parse_category(self.path, self.schema, self.resolver, profile)
+
+
+_worker_resolver = None
+
+
+def _init_worker(resolver):
+    # Chaque processus worker reçoit une copie du résolveur (mémo en lecture seule)
+    global _worker_resolver
+    _worker_resolver = resolver
+
+
+def _compute_in_worker(path, schema, profile=False):
+    return parse_category(path, schema, _worker_resolver, profile)
+
+
+def compute_nodes(nodes, jobs=None, executor="thread", profile=False):
+    """Recalcule des nœuds sur un pool borné à `jobs` workers
+
+    Retourne {colonne: sortie du nœud ou exception} : l'échec d'un fichier
+    n'interrompt pas les autres. L'ordre de fin des workers n'a pas
+    d'influence, les résultats sont indexés par colonne. L'exécuteur
+    "inline" calcule les nœuds un à un dans le thread appelant (profilage).
+    """
+    if executor == "inline":
+        results = {}
+        for node in nodes:
+            try:
+                results[node.column] = node.compute(profile)
+            except Exception as exc:
+                results[node.column] = exc
+        return results
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+    if executor == "process":
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(nodes[0].resolver,))
+    elif executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=jobs)
+    else:
+        raise ValueError(f"Exécuteur inconnu : {executor!r}")
+
+    results = {}
+    with pool:
+        if executor == "process":
+            futures = {pool.submit(_compute_in_worker, node.path, node.schema, profile): node
+                       for node in nodes}
+        else:
+            futures = {pool.submit(node.compute, profile): node for node in nodes}
+        for future in as_completed(futures):
+            node = futures[future]
+            try:
+                results[node.column] = future.result()
+            except Exception as exc:
+                results[node.column] = exc
+    return results
+
+
+class NodeCache:
+    """Cache disque des sorties de nœuds, indexé par clé de contenu"""
+
+    def __init__(self, cache_dir):
+        self.dir = cache_dir / "nodes"
+
+    def _path(self, key):
+        return self.dir / f"{key}.json"
+
+    def __contains__(self, key):
+        return self._path(key).exists()
+
+    def get(self, key):
+        with open(self._path(key), encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, key, column):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(key).with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            # dumps et non dump : seul l'encodeur en un bloc est accéléré en C
+            f.write(json.dumps(column, ensure_ascii=False))
+        os.replace(tmp, self._path(key))
+
+
+class BuildReport:
+    """Résumé d'un build : nœuds recalculés, relus depuis le cache, absents"""
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.binary_path = output_path.with_suffix(".bin")
+        self.values_path = values_path(output_path)
+        self.up_to_date = False
+        self.computed = []
+        self.cached = []
+        self.missing = []
+        # Catégorie -> message d'erreur des fichiers qui n'ont pas pu être lus
+        self.failed = {}
+        # Catégorie -> {nom brut: occurrences} des noms de pays non résolus
+        self.unresolved = {}
+        # Catégorie -> {pays: noms bruts} des pays désignés par plusieurs lignes
+        self.duplicates = {}
+        self.countries = 0
+        # Numéro de la version ajoutée à l'historique (None si matrice inchangée)
+        self.version = None
+        self.bundle_path = None
+        # Moteur de fusion utilisé ("compact" ou "numpy")
+        self.engine = None
+        # Partitions de la fusion hors mémoire (None pour la fusion en mémoire)
+        self.partitions = None
+
+
+def _load_state(cache_dir):
+    try:
+        with open(cache_dir / STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(cache_dir, state):
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cache_dir / (STATE_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, cache_dir / STATE_FILE)
+
+
+def _recorded(previous, directory, filename):
+    """Vrai si l'artefact enregistré par le build précédent dans `directory` est toujours là, inchangé
+
+    Sans `directory` (artefact non demandé), rien n'est exigé.
+    """
+    if directory is None:
+        return True
+    path = directory / filename
+    return (bool(previous) and previous.get("dir") == str(directory) and path.exists()
+            and previous.get("stat") == _stat_signature(path))
+
+
+def values_path(output_path):
+    """Matrice de valeurs publiée à côté de Rankings.csv (Rankings.values.bin)"""
+    return output_path.with_suffix(".values.bin")
+
+
+def choose_engine(engine, input_bytes):
+    """Moteur de fusion : "compact" pour les petites entrées, "numpy" sinon"""
+    if engine not in ENGINES:
+        raise ValueError(f"Moteur inconnu : {engine!r}")
+    if engine == "auto":
+        return "compact" if input_bytes <= COMPACT_MAX_BYTES else "numpy"
+    return engine
+
+
+def category_nodes(resolver, category_dir=CATEGORY_DIR, schemas=schemas):
+    """Nœuds feuilles du graphe, dans l'ordre des colonnes de sortie"""
+    return [
+        CategoryNode(schema, category_dir / schema.filename, resolver)
+        for schema in schemas
+    ]
+
+
+def build(output_path=RANKINGS_PATH, category_dir=CATEGORY_DIR, cache_dir=CACHE_DIR,
+          force=False, jobs=None, executor="auto", history_dir=HISTORY_DIR,
+          bundle_dir=BUNDLE_DIR, profiler=None, schemas=schemas, resolver=None, engine="auto",
+          merge="memory", memory_limit=None):
+    """Reconstruit Rankings.csv (et Rankings.bin) en ne recalculant que les nœuds modifiés
+
+    Les nœuds à recalculer sont répartis sur `jobs` threads ou processus
+    (`executor`) ; "auto" les calcule sur place pour un petit build, sur des
+    threads sinon. Un fichier en erreur est signalé dans le rapport ; sa
+    colonne garde la dernière version valide du cache, ou reste vide.
+    Chaque matrice produite est ajoutée à l'historique de `history_dir`
+    (None pour ne rien enregistrer) et publiée comme bundle statique du
+    client dans `bundle_dir` (None pour ne pas en produire). Les étapes sont
+    mesurées par `profiler` (cf. rankings.profiling). `schemas` et `resolver`
+    remplacent les catégories et le référentiel de pays (jeux synthétiques).
+    `engine` choisit le moteur de fusion (cf. `choose_engine`).
+
+    Avec `merge="chunked"`, les colonnes sont fusionnées hors mémoire par
+    partitions d'au plus `memory_limit` octets (cf. rankings.partition) et les
+    nœuds recalculés par lots de `jobs` : seuls Rankings.csv et Rankings.bin
+    sont publiés, sans valeurs, historique ni bundle (propres au jeu).
+    """
+    if merge not in MERGES:
+        raise ValueError(f"Mode de fusion inconnu : {merge!r}")
+    chunked = merge == "chunked"
+    if chunked:
+        history_dir = bundle_dir = None
+    profiler = profiler or disabled("build")
+    report = BuildReport(output_path)
+    binary_path = output_path.with_suffix(".bin")
+    value_path = values_path(output_path)
+
+    with profiler.stage("scan") as stage:
+        state = {} if force else _load_state(cache_dir)
+        previous_nodes = state.get("nodes", {})
+        if resolver is None:
+            resolver = CountryResolver(memo_path=cache_dir / RESOLVER_MEMO)
+        config = config_key(resolver)
+        cache = NodeCache(cache_dir)
+
+        nodes, keys, node_state = [], {}, {}
+        input_bytes = 0
+        for node in category_nodes(resolver, category_dir, schemas):
+            if not node.path.exists():
+                report.missing.append(node.column)
+                continue
+            previous = previous_nodes.get(node.column)
+            key, signature = node.fingerprint(previous, config)
+            stage.record(files=1, stat_hits=int(bool(previous) and previous.get("stat") == signature))
+            input_bytes += signature[0]
+            nodes.append(node)
+            keys[node.column] = key
+            node_state[node.column] = {"file": node.path.name, "stat": signature, "config": config,
+                                       "schema": node.schema.fingerprint(), "key": key}
+        stage.record(missing=len(report.missing), input_bytes=input_bytes)
+        report.engine = choose_engine(engine, input_bytes)
+
+        order = [schema.column for schema in schemas]
+        # La fusion hors mémoire ne publie ni valeurs, ni historique, ni bundle : le mode fait partie de la clé
+        output_key = _sha256(json.dumps([str(output_path), order, merge, sorted(keys.items())]).encode("utf-8"))
+        previous_output = state.get("output", {})
+        if (not force and previous_output.get("key") == output_key
+                and output_path.exists() and binary_path.exists()
+                and previous_output.get("stat") == _stat_signature(output_path)
+                and previous_output.get("binary_stat") == _stat_signature(binary_path)
+                and (chunked or (value_path.exists()
+                                 and previous_output.get("values_stat") == _stat_signature(value_path)))
+                and _recorded(previous_output.get("bundle"), bundle_dir, MANIFEST)
+                # Un build sans historique (--no-history) n'a pas enregistré cette matrice
+                and _recorded(previous_output.get("history"), history_dir, VERSIONS)):
+            report.up_to_date = True
+            report.cached = [node.column for node in nodes]
+            report.countries = previous_output.get("countries", 0)
+            report.unresolved = previous_output.get("unresolved", {})
+            report.duplicates = previous_output.get("duplicates", {})
+            stage.record(up_to_date=1)
+            return report
+
+    # Les nœuds indépendants sont recalculés en parallèle
+    dirty = [node for node in nodes if force or keys[node.column] not in cache]
+    if profiler.enabled and profiler.hot_stage == "compute":
+        # cProfile ne suit que le thread courant
+        executor = "inline"
+    elif executor == "auto":
+        # Quelques petits fichiers : un pool coûte plus cher (imports, threads) qu'il ne rapporte
+        executor = "inline" if report.engine == "compact" else "thread"
+    # Hors mémoire, les sorties de nœuds ne sont gardées que le temps d'un lot
+    batch_size = max(1, jobs or os.cpu_count() or 1) if chunked else max(1, len(dirty))
+    for start in range(0, len(dirty), batch_size):
+        batch = dirty[start:start + batch_size]
+        with profiler.stage("compute") as stage:
+            results = compute_nodes(batch, jobs, executor, profile=profiler.enabled)
+            stage.record(nodes=len(batch))
+        with profiler.stage("cache") as stage:
+            for node in batch:
+                result = results.pop(node.column)
+                if isinstance(result, Exception):
+                    report.failed[node.column] = f"{type(result).__name__}: {result}"
+                    # Le nœud sera retenté au prochain build ; en attendant, dernière version valide
+                    previous = previous_nodes.get(node.column)
+                    del node_state[node.column]
+                    if previous and previous["key"] in cache:
+                        keys[node.column] = previous["key"]
+                        node_state[node.column] = previous
+                    else:
+                        del keys[node.column]
+                    continue
+                for name, measures in result.pop("profile", {}).items():
+                    profiler.add(name, **measures)
+                cache.put(keys[node.column], result)
+                report.computed.append(node.column)
+    with profiler.stage("cache") as stage:
+        nodes = [node for node in nodes if node.column in keys]
+        report.cached = [node.column for node in nodes if node.column not in report.computed]
+        # Les colonnes (recalculées ou issues du cache) sont fusionnées dans la matrice ;
+        # hors mémoire, elles sont relues une à une pendant la fusion
+        columns = {} if chunked else {node.column: cache.get(keys[node.column]) for node in nodes}
+        stage.record(hits=len(report.cached), misses=len(report.computed), failed=len(report.failed))
+
+    # Historique et bundle publiés (dossier, stat du journal ou du manifeste, empreinte de la matrice)
+    history = bundle = None
+    if chunked:
+        from .partition import MEMORY_LIMIT, merge_partitioned, partition_count
+
+        def stream():
+            for node in nodes:
+                data = cache.get(keys[node.column])
+                if data["unresolved"]:
+                    report.unresolved[node.column] = data["unresolved"]
+                if data["duplicates"]:
+                    report.duplicates[node.column] = data["duplicates"]
+                yield node.column, data
+
+        with profiler.stage("merge") as stage:
+            report.partitions = partition_count(input_bytes, memory_limit or MEMORY_LIMIT)
+            rows_in, report.countries = merge_partitioned(stream(), schemas, output_path, binary_path,
+                                                          cache_dir / "spill", report.partitions,
+                                                          country_order=resolver.countries)
+            stage.record(rows_in=rows_in, rows_out=report.countries, partitions=report.partitions,
+                         unresolved=sum(sum(names.values()) for names in report.unresolved.values()))
+        with profiler.stage("write") as stage:
+            resolver.save()
+            stage.record(rows_out=report.countries,
+                         bytes=sum(path.stat().st_size for path in (output_path, binary_path)))
+    else:
+        with profiler.stage("merge") as stage:
+            report.unresolved = {column: data["unresolved"] for column, data in columns.items()
+                                 if data["unresolved"]}
+            report.duplicates = {column: data["duplicates"] for column, data in columns.items()
+                                 if data["duplicates"]}
+            if report.engine == "numpy":
+                from .values import ValueMatrix as value_class
+            else:
+                value_class = CompactValues
+            # Rangs recalculés à partir des valeurs, selon le sens et les égalités de chaque schéma
+            values = value_class.from_columns(
+                {column: (data["countries"], data["ranks"], data["values"]) for column, data in columns.items()},
+                schemas, country_order=resolver.countries,
+            )
+            matrix = values.rank_matrix()
+            report.countries = len(matrix.countries)
+            stage.record(rows_in=sum(len(data["countries"]) for data in columns.values()),
+                         rows_out=report.countries, columns=len(matrix.categories),
+                         unresolved=sum(sum(names.values()) for names in report.unresolved.values()))
+
+        with profiler.stage("write") as stage:
+            matrix.to_csv(output_path)
+            write_binary(matrix, binary_path)
+            write_values(values, value_path)
+            resolver.save()
+            stage.record(rows_out=report.countries, bytes=sum(path.stat().st_size
+                                                              for path in (output_path, binary_path, value_path)))
+        if history_dir is not None:
+            with profiler.stage("history") as stage:
+                report.version = RankingHistory(history_dir).append(matrix)
+                # Matrice enregistrée (nouvelle version ou identique à la dernière)
+                history = {"dir": str(history_dir), "stat": _stat_signature(history_dir / VERSIONS),
+                           "fingerprint": matrix.fingerprint()}
+                stage.record(versions=int(report.version is not None))
+        if bundle_dir is not None:
+            with profiler.stage("bundle") as stage:
+                report.bundle_path = write_bundle(matrix, bundle_dir)
+                bundle = {"dir": str(bundle_dir), "stat": _stat_signature(bundle_dir / MANIFEST),
+                          "fingerprint": matrix.fingerprint()}
+                stage.record(bytes=report.bundle_path.stat().st_size)
+
+    _save_state(cache_dir, {
+        "nodes": node_state,
+        # Après un échec, le prochain build ne doit pas se croire à jour
+        "output": {"key": None if report.failed else output_key, "stat": _stat_signature(output_path),
+                   "binary_stat": _stat_signature(binary_path),
+                   "values_stat": None if chunked else _stat_signature(value_path),
+                   "countries": report.countries, "unresolved": report.unresolved,
+                   "duplicates": report.duplicates, "history": history, "bundle": bundle},
+    })
+    return report
@@ -0,0 +1,106 @@
+"""Bundles statiques des classements pour le client du jeu
+
+La page de jeu lit toute la table `rankings` puis cherche chaque pays par
+`find` et rescanne toutes les lignes pour `calculateTheoreticalBest`. Le
+build produit à la place un fichier JSON unique, nommé d'après le hash de son
+contenu (donc cacheable indéfiniment), qui contient directement :
+
+    countries   noms des pays, dans l'ordre des lignes
+    index       pays -> ligne
+    categories  clés des catégories (colonnes de la table `rankings`)
+    ranks       catégorie -> rangs de toutes les lignes (null si pas de classement)
+    best        catégorie -> lignes classées, du meilleur au moins bon rang
+    min         catégorie -> meilleur rang
+    min_cost    catégorie -> plus petit coût d'une case, une case NULL coûtant
+                NULL_COST comme dans le jeu et le solveur (borne du meilleur score)
+
+Le fichier `manifest.json` (non haché, à servir sans cache) désigne le bundle
+courant. Des versions précompressées .gz et, si le module `brotli` est
+installé, .br sont écrites à côté.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+from .categories import BUNDLE_DIR, db_columns
+from .compact import NULL_COST, NULL_RANK
+
+# 2 : ajout de min_cost
+BUNDLE_FORMAT = 2
+MANIFEST = "manifest.json"
+# Bundles précédents conservés pour les clients qui ont encore l'ancien manifeste
+KEEP_BUNDLES = 3
+
+
+def bundle_data(matrix):
+    """Contenu du bundle pour une matrice (RankMatrix ou CompactMatrix)"""
+    categories = [db_columns.get(category, category) for category in matrix.categories]
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "fingerprint": matrix.fingerprint(),
+        "countries": matrix.countries,
+        "index": {country: row for row, country in enumerate(matrix.countries)},
+        "categories": categories,
+        "ranks": {},
+        "best": {},
+        "min": {},
+        "min_cost": {},
+    }
+    for key, values in zip(categories, matrix.rank_columns()):
+        # Tri stable : à rang égal, l'ordre des lignes est conservé
+        order = sorted((row for row, rank in enumerate(values) if rank != NULL_RANK), key=values.__getitem__)
+        bundle["ranks"][key] = [None if rank == NULL_RANK else rank for rank in values]
+        bundle["best"][key] = order
+        bundle["min"][key] = values[order[0]] if order else None
+        bundle["min_cost"][key] = min(NULL_COST if rank == NULL_RANK else rank for rank in values) if values else None
+    return bundle
+
+
+def _write(path, data):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_bundle(matrix, directory=BUNDLE_DIR, compress=True):
+    """Écrit le bundle haché et le manifeste, retourne le chemin du bundle
+
+    Un bundle déjà présent (même contenu) n'est pas réécrit.
+    """
+    data = json.dumps(bundle_data(matrix), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"rankings.{digest[:12]}.json"
+    path = directory / name
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if not path.exists():
+        _write(path, data)
+    if compress:
+        if not path.with_name(name + ".gz").exists():
+            # mtime fixé : la sortie ne dépend que du contenu
+            _write(path.with_name(name + ".gz"), gzip.compress(data, compresslevel=9, mtime=0))
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+        if brotli is not None and not path.with_name(name + ".br").exists():
+            _write(path.with_name(name + ".br"), brotli.compress(data, quality=11))
+
+    try:
+        with open(directory / MANIFEST, encoding="utf-8") as f:
+            previous = json.load(f).get("bundles", [])
+    except (OSError, ValueError):
+        previous = []
+    bundles = [name] + [bundle for bundle in previous if bundle != name][:KEEP_BUNDLES - 1]
+    manifest = {"format": BUNDLE_FORMAT, "bundle": name, "sha256": digest,
+                "fingerprint": matrix.fingerprint(), "size": len(data), "bundles": bundles}
+    _write(directory / MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8"))
+
+    # Nettoyage des bundles qui ne sont plus référencés
+    for stale in directory.glob("rankings.*.json*"):
+        if stale.name.split(".json")[0] + ".json" not in bundles:
+            stale.unlink()
+    return path
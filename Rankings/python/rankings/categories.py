@@ -0,0 +1,102 @@
+"""Catégories publiées dans Rankings.csv et fichiers sources associés"""
+
+import json
+from pathlib import Path
+
+# Dossiers de données (relatifs au dépôt, plus de chemins codés en dur)
+DATA_DIR = Path(__file__).resolve().parents[2] / "Data"
+CATEGORY_DIR = DATA_DIR / "Category"
+RANKINGS_PATH = DATA_DIR / "Rankings.csv"
+CACHE_DIR = DATA_DIR / ".cache"
+HISTORY_DIR = DATA_DIR / "History"
+# Servi tel quel par le client SvelteKit (/rankings/manifest.json)
+BUNDLE_DIR = DATA_DIR.parents[1] / "game-geozone" / "static" / "rankings"
+
+
+class CategorySchema:
+    """Description déclarative d'un fichier de catégorie
+
+    `header` indique si la première ligne est un en-tête, `value` le type de la
+    colonne de valeur éventuelle (None, "decimal" ou "date", cf.
+    rankings.reader) et les `*_field` la position des champs dans une ligne.
+    `direction` dit si la plus petite ("asc") ou la plus grande ("desc") valeur
+    est classée première, `ties` comment classer les valeurs égales (cf.
+    rankings.values) ; sans colonne de valeur, le rang source fait office de
+    valeur.
+    """
+
+    def __init__(self, column, filename, header=True, value=None, direction="asc", ties="min",
+                 rank_field=0, country_field=1, value_field=2, encoding="utf-8"):
+        self.column = column
+        self.filename = filename
+        self.header = header
+        self.value = value
+        self.direction = direction
+        self.ties = ties
+        self.rank_field = rank_field
+        self.country_field = country_field
+        self.value_field = value_field
+        self.encoding = encoding
+
+    def fingerprint(self):
+        """Représentation stable du schéma, prise en compte dans les clés de cache"""
+        return json.dumps(vars(self), sort_keys=True, ensure_ascii=False)
+
+    def __repr__(self):
+        return f"CategorySchema({self.column!r}, {self.filename!r})"
+
+
+# Catégories de Rankings.csv, dans l'ordre des colonnes du fichier de sortie
+# (et de la table `rankings`). Un nouveau fichier ne demande qu'une entrée ici.
+schemas = [
+    CategorySchema("Alcohol", "Alcohol.csv"),
+    CategorySchema("Army", "Army.csv"),
+    CategorySchema("Capital City - Numeric", "Capital City - Numeric.csv"),
+    CategorySchema("Capital City - Ratio", "Capital City - Ratio.csv"),
+    CategorySchema("Chinese diaspora", "Chinese diaspora.csv"),
+    CategorySchema("Low density", "Density.csv"),
+    CategorySchema("EEZ", "EEZ.csv"),
+    CategorySchema("FIFA", "FIFA.csv"),
+    CategorySchema("Homicide rate", "Homicide rate.csv"),
+    CategorySchema("HDI", "IDH.csv"),
+    CategorySchema("Individual GDP", "Individual GDP.csv"),
+    CategorySchema("Life expectancy", "Life expentancy.csv"),
+    CategorySchema("Obesity", "Obesity.csv"),
+    CategorySchema("Olympics", "Olympics.csv"),
+    CategorySchema("Superficy (asc)", "Superficy (asc).csv"),
+    # Fichiers à valeurs : leurs rangs départagent déjà les valeurs égales
+    # (Guyana 3, Uruguay 4 à 24,8 en Suicide rate), comme dans Rankings.csv
+    # Pas d'en-tête : la première ligne est vide (",,")
+    CategorySchema("Median age", "Median age.csv", header=False, value="decimal", ties="ordinal"),
+    # Dates en texte libre ("1er août 1291", "26/07/1139", "-221", notes "[notes 2]")
+    CategorySchema("Sovereignty", "Sovereignty.csv", value="date", ties="ordinal"),
+    CategorySchema("Suicide rate", "Suicide rate.csv", value="decimal", direction="desc", ties="ordinal"),
+    CategorySchema("Forest", "Forest.csv", value="decimal", direction="desc", ties="ordinal"),
+]
+
+# Colonne de Rankings.csv -> schéma / fichier source dans Data/Category
+schema_by_column = {schema.column: schema for schema in schemas}
+files = {schema.column: schema.filename for schema in schemas}
+
+# Colonne de Rankings.csv -> colonne de la table `rankings` (cf. game-geozone/scripts/loadData.js)
+db_columns = {
+    "Alcohol": "alcohol",
+    "Army": "army",
+    "Capital City - Numeric": "capital_city_numeric",
+    "Capital City - Ratio": "capital_city_ratio",
+    "Chinese diaspora": "chinese_diaspora",
+    "Low density": "low_density",
+    "EEZ": "eez",
+    "FIFA": "fifa",
+    "Homicide rate": "homicide_rate",
+    "HDI": "hdi",
+    "Individual GDP": "individual_gdp",
+    "Life expectancy": "life_expectancy",
+    "Obesity": "obesity",
+    "Olympics": "olympics",
+    "Superficy (asc)": "superficy_asc",
+    "Median age": "median_age",
+    "Sovereignty": "sovereignty",
+    "Suicide rate": "suicide_rate",
+    "Forest": "forest",
+}
@@ -0,0 +1,350 @@
+"""Codec binaire des parties : enregistrements de taille fixe et archives en colonnes
+
+Une ligne de `games` répète en JSON les noms des catégories, des pays et leurs
+classements : plusieurs centaines d'octets pour GAME_SIZE paires (catégorie,
+pays). Le codec les remplace par les identifiants internés du build (ceux de
+rankings.history, stables d'une version à l'autre, ou à défaut les positions
+de la matrice) dans un enregistrement RECORD de 101 octets :
+
+    id, user_id                 UUID sur 16 octets
+    created_at, completed_at    microsecondes depuis l'époque (UTC), NO_TIME si absent
+    score                       int32
+    flags                       bit 0 : won
+    categories                  identifiants uint16, dans l'ordre de categories_used
+    countries                   identifiants uint16 des pays placés
+    rankings                    classements déclarés int16 (NULL_RANK pour NULL)
+
+Un nom absent des tables (pays ou catégorie ajouté depuis le build) est interné
+à la suite. Les catégories sont décodées sous leur nom de colonne de la base,
+celui qu'écrit le jeu. Une partie qui ne tient pas dans un enregistrement
+(identifiant non UUID, nombre de catégories, classement hors int16...) est
+rejetée avec sa raison et reste à conserver en JSON.
+
+Archive en colonnes (ARCHIVE_SUFFIX), petit-boutiste :
+
+    en-tête   ARCHIVE_HEADER (magic, version, GAME_SIZE)
+    blocs     BLOCK (nombre de parties) puis chaque champ de RECORD, contigu
+    pied      JSON (tables de noms, nombre de parties, offsets des blocs),
+              puis FOOTER (taille du JSON, magic)
+
+Les tables sont dans le pied : l'archive s'écrit bloc par bloc pendant que de
+nouveaux noms sont internés, et se décode sans matrice. Un lecteur qui ne veut
+que quelques champs (scores, joueurs) ne lit que leurs octets.
+"""
+
+import json
+import os
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from .categories import db_columns
+from .games import GAME_SIZE, GameArrays
+from .matrix import NULL_RANK
+
+ARCHIVE_SUFFIX = ".games"
+ARCHIVE_MAGIC = b"GZGA"
+ARCHIVE_VERSION = 1
+# magic, version, cases par partie
+ARCHIVE_HEADER = struct.Struct("<4sHH")
+BLOCK = struct.Struct("<I")
+# taille du pied JSON, magic
+FOOTER = struct.Struct("<Q4s")
+BLOCK_GAMES = 65536
+NO_TIME = np.iinfo(np.int64).min
+WON = 1
+MAX_NAMES = 1 << 16
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_RANKING = (-(1 << 15), (1 << 15) - 1)
+_SCORE = (-(1 << 31), (1 << 31) - 1)
+_INT = {int}
+
+
+def record_dtype(size=GAME_SIZE):
+    """Enregistrement d'une partie de `size` catégories (101 octets pour 8)"""
+    return np.dtype([
+        ("id", "V16"), ("user_id", "V16"), ("created_at", "<i8"), ("completed_at", "<i8"),
+        ("score", "<i4"), ("flags", "u1"),
+        ("categories", "<u2", (size,)), ("countries", "<u2", (size,)), ("rankings", "<i2", (size,)),
+    ])
+
+
+RECORD = record_dtype()
+
+
+def micros(value):
+    """Date ISO 8601 -> microsecondes depuis l'époque (UTC) ; NO_TIME si absente"""
+    if value is None:
+        return NO_TIME
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def _iso(value):
+    return None if value == NO_TIME else (_EPOCH + value * _MICROSECOND).isoformat()
+
+
+def _uuid(raw):
+    return str(uuid.UUID(bytes=bytes(raw)))
+
+
+class DecodedColumn:
+    """Colonne binaire (UUID, dates) décodée case par case, à la demande"""
+
+    def __init__(self, values, decode):
+        self.values = values
+        self.decode = decode
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return self.decode(self.values[i])
+
+
+class GameCodec:
+    """Tables de noms internés (pays, catégories) et conversion parties <-> enregistrements"""
+
+    def __init__(self, countries=(), categories=(), size=GAME_SIZE):
+        self.size = size
+        self.dtype = record_dtype(size)
+        self.countries, self.categories = [], []
+        self._country_ids, self._category_ids = {}, {}
+        for name in countries:
+            self._intern(name, self.countries, self._country_ids)
+        for name in categories:
+            self._intern(name, self.categories, self._category_ids)
+
+    @classmethod
+    def for_build(cls, source, size=GAME_SIZE):
+        """Tables d'un build : RankingHistory (identifiants globaux) ou RankMatrix (positions)"""
+        codec = cls(source.countries, [db_columns.get(name, name) for name in source.categories], size)
+        # Les en-têtes CSV désignent les mêmes catégories que les colonnes de la base
+        for name in source.categories:
+            codec._category_ids.setdefault(name, codec._category_ids[db_columns.get(name, name)])
+        return codec
+
+    @staticmethod
+    def _intern(name, table, index):
+        found = index.get(name)
+        if found is None:
+            if not isinstance(name, str):
+                raise ValueError(f"nom invalide {name!r}")
+            if len(table) >= MAX_NAMES:
+                raise ValueError(f"plus de {MAX_NAMES} noms à interner")
+            found = index[name] = len(table)
+            table.append(name)
+        return found
+
+    def encode(self, games):
+        """Enregistrements des parties exportées ; retourne (records, [(id, raison) des rejetées])"""
+        size, intern = self.size, self._intern
+        countries, country_ids = self.countries, self._country_ids
+        categories, category_ids = self.categories, self._category_ids
+        rows, rejected = [], []
+        for game in games:
+            try:
+                used = game["categories_used"]
+                selections = game["country_selections"]
+                if isinstance(selections, str):
+                    selections = json.loads(selections)
+                if len(used) != size:
+                    raise ValueError(f"{len(used)} catégories au lieu de {size}")
+                chosen = [selections[name] for name in used]
+                rankings = [NULL_RANK if selection["ranking"] is None else selection["ranking"] for selection in chosen]
+                if set(map(type, rankings)) != _INT or min(rankings) < _RANKING[0] or max(rankings) > _RANKING[1]:
+                    raise ValueError("classement non entier ou hors int16")
+                score = game["score"]
+                if type(score) is not int or not _SCORE[0] <= score <= _SCORE[1]:
+                    raise ValueError(f"score invalide {score!r}")
+                row = (uuid.UUID(game["id"]).bytes, uuid.UUID(game["user_id"]).bytes,
+                       micros(game.get("created_at")), micros(game.get("completed_at")),
+                       score, WON if game.get("won") else 0)
+                names = [selection["country"] for selection in chosen]
+                try:
+                    row += ([category_ids[name] for name in used], [country_ids[name] for name in names], rankings)
+                except (KeyError, TypeError):
+                    row += ([intern(name, categories, category_ids) for name in used],
+                            [intern(name, countries, country_ids) for name in names], rankings)
+                rows.append(row)
+            except KeyError as exc:
+                rejected.append((game.get("id"), f"champ ou sélection manquant {exc.args[0]!r}"))
+            except (TypeError, ValueError, AttributeError, OverflowError) as exc:
+                rejected.append((game.get("id"), str(exc) or type(exc).__name__))
+        return np.array(rows, dtype=self.dtype), rejected
+
+    def decode(self, records):
+        """Parties au format JSON de la table `games`, à partir d'enregistrements"""
+        categories = np.array(self.categories, dtype=object)[records["categories"]].tolist()
+        countries = np.array(self.countries, dtype=object)[records["countries"]].tolist()
+        rankings = records["rankings"].tolist()
+        games = []
+        for i, record in enumerate(records.tolist()):
+            raw_id, raw_user, created, completed, score, flags = record[:6]
+            games.append({
+                "id": _uuid(raw_id),
+                "user_id": _uuid(raw_user),
+                "score": score,
+                "categories_used": categories[i],
+                "country_selections": {
+                    name: {"country": country, "ranking": None if rank == NULL_RANK else rank}
+                    for name, country, rank in zip(categories[i], countries[i], rankings[i])
+                },
+                "created_at": _iso(created),
+                "completed_at": _iso(completed),
+                "won": bool(flags & WON),
+            })
+        return games
+
+    def ids(self, records, field="id"):
+        """UUID d'un champ (`id` ou `user_id`), décodés à la demande"""
+        return DecodedColumn(records[field], _uuid)
+
+    def timestamps(self, records, field="created_at"):
+        """Dates ISO 8601 d'un champ, décodées à la demande"""
+        return DecodedColumn(records[field], lambda value: _iso(int(value)) or "")
+
+    def remap(self, matrix):
+        """(catégories, pays) : identifiant du codec -> colonne ou ligne de `matrix` (-1 si absent)"""
+        from .games import category_lookup
+
+        lookup = category_lookup(matrix)
+        categories = np.array([lookup.get(name, -1) for name in self.categories], dtype=np.intp)
+        countries = np.array([matrix.country_index.get(name, -1) for name in self.countries], dtype=np.intp)
+        return categories, countries
+
+    def to_game_arrays(self, records, matrix):
+        """GameArrays sur `matrix` (cf. rankings.games), sans repasser par les noms"""
+        categories, countries = self.remap(matrix)
+        categories, countries = categories[records["categories"]], countries[records["countries"]]
+        known = (categories >= 0).all(axis=1) & (countries >= 0).all(axis=1)
+        ids = self.ids(records)
+        rejected = [(ids[i], "catégorie ou pays absent de la matrice") for i in np.flatnonzero(~known).tolist()]
+        kept = records[known]
+        return GameArrays(
+            [ids[i] for i in np.flatnonzero(known).tolist()],
+            categories[known].astype(np.int16),
+            countries[known].astype(np.int16),
+            kept["score"].astype(np.int32),
+            (kept["flags"] & WON).astype(bool),
+            rejected,
+        )
+
+
+class ArchiveWriter:
+    """Archive en colonnes écrite bloc par bloc ; les tables du codec sont écrites à la fin"""
+
+    def __init__(self, path, codec):
+        self.path = path
+        self.codec = codec
+        self.games = 0
+        self._offsets = []
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = path.with_suffix(path.suffix + ".tmp")
+        self._file = open(self._tmp, "wb")
+        self._file.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, codec.size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self._file.closed:
+            self._file.close()
+            os.remove(self._tmp)
+
+    def add(self, records):
+        for start in range(0, len(records), BLOCK_GAMES):
+            block = records[start:start + BLOCK_GAMES]
+            self._offsets.append(self._file.tell())
+            self._file.write(BLOCK.pack(len(block)))
+            for field in self.codec.dtype.names:
+                self._file.write(np.ascontiguousarray(block[field]).tobytes())
+            self.games += len(block)
+
+    def close(self):
+        """Écrit le pied et publie l'archive (écriture atomique)"""
+        footer = json.dumps({"countries": self.codec.countries, "categories": self.codec.categories,
+                             "games": self.games, "blocks": self._offsets},
+                            ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._file.write(footer)
+        self._file.write(FOOTER.pack(len(footer), ARCHIVE_MAGIC))
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+
+def _read_footer(f, path):
+    header = f.read(ARCHIVE_HEADER.size)
+    if len(header) < ARCHIVE_HEADER.size:
+        raise ValueError(f"{path} : archive tronquée")
+    magic, version, size = ARCHIVE_HEADER.unpack(header)
+    if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+        raise ValueError(f"{path} : archive de parties invalide ou version non supportée")
+    f.seek(-FOOTER.size, os.SEEK_END)
+    length, magic = FOOTER.unpack(f.read(FOOTER.size))
+    if magic != ARCHIVE_MAGIC:
+        raise ValueError(f"{path} : archive incomplète")
+    f.seek(-FOOTER.size - length, os.SEEK_END)
+    footer = json.loads(f.read(length))
+    return GameCodec(footer["countries"], footer["categories"], size), footer
+
+
+def iter_archive(path, fields=None):
+    """(codec, itérateur de blocs d'enregistrements) ; `fields` limite les champs lus"""
+    f = open(path, "rb")
+    try:
+        codec, footer = _read_footer(f, path)
+    except BaseException:
+        f.close()
+        raise
+    names = list(codec.dtype.names)
+    wanted = names if fields is None else [name for name in names if name in fields]
+    dtype = np.dtype([(name, codec.dtype.fields[name][0]) for name in wanted])
+
+    def blocks():
+        with f:
+            for offset in footer["blocks"]:
+                f.seek(offset)
+                (count,) = BLOCK.unpack(f.read(BLOCK.size))
+                block = np.empty(count, dtype=dtype)
+                for name in names:
+                    width = codec.dtype.fields[name][0].itemsize * count
+                    if name in wanted:
+                        block[name] = np.frombuffer(f.read(width), dtype=dtype.fields[name][0], count=count)
+                    else:
+                        f.seek(width, os.SEEK_CUR)
+                yield block
+
+    return codec, blocks()
+
+
+def read_archive(path, fields=None):
+    """(codec, enregistrements) de toute l'archive"""
+    codec, blocks = iter_archive(path, fields)
+    parts = list(blocks)
+    return codec, np.concatenate(parts) if parts else np.empty(0, dtype=codec.dtype)
+
+
+def write_archive(path, games, codec, batch_size=BLOCK_GAMES):
+    """Encode un flux de parties dans une archive ; retourne (parties écrites, rejetées)"""
+    rejected = []
+    with ArchiveWriter(path, codec) as writer:
+        batch = []
+        for game in games:
+            batch.append(game)
+            if len(batch) == batch_size:
+                records, failed = codec.encode(batch)
+                writer.add(records)
+                rejected += failed
+                batch = []
+        if batch:
+            records, failed = codec.encode(batch)
+            writer.add(records)
+            rejected += failed
+        writer.close()
+        return writer.games, rejected
@@ -0,0 +1,299 @@
+"""Index de toutes les combinaisons de catégories, pour tirer un jeu à la demande
+
+`getRandomCategories` tire GAME_SIZE catégories au hasard ; certaines
+combinaisons sont pourtant bien plus faciles que d'autres, parce que des
+catégories corrélées (IDH, PIB par habitant, espérance de vie) se ressemblent.
+Ce travail hors ligne évalue les C(n, GAME_SIZE) combinaisons :
+
+    redundancy   moyenne des |ρ| de Spearman entre les catégories du jeu
+    nulls        cases NULL des catégories du jeu
+    complete     pays classés dans toutes les catégories du jeu
+    optimal      meilleur score atteignable moyen (et écart type) sur SAMPLES
+                 tirages de pays, les mêmes pour toutes les combinaisons
+
+Les corrélations entre catégories sont calculées en une passe matricielle,
+comme les distances entre pays de rankings.similarity (Pearson sur les
+centiles, restreint aux pays classés dans les deux catégories).
+
+Meilleurs scores : plutôt que de résoudre chaque combinaison, la
+programmation dynamique du solveur est faite une fois sur tous les
+sous-ensembles de catégories, couche par couche. Le meilleur placement des i
+premiers pays tirés dans un sous-ensemble T est le minimum, sur j de T, de
+celui de T \\ {j} plus le rang du i-ème pays dans j. Les sous-ensembles de
+chaque taille sont rangés dans l'ordre colexicographique, où le rang de
+T \\ {j} se calcule par une table de binomiaux : chaque couche n'est qu'une
+suite d'opérations NumPy sur tous les échantillons, et les combinaisons
+partagent le travail sur leurs sous-ensembles communs.
+
+Index : combinaisons triées par meilleur score moyen, réparties en tranches
+de difficulté de même effectif (0 = la plus facile), chaque tranche triée par
+redondance croissante. « Un jeu peu redondant de difficulté moyenne » : les
+bornes de la tranche en O(1), puis une recherche dichotomique sur la
+redondance, en O(log n).
+
+Disposition du fichier combos.bin (petit-boutiste) :
+
+    en-tête      HEADER (magic, version, taille de partie, tranches,
+                 combinaisons, dimensions et empreinte de la matrice, graine,
+                 échantillons, offset des combinaisons)
+    tranches     offsets (uint64, tranches + 1) puis meilleurs scores moyens
+                 min et max (float32)
+    combinaisons enregistrements COMBO_DTYPE contigus, alignés sur 64 octets,
+                 projetés en mémoire en lecture seule
+
+Comme seeds.bin, l'index n'est valable que pour la matrice dont l'empreinte
+est dans l'en-tête.
+"""
+
+import math
+import os
+import struct
+
+import numpy as np
+
+from .compact import NULL_COST, NULL_RANK
+from .similarity import MIN_COMMON, distances, percentiles
+from .simulate import GAME_SIZE, draw_countries
+
+MAGIC = b"GZCB"
+# 2 : meilleurs scores calculés avec NULL_COST (une case NULL compte 0)
+FORMAT_VERSION = 2
+BUCKETS = 10
+SAMPLES = 256
+# Au-delà, les tables de sous-ensembles ne tiennent plus confortablement en mémoire
+MAX_COMBINATIONS = 1 << 24
+# Cases (échantillons x combinaisons) d'un bloc de la programmation dynamique
+CHUNK_CELLS = 1 << 22
+RECORDS_ALIGNMENT = 64
+REDUNDANCY_LEVELS = ("low", "medium", "high")
+COMBO_DTYPE = np.dtype([("categories", "u1", (GAME_SIZE,)), ("optimal", "<f4"), ("optimal_std", "<f4"),
+                        ("redundancy", "<f4"), ("nulls", "<u4"), ("complete", "<u2")])
+# magic, version, taille de partie, tranches, combinaisons, nb pays, nb catégories,
+# empreinte de la matrice, graine, échantillons, offset des combinaisons
+HEADER = struct.Struct("<4sHHIQII16sQIQ")
+_POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint16)
+
+
+def correlations(matrix, min_common=MIN_COMMON):
+    """Corrélations de Spearman entre catégories (catégories x catégories), 0 si indéfinie"""
+    profile = percentiles(matrix.ranks).T
+    gaps = distances(profile, metric="spearman", min_common=min_common)
+    rho = np.where(np.isfinite(gaps), 1 - gaps, 0.0)
+    np.fill_diagonal(rho, 1.0)
+    return rho
+
+
+def subset_layers(n, size=GAME_SIZE):
+    """Sous-ensembles de range(n), de la taille 1 à `size`, en ordre colexicographique
+
+    Pour chaque taille i : (sous-ensembles (C(n, i), i) triés, rangs dans la
+    couche i - 1 du sous-ensemble privé de chacun de ses éléments). Dans l'ordre
+    colexicographique, les sous-ensembles dont tous les éléments sont < m sont
+    les C(m, i) premiers : la couche i est la concaténation, pour chaque
+    maximum m, du début de la couche i - 1 complété par m.
+    """
+    binomials = np.array([[math.comb(t, k) for k in range(size + 1)] for t in range(n)], dtype=np.int64)
+    layers = []
+    previous = np.empty((1, 0), dtype=np.intp)
+    for i in range(1, size + 1):
+        blocks = [np.column_stack((previous[:math.comb(m, i - 1)], np.full(math.comb(m, i - 1), m)))
+                  for m in range(i - 1, n)]
+        subsets = np.concatenate(blocks) if blocks else np.empty((0, i), dtype=np.intp)
+        positions = np.arange(i)
+        upper = binomials[subsets, positions + 1]
+        lower = binomials[subsets, positions]
+        # Sans l'élément p : ceux d'avant gardent leur place, ceux d'après reculent d'une
+        without = (np.cumsum(upper, axis=1) - upper) + (lower.sum(axis=1, keepdims=True) - np.cumsum(lower, axis=1))
+        layers.append((subsets, without.astype(np.intp)))
+        previous = subsets
+    return layers
+
+
+def optimal_statistics(matrix, layers, samples=SAMPLES, seed=None, null_cost=NULL_COST, chunk_cells=CHUNK_CELLS):
+    """Moyenne et écart type du meilleur score de chaque combinaison de la dernière couche
+
+    Tous les sous-ensembles voient les mêmes `samples` tirages de pays (sans
+    remise, comme `getRandomCountry`) : les écarts entre combinaisons ne
+    doivent rien au hasard des tirages.
+    """
+    size = len(layers)
+    ranks = np.asarray(matrix.ranks)
+    cost = ranks.astype(np.int32)
+    cost[ranks == NULL_RANK] = null_cost
+    rng = np.random.default_rng(seed)
+    draws = draw_countries(rng, len(matrix.countries), samples, size)
+    count = len(layers[-1][0])
+    total = np.zeros(count)
+    squares = np.zeros(count)
+    step = max(1, chunk_cells // max(count, 1))
+    for start in range(0, samples, step):
+        drawn = cost[draws[start:start + step]]
+        best = np.zeros((len(drawn), 1), dtype=np.int32)
+        for i, (subsets, without) in enumerate(layers):
+            # Le i-ème pays tiré prend l'une des catégories du sous-ensemble
+            row = drawn[:, i, :]
+            scores = None
+            for p in range(i + 1):
+                candidate = np.take(best, without[:, p], axis=1)
+                candidate += np.take(row, subsets[:, p], axis=1)
+                scores = candidate if scores is None else np.minimum(scores, candidate, out=scores)
+            best = scores
+        total += best.sum(axis=0)
+        squares += (best.astype(np.float64) ** 2).sum(axis=0)
+    mean = total / samples
+    return mean, np.sqrt(np.maximum(squares / samples - mean * mean, 0.0))
+
+
+class ComboIndex:
+    """Combinaisons triées par difficulté, puis par redondance dans chaque tranche"""
+
+    def __init__(self, records, offsets, fingerprint, shape, seed=0, samples=SAMPLES):
+        self.records = records
+        self.offsets = np.asarray(offsets, dtype=np.uint64)
+        self.fingerprint = fingerprint
+        self.shape = tuple(shape)
+        self.seed = seed
+        self.samples = samples
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def buckets(self):
+        return len(self.offsets) - 1
+
+    def bucket(self, difficulty):
+        """Combinaisons d'une tranche de difficulté (vue, sans copie)"""
+        if not 0 <= difficulty < self.buckets:
+            raise ValueError(f"Difficulté {difficulty} hors de 0..{self.buckets - 1}")
+        return self.records[int(self.offsets[difficulty]):int(self.offsets[difficulty + 1])]
+
+    def score_range(self, difficulty):
+        """Meilleurs scores moyens minimal et maximal d'une tranche"""
+        combos = self.bucket(difficulty)
+        if not len(combos):
+            return None, None
+        optimal = combos["optimal"]
+        return float(optimal.min()), float(optimal.max())
+
+    def pick(self, difficulty, redundancy=None, rng=None):
+        """Une combinaison au hasard dans la tranche
+
+        `redundancy` restreint le tirage : un niveau de REDUNDANCY_LEVELS (tiers
+        de la tranche, en O(1)) ou une redondance maximale (recherche
+        dichotomique, en O(log n)).
+        """
+        combos = self.bucket(difficulty)
+        low, high = 0, len(combos)
+        if redundancy in REDUNDANCY_LEVELS:
+            level = REDUNDANCY_LEVELS.index(redundancy)
+            low, high = level * high // len(REDUNDANCY_LEVELS), (level + 1) * high // len(REDUNDANCY_LEVELS)
+        elif redundancy is not None:
+            high = int(np.searchsorted(combos["redundancy"], redundancy, side="right"))
+        if high <= low:
+            raise LookupError(f"Aucune combinaison de difficulté {difficulty} pour la redondance {redundancy}")
+        rng = rng or np.random.default_rng()
+        return combos[low + int(rng.integers(high - low))]
+
+    def describe(self, combo, matrix):
+        """Combinaison lisible : catégories (clés de la table) et statistiques"""
+        from .categories import db_columns
+
+        if matrix.fingerprint() != self.fingerprint:
+            raise ValueError("L'index a été calculé pour une autre version de la matrice")
+        return {
+            "categories": [db_columns.get(matrix.categories[j], matrix.categories[j])
+                           for j in combo["categories"].tolist()],
+            "optimal_score": round(float(combo["optimal"]), 1),
+            "optimal_std": round(float(combo["optimal_std"]), 1),
+            "redundancy": round(float(combo["redundancy"]), 4),
+            "nulls": int(combo["nulls"]),
+            "complete": int(combo["complete"]),
+        }
+
+
+def build_index(matrix, samples=SAMPLES, buckets=BUCKETS, seed=None, size=GAME_SIZE):
+    """Évalue toutes les combinaisons de `size` catégories de `matrix` et retourne un ComboIndex"""
+    countries, n = matrix.shape
+    if not size <= n <= np.iinfo(np.uint8).max or countries < size:
+        raise ValueError(f"Matrice {matrix.shape} incompatible avec des jeux de {size} catégories")
+    if size != GAME_SIZE:
+        raise ValueError(f"Le format de l'index suppose des jeux de {GAME_SIZE} catégories")
+    if math.comb(n, size) > MAX_COMBINATIONS:
+        raise ValueError(f"C({n}, {size}) = {math.comb(n, size)} combinaisons, plus de {MAX_COMBINATIONS}")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2 ** 64)
+
+    layers = subset_layers(n, size)
+    combos = layers[-1][0]
+    records = np.empty(len(combos), dtype=COMBO_DTYPE)
+    records["categories"] = combos
+    records["optimal"], records["optimal_std"] = optimal_statistics(matrix, layers, samples, seed)
+
+    rho = np.abs(correlations(matrix))
+    pairs = [(a, b) for a in range(size) for b in range(a + 1, size)]
+    redundancy = np.zeros(len(combos))
+    for a, b in pairs:
+        redundancy += rho[combos[:, a], combos[:, b]]
+    records["redundancy"] = redundancy / len(pairs)
+
+    valid = np.asarray(matrix.ranks) != NULL_RANK
+    records["nulls"] = (countries - valid.sum(axis=0))[combos].sum(axis=1)
+    # Pays classés partout : ET des bits de validité des colonnes, puis comptage des bits
+    bits = np.packbits(valid, axis=0).T
+    complete = bits[combos[:, 0]]
+    for p in range(1, size):
+        complete &= bits[combos[:, p]]
+    records["complete"] = _POPCOUNT[complete].sum(axis=1)
+
+    # Tri par difficulté, tranches de même effectif, puis redondance croissante dans chaque tranche
+    records = records[np.argsort(records["optimal"], kind="stable")]
+    offsets = (np.arange(buckets + 1) * len(records)) // buckets
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        block = records[start:end]
+        records[start:end] = block[np.argsort(block["redundancy"], kind="stable")]
+    return ComboIndex(records, offsets, matrix.fingerprint(), matrix.shape, seed, samples)
+
+
+def write_index(index, path):
+    """Écrit l'index au format combos.bin (écriture atomique)"""
+    ranges = [index.score_range(d) for d in range(index.buckets)]
+    lows = np.array([-1 if low is None else low for low, _ in ranges], dtype="<f4")
+    highs = np.array([-1 if high is None else high for _, high in ranges], dtype="<f4")
+    table = index.offsets.astype("<u8").tobytes() + lows.tobytes() + highs.tobytes()
+    records_offset = HEADER.size + len(table)
+    records_offset += -records_offset % RECORDS_ALIGNMENT
+    rows, cols = index.shape
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, GAME_SIZE, index.buckets, len(index), rows, cols,
+                         bytes.fromhex(index.fingerprint), index.seed, index.samples, records_offset)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(table)
+        f.write(b"\0" * (records_offset - HEADER.size - len(table)))
+        f.write(np.ascontiguousarray(index.records).tobytes())
+    os.replace(tmp, path)
+
+
+def load_index(path):
+    """Ouvre combos.bin sans copie : les combinaisons sont un np.memmap en lecture seule"""
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} : fichier tronqué")
+        magic, version, size, buckets, count, rows, cols, digest, seed, samples, records_offset = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} : ce n'est pas un index de combinaisons")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} : version de format {version} non supportée")
+        if size != GAME_SIZE:
+            raise ValueError(f"{path} : jeux de {size} catégories, {GAME_SIZE} attendues")
+        offsets = np.frombuffer(f.read(8 * (buckets + 1)), dtype="<u8")
+
+    if count:
+        records = np.memmap(path, dtype=COMBO_DTYPE, mode="r", offset=records_offset, shape=(count,))
+    else:
+        records = np.empty(0, dtype=COMBO_DTYPE)
+    return ComboIndex(records, offsets, digest.hex(), (rows, cols), seed, samples)
@@ -0,0 +1,171 @@
+"""Moteur compact, sans NumPy, pour les petits builds
+
+Le jeu de données réel tient en quelques milliers de cases : importer NumPy
+coûte alors plus cher que tout le build. Ce moteur fait la même fusion et le
+même reclassement que rankings.values avec la bibliothèque standard seule :
+les rangs sont un `array('h')` à plat (pays x catégories, ordre C), les
+valeurs un `array('d')`. Les sorties (Rankings.csv, Rankings.bin, valeurs,
+historique, bundle, empreinte) sont identiques octet par octet à celles du
+moteur NumPy, choisi automatiquement au-delà de quelques mégaoctets de
+fichiers sources.
+"""
+
+import csv
+import hashlib
+import math
+import os
+import sys
+from array import array
+
+from .regions import region_bits, region_names
+
+# Sentinelle des cases sans classement ; rangs sur int16
+NULL = "NULL"
+NULL_RANK = -1
+MAX_RANK = 32767
+# Coût d'une case NULL dans un score : `calculateScore` du jeu additionne les rangs, un rang null compte 0
+NULL_COST = 0
+
+
+def little_endian(block):
+    """Octets petit-boutistes d'un `array` (formats binaires du dépôt)"""
+    if sys.byteorder == "big":
+        block = array(block.typecode, block)
+        block.byteswap()
+    return block.tobytes()
+
+
+def assign_ranks(ordered, tie):
+    """Rangs d'entrées triées dont le premier élément est la clé de tri, selon la règle `tie`"""
+    rank = dense = 0
+    previous = None
+    for position, entry in enumerate(ordered):
+        if tie == "ordinal" or entry[0] != previous:
+            rank = position + 1
+            dense += 1
+            previous = entry[0]
+        yield dense if tie == "dense" else rank
+
+
+class CompactMatrix:
+    """Rangs de chaque pays (lignes) dans chaque catégorie (colonnes), en `array('h')`
+
+    Même interface de lecture que RankMatrix pour le build (noms, empreinte,
+    écriture) ; `to_rank_matrix` en donne une vue NumPy sans copie.
+    """
+
+    def __init__(self, countries, categories, cells):
+        self.countries = list(countries)
+        self.categories = list(categories)
+        self.cells = cells
+        self._fingerprint = None
+
+    @property
+    def shape(self):
+        return len(self.countries), len(self.categories)
+
+    def rank_bytes(self):
+        return little_endian(self.cells)
+
+    def fingerprint(self):
+        """Même empreinte que RankMatrix.fingerprint pour le même contenu"""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update("\n".join(self.countries).encode("utf-8") + b"\0")
+            digest.update("\n".join(self.categories).encode("utf-8") + b"\0")
+            digest.update(self.rank_bytes())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def rank_columns(self):
+        """Rangs de chaque catégorie, en listes"""
+        width = len(self.categories)
+        return [self.cells[j::width].tolist() for j in range(width)]
+
+    def to_csv(self, path):
+        """Écrit la matrice au format Rankings.csv (écriture atomique)"""
+        width = len(self.categories)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["Country"] + self.categories)
+            for i, country in enumerate(self.countries):
+                writer.writerow([country] + [NULL if rank == NULL_RANK else rank
+                                             for rank in self.cells[i * width:(i + 1) * width]])
+        os.replace(tmp, path)
+
+    def to_rank_matrix(self):
+        """RankMatrix NumPy partageant les mêmes cases"""
+        import numpy as np
+
+        from .matrix import RANK_DTYPE, RankMatrix
+
+        matrix = RankMatrix(self.countries, self.categories,
+                            np.frombuffer(self.cells, dtype=RANK_DTYPE).reshape(self.shape))
+        matrix._fingerprint = self._fingerprint
+        return matrix
+
+
+class CompactValues:
+    """Valeurs des catégories et leur reclassement, sans NumPy (cf. rankings.values)"""
+
+    def __init__(self, countries, categories, values, source_ranks, descending, ties, regions=None):
+        self.countries = list(countries)
+        self.categories = list(categories)
+        self.values = values
+        self.source_ranks = source_ranks
+        self.descending = list(descending)
+        self.ties = list(ties)
+        self.regions = list(region_names if regions is None else regions)
+        self.bits = region_bits(self.countries, self.regions)
+
+    @classmethod
+    def from_columns(cls, columns, schemas, country_order=None):
+        """Même fusion que ValueMatrix.from_columns"""
+        categories = [schema.column for schema in schemas]
+        present = [name for name in categories if name in columns]
+        names = set()
+        for name in present:
+            names.update(columns[name][0])
+        if country_order is not None and names:
+            position = {name: i for i, name in enumerate(country_order)}
+            unknown = [name for name in sorted(names) if name not in position]
+            if unknown:
+                raise ValueError(f"Pays absents de l'ordre de référence : {unknown}")
+            countries = sorted(names, key=position.__getitem__)
+        else:
+            countries = sorted(names)
+
+        width = len(categories)
+        row_of = {name: i for i, name in enumerate(countries)}
+        values = array("d", [math.nan]) * (len(countries) * width)
+        source_ranks = array("h", [NULL_RANK]) * (len(countries) * width)
+        by_column = {schema.column: schema for schema in schemas}
+        for name in present:
+            j = categories.index(name)
+            has_value = by_column[name].value is not None
+            for country, rank, value in zip(*columns[name]):
+                if not 1 <= rank <= MAX_RANK:
+                    raise ValueError(f"Rang hors limites dans {name!r} (1..{MAX_RANK})")
+                cell = row_of[country] * width + j
+                source_ranks[cell] = rank
+                values[cell] = (math.nan if value is None else value) if has_value else rank
+        descending = [schema.value is not None and schema.direction == "desc" for schema in schemas]
+        return cls(countries, categories, values, source_ranks, descending, [schema.ties for schema in schemas])
+
+    def rank_matrix(self):
+        """CompactMatrix des rangs recalculés (mêmes règles que ValueMatrix.ranks)"""
+        width = len(self.categories)
+        cells = array("h", [NULL_RANK]) * len(self.source_ranks)
+        for j in range(width):
+            sign = -1.0 if self.descending[j] else 1.0
+            column = self.values[j::width]
+            sources = self.source_ranks[j::width]
+            ordered = sorted(((sign * value, sources[row], row) for row, value in enumerate(column)
+                              if not math.isnan(value)))
+            if len(ordered) > MAX_RANK:
+                raise ValueError(f"Plus de {MAX_RANK} pays classés dans une catégorie")
+            for (_, _, row), rank in zip(ordered, assign_ranks(ordered, self.ties[j])):
+                cells[row * width + j] = rank
+        return CompactMatrix(self.countries, self.categories, cells)
@@ -0,0 +1,504 @@
+"""Résolution des noms de pays vers la liste canonique du jeu
+
+Toutes les variantes connues (`country_mapping`) et les noms canoniques sont
+normalisés une seule fois au chargement (NFKD sans accents, casse repliée,
+ponctuation, "The" et "St") dans un index de hachage. Les noms inconnus
+passent ensuite par un index de trigrammes pour rattraper les fautes de
+frappe. Toute résolution est mémorisée, et le mémo peut être persisté entre
+deux builds. Un nom qui ne se résout pas n'est jamais ajouté comme nouveau
+pays : il est remonté comme non résolu.
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+# Pays du jeu, dans l'ordre de Rankings.csv (tri sans accents)
+canonical_countries = (
+    "Afghanistan", "Albania", "Algeria", "Andorra", "Angola", "Antigua and Barbuda",
+    "Argentina", "Armenia", "Australia", "Austria", "Azerbaijan", "Bahamas", "Bahrain",
+    "Bangladesh", "Barbados", "Belarus", "Belgium", "Belize", "Benin", "Bhutan",
+    "Bolivia", "Bosnia and Herzegovina", "Botswana", "Brazil", "Brunei", "Bulgaria",
+    "Burkina Faso", "Burundi", "Cambodia", "Cameroon", "Canada", "Cape Verde",
+    "Central African Republic", "Chad", "Chile", "China", "Colombia", "Comoros",
+    "Congo", "Costa Rica", "Croatia", "Cuba", "Cyprus", "Czech Republic",
+    "Democratic Republic of the Congo", "Denmark", "Djibouti", "Dominica",
+    "Dominican Republic", "East Timor", "Ecuador", "Egypt", "El Salvador",
+    "Equatorial Guinea", "Eritrea", "Estonia", "Eswatini", "Ethiopia", "Fiji",
+    "Finland", "France", "Gabon", "Gambia", "Georgia", "Germany", "Ghana", "Greece",
+    "Grenada", "Guatemala", "Guinea", "Guinea-Bissau", "Guyana", "Haiti", "Honduras",
+    "Hungary", "Iceland", "India", "Indonesia", "Iran", "Iraq", "Ireland", "Israel",
+    "Italy", "Ivory Coast", "Jamaica", "Japan", "Jordan", "Kazakhstan", "Kenya",
+    "Kiribati", "Kuwait", "Kyrgyzstan", "Laos", "Latvia", "Lebanon", "Lesotho",
+    "Liberia", "Libya", "Liechtenstein", "Lithuania", "Luxembourg", "Madagascar",
+    "Malawi", "Malaysia", "Maldives", "Mali", "Malta", "Marshall Islands", "Mauritania",
+    "Mauritius", "Mexico", "Micronesia", "Moldova", "Monaco", "Mongolia", "Montenegro",
+    "Morocco", "Mozambique", "Myanmar", "Namibia", "Nauru", "Nepal", "Netherlands",
+    "New Zealand", "Nicaragua", "Niger", "Nigeria", "North Korea", "North Macedonia",
+    "Norway", "Oman", "Pakistan", "Palau", "Panama", "Papua New Guinea", "Paraguay",
+    "Peru", "Philippines", "Poland", "Portugal", "Qatar", "Romania", "Russia", "Rwanda",
+    "Saint Kitts and Nevis", "Saint Lucia", "Saint Vincent and the Grenadines", "Samoa",
+    "San Marino", "São Tomé and Príncipe", "Saudi Arabia", "Senegal", "Serbia",
+    "Seychelles", "Sierra Leone", "Singapore", "Slovakia", "Slovenia",
+    "Solomon Islands", "Somalia", "South Africa", "South Korea", "South Sudan", "Spain",
+    "Sri Lanka", "Sudan", "Suriname", "Sweden", "Switzerland", "Syria", "Tajikistan",
+    "Tanzania", "Thailand", "Togo", "Tonga", "Trinidad and Tobago", "Tunisia",
+    "Türkiye", "Turkmenistan", "Tuvalu", "Uganda", "Ukraine", "United Arab Emirates",
+    "United Kingdom", "United States", "Uruguay", "Uzbekistan", "Vanuatu", "Venezuela",
+    "Vietnam", "Yemen", "Zambia", "Zimbabwe",
+)
+
+# Territoires connus volontairement absents du jeu : ignorés sans être signalés
+excluded_territories = (
+    "Bermuda", "Greenland", "Hong Kong", "Kosovo", "Palestine", "Taiwan",
+)
+
+# Dictionnaire complet de normalisation des noms de pays (en anglais)
+country_mapping = {
+    # Variantes françaises
+    "Moldavie": "Moldova",
+    "Lituanie": "Lithuania",
+    "Tchéquie": "Czech Republic",
+    "Allemagne": "Germany",
+    "Irlande": "Ireland",
+    "Luxembourg": "Luxembourg",
+    "Lettonie": "Latvia",
+    "Bulgarie": "Bulgaria",
+    "Roumanie": "Romania",
+    "Slovénie": "Slovenia",
+    "France": "France",
+    "Portugal": "Portugal",
+    "Belgique": "Belgium",
+    "Russie": "Russia",
+    "Pologne": "Poland",
+    "Estonie": "Estonia",
+    "Autriche": "Austria",
+    "Slovaquie": "Slovakia",
+    "Hongrie": "Hungary",
+    "Croatie": "Croatia",
+    "Grèce": "Greece",
+    "Chypre": "Cyprus",
+    "Italie": "Italy",
+    "Espagne": "Spain",
+    "Suisse": "Switzerland",
+    "Suède": "Sweden",
+    "Norvège": "Norway",
+    "Danemark": "Denmark",
+    "Finlande": "Finland",
+    "Islande": "Iceland",
+    "Pays-Bas": "Netherlands",
+    "Royaume-Uni": "United Kingdom",
+    "Costa Rica": "Costa Rica",
+    "Nouvelle-Zélande": "New Zealand",
+    "Australie": "Australia",
+    "États-Unis": "United States",
+    "Canada": "Canada",
+    "Mexique": "Mexico",
+    "Argentine": "Argentina",
+    "Brésil": "Brazil",
+    "Chili": "Chile",
+    "Colombie": "Colombia",
+    "Venezuela": "Venezuela",
+    "Pérou": "Peru",
+    "Équateur": "Ecuador",
+    "Paraguay": "Paraguay",
+    "Uruguay": "Uruguay",
+    "Bolivie": "Bolivia",
+    "Guyane": "Guyana",
+    "Surinam": "Suriname",
+    "Afrique du Sud": "South Africa",
+    "Égypte": "Egypt",
+    "Éthiopie": "Ethiopia",
+    "Algérie": "Algeria",
+    "Maroc": "Morocco",
+    "Tunisie": "Tunisia",
+    "Libye": "Libya",
+    "Soudan": "Sudan",
+    "Tanzanie": "Tanzania",
+    "Kenya": "Kenya",
+    "Cameroun": "Cameroon",
+    "Côte d'Ivoire": "Ivory Coast",
+    "Ghana": "Ghana",
+    "Sénégal": "Senegal",
+    "Zambie": "Zambia",
+    "Zimbabwe": "Zimbabwe",
+    "Malawi": "Malawi",
+    "Mozambique": "Mozambique",
+    "Angola": "Angola",
+    "Pakistan": "Pakistan",
+    "Afghanistan": "Afghanistan",
+    "Bangladesh": "Bangladesh",
+    "Inde": "India",
+    "Népal": "Nepal",
+    "Sri Lanka": "Sri Lanka",
+    "Thaïlande": "Thailand",
+    "Laos": "Laos",
+    "Cambodge": "Cambodia",
+    "Vietnam": "Vietnam",
+    "Chine": "China",
+    "Japon": "Japan",
+    "Corée du Sud": "South Korea",
+    "Corée du Nord": "North Korea",
+    "Mongolie": "Mongolia",
+    "Malaisie": "Malaysia",
+    "Indonésie": "Indonesia",
+    "Philippines": "Philippines",
+    "Birmanie": "Myanmar",
+    "Turquie": "Türkiye",
+    "Irak": "Iraq",
+    "Iran": "Iran",
+    "Syrie": "Syria",
+    "Liban": "Lebanon",
+    "Israël": "Israel",
+    "Jordanie": "Jordan",
+    "Arabie Saoudite": "Saudi Arabia",
+    "Émirats arabes unis": "United Arab Emirates",
+    "Émirats Arabes Unis": "United Arab Emirates",
+    "Qatar": "Qatar",
+    "Bahreïn": "Bahrain",
+    "Oman": "Oman",
+    "Yémen": "Yemen",
+    "Koweït": "Kuwait",
+    "Azerbaïdjan": "Azerbaijan",
+    "Kazakhstan": "Kazakhstan",
+    "Ouzbékistan": "Uzbekistan",
+    "Tadjikistan": "Tajikistan",
+    "Kirghizistan": "Kyrgyzstan",
+    "Turkménistan": "Turkmenistan",
+    "Géorgie": "Georgia",
+    "Arménie": "Armenia",
+    "Ukraine": "Ukraine",
+    "Biélorussie": "Belarus",
+    "Serbie": "Serbia",
+    "Bosnie-Herzégovine": "Bosnia and Herzegovina",
+    "Monténégro": "Montenegro",
+    "Albanie": "Albania",
+    "Kosovo": "Kosovo",
+    "Malte": "Malta",
+    "Guinée équatoriale": "Equatorial Guinea",
+    "Gabon": "Gabon",
+    "Ouganda": "Uganda",
+    "Rwanda": "Rwanda",
+    "Burundi": "Burundi",
+    "Somalie": "Somalia",
+    "Djibouti": "Djibouti",
+    "Bénin": "Benin",
+    "Togo": "Togo",
+    "Mali": "Mali",
+    "Mauritanie": "Mauritania",
+    "Niger": "Niger",
+    "Burkina Faso": "Burkina Faso",
+    "Gambie": "Gambia",
+    "Guinée-Bissau": "Guinea-Bissau",
+    "Guinée": "Guinea",
+    "Tchad": "Chad",
+    "République centrafricaine": "Central African Republic",
+    "Comores": "Comoros",
+    "Maurice": "Mauritius",
+    "Madagascar": "Madagascar",
+    "Haïti": "Haiti",
+    "République Dominicaine": "Dominican Republic",
+    "Jamaïque": "Jamaica",
+    "Trinité-et-Tobago": "Trinidad and Tobago",
+    "Cuba": "Cuba",
+    "Belize": "Belize",
+    "Panama": "Panama",
+    "Honduras": "Honduras",
+    "Nicaragua": "Nicaragua",
+    "El Salvador": "El Salvador",
+    "Guatemala": "Guatemala",
+    "Groenland": "Greenland",
+    "Antigua-et-Barbuda": "Antigua and Barbuda",
+    "Sainte-Lucie": "Saint Lucia",
+    "Grenade": "Grenada",
+    "Dominique": "Dominica",
+    "Barbade": "Barbados",
+    "Saint-Vincent-et-les-Grenadines": "Saint Vincent and the Grenadines",
+    "Fidji": "Fiji",
+    "Samoa": "Samoa",
+    "Kiribati": "Kiribati",
+    "Nauru": "Nauru",
+    "Papouasie-Nouvelle-Guinée": "Papua New Guinea",
+    "Îles Marshall": "Marshall Islands",
+    "Îles Salomon": "Solomon Islands",
+    "Vanuatu": "Vanuatu",
+    "Tonga": "Tonga",
+    "Tuvalu": "Tuvalu",
+    "Seychelles": "Seychelles",
+    "Andorre": "Andorra",
+    "Liechtenstein": "Liechtenstein",
+    "Saint-Marin": "San Marino",
+    "Lesotho": "Lesotho",
+    "Eswatini": "Eswatini",
+    "Botswana": "Botswana",
+    "Namibie": "Namibia",
+    "Soudan du Sud": "South Sudan",
+    "République démocratique du Congo": "Democratic Republic of the Congo",
+    "Maldives": "Maldives",
+    "Timor oriental": "East Timor",
+    "Brunei": "Brunei",
+    "Singapour": "Singapore",
+    "Taïwan": "Taiwan",
+    "Hong Kong": "Hong Kong",
+    "Erythrée": "Eritrea",
+    "Liberia": "Liberia",
+    "Sierra Leone": "Sierra Leone",
+    "Cap-Vert": "Cape Verde",
+    "Cabo Verde": "Cape Verde",
+    "São Tomé-et-Príncipe": "São Tomé and Príncipe",
+    "Mauritius": "Mauritius",
+    # Variantes anglaises/autres
+    "Czechia": "Czech Republic",
+    "Türkiye": "Türkiye",
+    "Turkey": "Türkiye",
+    "Korea Republic": "South Korea",
+    "IR Iran": "Iran",
+    "Great-Britain": "United Kingdom",
+    "Great Britain": "United Kingdom",
+    "USA": "United States",
+    "DR Congo": "Democratic Republic of the Congo",
+    "Congo DR": "Democratic Republic of the Congo",
+    "Democratic Republic of Congo": "Democratic Republic of the Congo",
+    "Democratic Republic of the Congo": "Democratic Republic of the Congo",
+    "Republic of Congo": "Congo",
+    "Republic of the Congo": "Congo",
+    "République du Congo": "Congo",
+    "Congo": "Congo",
+    "Federated States of Micronesia": "Micronesia",
+    "Saint Kitts and Nevis": "Saint Kitts and Nevis",
+    "States fédérés de Micronésie": "Micronesia",
+    "États fédérés de Micronésie": "Micronesia",
+    "Kingdom of the Netherlands": "Netherlands",
+    "Arabie saoudite": "Saudi Arabia",
+    "China PR": "China",
+    "Myanmar": "Myanmar",
+    "Bhoutan": "Bhutan",
+    "Erithrea": "Eritrea",
+    "Érythrée": "Eritrea",
+    "Ile Maurice": "Mauritius",
+    "Île Maurice": "Mauritius",
+    "Kyrgyz Republic": "Kyrgyzstan",
+    "Kyrgyzstan": "Kyrgyzstan",
+    "The Bahamas": "Bahamas",
+    "Bahamas": "Bahamas",
+    "The Gambia": "Gambia",
+    "Gambia": "Gambia",
+    "Salomon": "Solomon Islands",
+    "Solomon Islands": "Solomon Islands",
+    "Salvador": "El Salvador",
+    "El Salvador": "El Salvador",
+    "Palaos": "Palau",
+    "Palau": "Palau",
+    "St Kitts and Nevis": "Saint Kitts and Nevis",
+    "St Lucia": "Saint Lucia",
+    "St Vincent and the Grenadines": "Saint Vincent and the Grenadines",
+    "Timor-Leste": "East Timor",
+    "East Timor": "East Timor",
+    "Micronésie": "Micronesia",
+    "Micronesia": "Micronesia",
+    "Macédoine du Nord": "North Macedonia",
+    "North Macedonia": "North Macedonia",
+    "République dominicaine": "Dominican Republic",
+    "Dominican Republic": "Dominican Republic",
+    "République tchèque": "Czech Republic",
+    "Czech Republic": "Czech Republic",
+    "République de Irlande": "Ireland",
+    "Republic of Ireland": "Ireland",
+    "Ireland": "Ireland",
+    "République de Moldavie": "Moldova",
+    "Republic of Moldova": "Moldova",
+    "Moldova": "Moldova",
+    "Sao Tomé-et-Principe": "São Tomé and Príncipe",
+    "São Tomé and Príncipe": "São Tomé and Príncipe",
+    "Trinidad & Tobago": "Trinidad and Tobago",
+    "Trinidad and Tobago": "Trinidad and Tobago",
+    "Viêt Nam": "Vietnam",
+    "Vietnam": "Vietnam",
+    "Saint-Christophe-et-Niévès": "Saint Kitts and Nevis",
+    "Korea DPR": "North Korea",
+    "North Korea": "North Korea",
+    "Palestine": "Palestine",
+    "Brunei Darussalam": "Brunei",
+    "Bermudes": "Bermuda",
+    "Centrafrique": "Central African Republic",
+    "Kirghizstan": "Kyrgyzstan",
+    "Macédoine": "North Macedonia",
+}
+
+
+# À incrémenter à chaque changement de normalize_key ou de l'algorithme de résolution
+RESOLVER_VERSION = 1
+
+_PUNCTUATION = re.compile(r"[^0-9a-z]+")
+_WORD_ALIASES = {"st": "saint", "ste": "sainte", "&": "and", "et": "and"}
+_DROPPED_WORDS = {"the", "of", "de", "du", "des", "la", "le", "les", "l", "d"}
+
+
+def normalize_key(name):
+    """Clé de comparaison d'un nom : sans accents, casse, ponctuation ni articles"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).casefold()
+    name = name.replace("&", " and ")
+    words = []
+    for word in _PUNCTUATION.split(name):
+        word = _WORD_ALIASES.get(word, word)
+        if word and word not in _DROPPED_WORDS:
+            words.append(word)
+    return " ".join(words)
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Resolution:
+    """Résultat de la résolution d'une colonne de noms"""
+
+    def __init__(self, names, unresolved, fuzzy, memo_hits=0):
+        # Nom canonique pour chaque entrée (None si non résolu ou exclu)
+        self.names = names
+        # Nom brut -> nombre d'occurrences non résolues
+        self.unresolved = unresolved
+        # Nom brut -> nom canonique retenu par l'index flou
+        self.fuzzy = fuzzy
+        # Noms distincts déjà présents dans le mémo
+        self.memo_hits = memo_hits
+
+
+class CountryResolver:
+    """Index précompilé nom brut -> pays canonique"""
+
+    def __init__(self, countries=canonical_countries, mapping=None, excluded=excluded_territories,
+                 threshold=0.8, memo_path=None):
+        if mapping is None:
+            mapping = country_mapping
+        self.countries = tuple(countries)
+        self.threshold = threshold
+        self.memo_path = memo_path
+        known = set(self.countries)
+        self._excluded = set(excluded)
+
+        # Index exact sur les clés normalisées : noms canoniques, exclus puis variantes
+        self._index = {}
+        for name in self.countries:
+            self._add_key(normalize_key(name), name)
+        for name in self._excluded:
+            self._add_key(normalize_key(name), None)
+        for alias, target in mapping.items():
+            if target not in known and target not in self._excluded:
+                raise ValueError(f"Variante {alias!r} -> {target!r} : pays cible inconnu")
+            self._add_key(normalize_key(alias), target if target in known else None)
+
+        # Index de trigrammes construit à la première recherche floue
+        self._trigram_index = None
+
+        payload = json.dumps([RESOLVER_VERSION, threshold, sorted(self._index.items(), key=lambda kv: kv[0])],
+                             ensure_ascii=False)
+        self.fingerprint = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        self._memo = {}
+        self._memo_dirty = False
+        if memo_path is not None:
+            self._load_memo()
+
+    def _add_key(self, key, target):
+        if key in self._index and self._index[key] != target:
+            raise ValueError(f"Clé {key!r} ambiguë : {self._index[key]!r} / {target!r}")
+        self._index[key] = target
+
+    def _load_memo(self):
+        try:
+            with open(self.memo_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("fingerprint") == self.fingerprint:
+            self._memo = {raw: tuple(entry) for raw, entry in data["resolutions"].items()}
+
+    def save(self):
+        """Persiste le mémo des résolutions (s'il a changé)"""
+        if self.memo_path is None or not self._memo_dirty:
+            return
+        self.memo_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.memo_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"fingerprint": self.fingerprint,
+                                "resolutions": {raw: list(entry) for raw, entry in self._memo.items()}},
+                               ensure_ascii=False))
+        os.replace(tmp, self.memo_path)
+        self._memo_dirty = False
+
+    def _build_trigram_index(self):
+        # Publié une fois complet : des threads de build résolvent en parallèle
+        keys = list(self._index)
+        key_trigrams = [_trigrams(key) for key in keys]
+        trigram_index = defaultdict(list)
+        for key_id, grams in enumerate(key_trigrams):
+            for gram in grams:
+                trigram_index[gram].append(key_id)
+        self._keys, self._key_trigrams = keys, key_trigrams
+        self._trigram_index = trigram_index
+
+    def _fuzzy(self, key):
+        """Meilleur candidat par coefficient de Dice sur les trigrammes, s'il est net"""
+        if self._trigram_index is None:
+            self._build_trigram_index()
+        grams = _trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigram_index.get(gram, ()))
+        scores = {}
+        for key_id, count in shared.items():
+            score = 2 * count / (len(grams) + len(self._key_trigrams[key_id]))
+            target = self._index[self._keys[key_id]]
+            if score > scores.get(target, (0.0,))[0]:
+                scores[target] = (score, key_id)
+        ranked = sorted(scores.items(), key=lambda item: item[1][0], reverse=True)
+        if not ranked or ranked[0][1][0] < self.threshold:
+            return False, None
+        if len(ranked) > 1 and ranked[0][1][0] - ranked[1][1][0] < 0.05:
+            return False, None
+        return True, ranked[0][0]
+
+    def _resolve_entry(self, raw):
+        """Retourne (trouvé, pays canonique ou None, via l'index flou)"""
+        entry = self._memo.get(raw)
+        if entry is not None:
+            return entry
+        key = normalize_key(raw)
+        if key in self._index:
+            entry = (True, self._index[key], False)
+        else:
+            found, target = self._fuzzy(key) if key else (False, None)
+            entry = (found, target, found)
+        self._memo[raw] = entry
+        self._memo_dirty = True
+        return entry
+
+    def resolve(self, name):
+        """Nom canonique du pays, ou None s'il est inconnu ou hors du jeu"""
+        return self._resolve_entry(name)[1]
+
+    def resolve_many(self, names):
+        """Résout une colonne entière : chaque nom distinct n'est traité qu'une fois"""
+        distinct = dict.fromkeys(names)
+        memo_hits = sum(raw in self._memo for raw in distinct)
+        entries = {raw: self._resolve_entry(raw) for raw in distinct}
+        resolved = [entries[raw][1] for raw in names]
+        unresolved = Counter(raw for raw in names if not entries[raw][0])
+        fuzzy = {raw: entry[1] for raw, entry in entries.items() if entry[2]}
+        return Resolution(resolved, dict(unresolved), fuzzy, memo_hits)
+
+
+_default_resolver = None
+
+
+def default_resolver():
+    """Résolveur partagé construit sur les tables de ce module"""
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = CountryResolver()
+    return _default_resolver
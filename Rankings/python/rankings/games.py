@@ -0,0 +1,138 @@
+"""Parties exportées de la table `games` et conversion en identifiants de la matrice
+
+Une partie exportée a la forme de la ligne Supabase (cf. `Game` dans
+game-geozone/src/lib/supabase/types.ts) : `categories_used` liste les 8
+catégories (noms de colonnes de la base) et `country_selections` associe à
+chacune le pays placé et son classement.
+"""
+
+import csv
+import json
+
+import numpy as np
+
+from .categories import db_columns
+
+GAME_SIZE = 8
+
+
+def _pg_array(text):
+    # Tableau Postgres exporté en texte : {alcohol,"life_expectancy"}
+    items = next(csv.reader([text.strip()[1:-1]], skipinitialspace=True), [])
+    return [item for item in items if item]
+
+
+def game_from_csv(record):
+    """Partie à partir d'une ligne d'export CSV de Supabase (colonnes en texte)"""
+    game = dict(record)
+    used = game.get("categories_used") or ""
+    game["categories_used"] = json.loads(used) if used.startswith("[") else _pg_array(used) if used else []
+    selections = game.get("country_selections") or ""
+    game["country_selections"] = json.loads(selections) if selections else {}
+    game["score"] = int(game["score"]) if game.get("score") not in (None, "") else None
+    game["won"] = str(game.get("won", "")).lower() in ("true", "t", "1")
+    for field in ("created_at", "completed_at"):
+        if game.get(field) == "":
+            game[field] = None
+    return game
+
+
+def read_games(path):
+    """Itère sur les parties d'un export JSON (liste), NDJSON (une partie par ligne) ou CSV
+
+    Une archive binaire (`.games`, cf. rankings.codec) est décodée bloc par bloc.
+    """
+    if path.suffix == ".games":
+        from .codec import iter_archive
+
+        codec, blocks = iter_archive(path)
+        for block in blocks:
+            yield from codec.decode(block)
+        return
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                yield game_from_csv(record)
+        return
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from json.load(f)
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def category_lookup(matrix):
+    """Nom de catégorie (colonne de la base ou en-tête CSV) -> identifiant de colonne"""
+    lookup = dict(matrix.category_index)
+    for header, column in db_columns.items():
+        if header in matrix.category_index:
+            lookup[column] = matrix.category_index[header]
+    return lookup
+
+
+class GameArrays:
+    """Lot de parties sous forme de tableaux alignés
+
+    `categories[b, i]` est la i-ème catégorie de la partie b et
+    `countries[b, i]` le pays que le joueur y a placé.
+    """
+
+    def __init__(self, ids, categories, countries, scores, won, rejected):
+        self.ids = ids
+        self.categories = categories
+        self.countries = countries
+        self.scores = scores
+        self.won = won
+        # (identifiant, raison) des parties impossibles à convertir
+        self.rejected = rejected
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def games_to_arrays(games, matrix, size=GAME_SIZE):
+    """Convertit des parties exportées en identifiants de catégories et de pays"""
+    categories_of = category_lookup(matrix)
+    countries_of = matrix.country_index
+    ids, categories, countries, scores, won, rejected = [], [], [], [], [], []
+
+    for game in games:
+        game_id = game.get("id")
+        used = game.get("categories_used") or []
+        selections = game.get("country_selections") or {}
+        if isinstance(selections, str):
+            selections = json.loads(selections)
+        if len(used) != size:
+            rejected.append((game_id, f"{len(used)} catégories au lieu de {size}"))
+            continue
+        try:
+            category_ids = [categories_of[name] for name in used]
+        except KeyError as exc:
+            rejected.append((game_id, f"catégorie inconnue {exc.args[0]!r}"))
+            continue
+        try:
+            country_ids = [countries_of[selections[name]["country"]] for name in used]
+        except KeyError as exc:
+            rejected.append((game_id, f"sélection ou pays inconnu {exc.args[0]!r}"))
+            continue
+        ids.append(game_id)
+        categories.append(category_ids)
+        countries.append(country_ids)
+        scores.append(game.get("score", -1))
+        won.append(bool(game.get("won")))
+
+    return GameArrays(
+        ids,
+        np.array(categories, dtype=np.int16).reshape(-1, size),
+        np.array(countries, dtype=np.int16).reshape(-1, size),
+        np.array(scores, dtype=np.int32),
+        np.array(won, dtype=bool),
+        rejected,
+    )
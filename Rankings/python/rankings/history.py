@@ -0,0 +1,233 @@
+"""Historique versionné des classements
+
+Chaque build ajoute une version à un magasin en ajout seul, sans recopier la
+matrice : seules les cases modifiées sont enregistrées, sous forme de
+changements (pays, catégorie, ancien rang, nouveau rang). On peut ainsi
+reconstruire la matrice telle qu'elle était à n'importe quelle version ou
+date, par exemple pour rescorer une partie de la table `games` avec les
+données sur lesquelles elle a été jouée.
+
+Le magasin est un dossier de trois fichiers :
+
+    names.json       pays et catégories rencontrés (identifiants globaux stables)
+    versions.jsonl   une ligne par version : date, empreinte, membres, position
+                     de ses changements dans changes.bin
+    changes.bin      changements de toutes les versions, bout à bout
+                     (enregistrements CHANGE de 10 octets)
+
+Reconstruire une version revient à appliquer d'un seul scatter tous les
+changements enregistrés jusqu'à elle. L'ajout d'une version du moteur compact
+(cf. rankings.compact) se fait sans NumPy, avec les mêmes enregistrements.
+"""
+
+import bisect
+import json
+import os
+import struct
+from datetime import datetime, timezone
+
+from .categories import HISTORY_DIR
+from .compact import NULL_RANK, CompactMatrix
+
+# pays, catégorie, ancien rang, nouveau rang
+CHANGE = struct.Struct("<IHhh")
+# Journal des versions, écrit en dernier à chaque ajout
+VERSIONS = "versions.jsonl"
+
+
+def _change_dtype():
+    import numpy as np
+
+    return np.dtype([("country", "<u4"), ("category", "<u2"), ("old", "<i2"), ("new", "<i2")])
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _parse_time(value):
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+class RankingHistory:
+    """Magasin de versions de la matrice de classements"""
+
+    def __init__(self, directory=HISTORY_DIR):
+        self.dir = directory
+        self.countries, self.categories = [], []
+        self.versions = []
+        if (directory / "names.json").exists():
+            with open(directory / "names.json", encoding="utf-8") as f:
+                names = json.load(f)
+            self.countries, self.categories = names["countries"], names["categories"]
+        if (directory / VERSIONS).exists():
+            with open(directory / VERSIONS, encoding="utf-8") as f:
+                self.versions = [json.loads(line) for line in f if line.strip()]
+        self._country_ids = {name: i for i, name in enumerate(self.countries)}
+        self._category_ids = {name: i for i, name in enumerate(self.categories)}
+
+    def __len__(self):
+        return len(self.versions)
+
+    def _intern(self, names, table, index):
+        ids = []
+        for name in names:
+            if name not in index:
+                index[name] = len(table)
+                table.append(name)
+            ids.append(index[name])
+        return ids
+
+    def _records(self, version):
+        """Changements enregistrés jusqu'à `version` incluse"""
+        import numpy as np
+
+        count = self.versions[version]["end"] if version >= 0 else 0
+        if not count:
+            return np.empty(0, dtype=_change_dtype())
+        return np.fromfile(self.dir / "changes.bin", dtype=_change_dtype(), count=count)
+
+    def _global_matrix(self, version):
+        """Matrice sur tous les identifiants globaux, à la version donnée"""
+        import numpy as np
+
+        from .matrix import RANK_DTYPE
+
+        ranks = np.full((len(self.countries), len(self.categories)), NULL_RANK, dtype=RANK_DTYPE)
+        records = self._records(version)
+        # Les changements sont dans l'ordre chronologique : le dernier l'emporte
+        ranks[records["country"], records["category"]] = records["new"]
+        return ranks
+
+    def _diff(self, matrix, country_ids, category_ids):
+        """Changements de la matrice NumPy par rapport à la dernière version"""
+        import numpy as np
+
+        from .matrix import RANK_DTYPE
+
+        previous = self._global_matrix(len(self.versions) - 1)
+        current = np.full((len(self.countries), len(self.categories)), NULL_RANK, dtype=RANK_DTYPE)
+        current[np.ix_(country_ids, category_ids)] = matrix.ranks
+        old = np.full_like(current, NULL_RANK)
+        old[:previous.shape[0], :previous.shape[1]] = previous
+
+        rows, cols = np.nonzero(current != old)
+        records = np.empty(len(rows), dtype=_change_dtype())
+        records["country"], records["category"] = rows, cols
+        records["old"], records["new"] = old[rows, cols], current[rows, cols]
+        return records.tobytes()
+
+    def _diff_compact(self, matrix, country_ids, category_ids):
+        """Mêmes changements, sans NumPy, pour une CompactMatrix"""
+        previous = {}
+        end = self.versions[-1]["end"] if self.versions else 0
+        if end:
+            with open(self.dir / "changes.bin", "rb") as f:
+                data = f.read(end * CHANGE.size)
+            for country, category, _, new in CHANGE.iter_unpack(data):
+                previous[country, category] = new
+
+        changes = []
+        width = len(category_ids)
+        for i, country in enumerate(country_ids):
+            row = matrix.cells[i * width:(i + 1) * width]
+            for category, new in zip(category_ids, row):
+                old = previous.pop((country, category), NULL_RANK)
+                if new != old:
+                    changes.append((country, category, old, new))
+        # Cases des pays ou catégories retirés de la matrice
+        changes.extend((country, category, old, NULL_RANK)
+                       for (country, category), old in previous.items() if old != NULL_RANK)
+        # Même ordre que np.nonzero : par pays puis par catégorie
+        changes.sort()
+        return b"".join(CHANGE.pack(*change) for change in changes)
+
+    def append(self, matrix, timestamp=None, note=None):
+        """Enregistre la matrice comme nouvelle version
+
+        Retourne le numéro de version, ou None si la matrice est identique à la
+        dernière version.
+        """
+        fingerprint = matrix.fingerprint()
+        if self.versions and self.versions[-1]["fingerprint"] == fingerprint:
+            return None
+
+        country_ids = self._intern(matrix.countries, self.countries, self._country_ids)
+        category_ids = self._intern(matrix.categories, self.categories, self._category_ids)
+        diff = self._diff_compact if isinstance(matrix, CompactMatrix) else self._diff
+        records = diff(matrix, country_ids, category_ids)
+
+        start = self.versions[-1]["end"] if self.versions else 0
+        entry = {
+            "version": len(self.versions),
+            "timestamp": timestamp or _now(),
+            "fingerprint": fingerprint,
+            "countries": country_ids,
+            "categories": category_ids,
+            "start": start,
+            "end": start + len(records) // CHANGE.size,
+        }
+        if note:
+            entry["note"] = note
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / "changes.bin", "ab") as f:
+            f.truncate(start * CHANGE.size)
+            f.write(records)
+        tmp = self.dir / "names.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"countries": self.countries, "categories": self.categories}, ensure_ascii=False))
+        os.replace(tmp, self.dir / "names.json")
+        # La ligne de version est écrite en dernier : elle valide les changements
+        with open(self.dir / VERSIONS, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.versions.append(entry)
+        return entry["version"]
+
+    def version_at(self, timestamp):
+        """Dernière version enregistrée au plus tard à `timestamp` (ISO 8601)"""
+        moment = _parse_time(timestamp) if isinstance(timestamp, str) else timestamp
+        times = [_parse_time(entry["timestamp"]) for entry in self.versions]
+        index = bisect.bisect_right(times, moment) - 1
+        if index < 0:
+            raise LookupError(f"Aucune version antérieure à {timestamp}")
+        return index
+
+    def matrix_at(self, version=None, timestamp=None):
+        """Matrice telle qu'elle était à une version (défaut : la dernière) ou à une date"""
+        if not self.versions:
+            raise LookupError("Historique vide")
+        if timestamp is not None:
+            version = self.version_at(timestamp)
+        elif version is None:
+            version = len(self.versions) - 1
+        elif version < 0:
+            version += len(self.versions)
+        if not 0 <= version < len(self.versions):
+            raise LookupError(f"Version {version} inconnue ({len(self.versions)} versions)")
+        import numpy as np
+
+        from .matrix import RankMatrix
+
+        entry = self.versions[version]
+        ranks = self._global_matrix(version)
+        matrix = RankMatrix(
+            [self.countries[i] for i in entry["countries"]],
+            [self.categories[j] for j in entry["categories"]],
+            ranks[np.ix_(entry["countries"], entry["categories"])],
+        )
+        matrix._fingerprint = entry["fingerprint"]
+        return matrix
+
+    def changes(self, version):
+        """Changements (pays, catégorie, ancien rang, nouveau rang) d'une version"""
+        entry = self.versions[version]
+        with open(self.dir / "changes.bin", "rb") as f:
+            f.seek(entry["start"] * CHANGE.size)
+            data = f.read((entry["end"] - entry["start"]) * CHANGE.size)
+        return [(self.countries[c], self.categories[k], None if old == NULL_RANK else old,
+                 None if new == NULL_RANK else new)
+                for c, k, old, new in CHANGE.iter_unpack(data)]
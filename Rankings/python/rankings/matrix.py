@@ -0,0 +1,150 @@
+"""Matrice de classements colonnaire (pays x catégories)
+
+Les pays et les catégories sont internés en identifiants entiers et tous les
+rangs tiennent dans une seule matrice NumPy int16. Les cases sans classement
+contiennent la sentinelle NULL_RANK, écrite "NULL" dans Rankings.csv.
+"""
+
+import csv
+import hashlib
+import os
+
+import numpy as np
+
+from .compact import MAX_RANK, NULL, NULL_RANK
+
+# MAX_RANK est le maximum d'int16
+RANK_DTYPE = np.int16
+
+
+def intern_columns(columns, categories, country_order=None):
+    """Interne les pays de colonnes {catégorie: (pays, ...)} en une seule passe
+
+    Retourne (catégories présentes, pays, inverse) : `inverse` donne la ligne
+    de chaque entrée des colonnes présentes mises bout à bout. Les lignes
+    suivent `country_order` s'il est fourni, l'ordre alphabétique sinon.
+    """
+    present = [name for name in categories if name in columns]
+    names = [np.asarray(columns[name][0], dtype=object) for name in present]
+    if names:
+        countries, inverse = np.unique(np.concatenate(names), return_inverse=True)
+    else:
+        countries, inverse = np.empty(0, dtype=object), np.empty(0, dtype=np.intp)
+    if country_order is not None and len(countries):
+        position = {name: i for i, name in enumerate(country_order)}
+        unknown = [name for name in countries if name not in position]
+        if unknown:
+            raise ValueError(f"Pays absents de l'ordre de référence : {unknown}")
+        permutation = np.argsort([position[name] for name in countries], kind="stable")
+        row_of = np.empty_like(permutation)
+        row_of[permutation] = np.arange(len(permutation))
+        countries, inverse = countries[permutation], row_of[inverse]
+    return present, countries, inverse
+
+
+class RankMatrix:
+    """Rangs de chaque pays (lignes) dans chaque catégorie (colonnes)"""
+
+    def __init__(self, countries, categories, ranks):
+        self.countries = list(countries)
+        self.categories = list(categories)
+        self.ranks = ranks
+        self._country_index = None
+        self._category_index = None
+        self._fingerprint = None
+
+    @property
+    def country_index(self):
+        """Nom de pays -> identifiant de ligne"""
+        if self._country_index is None:
+            self._country_index = {name: i for i, name in enumerate(self.countries)}
+        return self._country_index
+
+    @property
+    def category_index(self):
+        """Nom de catégorie -> identifiant de colonne"""
+        if self._category_index is None:
+            self._category_index = {name: j for j, name in enumerate(self.categories)}
+        return self._category_index
+
+    @property
+    def shape(self):
+        return self.ranks.shape
+
+    def fingerprint(self):
+        """Empreinte du contenu (noms et rangs), identifiant la version des données"""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update("\n".join(self.countries).encode("utf-8") + b"\0")
+            digest.update("\n".join(self.categories).encode("utf-8") + b"\0")
+            digest.update(self.rank_bytes())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    @classmethod
+    def from_columns(cls, columns, categories, country_order=None):
+        """Fusionne des colonnes {catégorie: (pays, rangs)} en une matrice
+
+        Les pays de toutes les colonnes sont internés en une seule passe
+        (`np.unique`), puis chaque catégorie est écrite dans la matrice par un
+        unique scatter vectorisé. Les lignes suivent `country_order` s'il est
+        fourni, l'ordre alphabétique sinon. Chaque pays ne doit figurer qu'une
+        fois par colonne : parse_category ne garde que la première ligne d'un
+        pays répété.
+        """
+        categories = list(categories)
+        present, countries, inverse = intern_columns(columns, categories, country_order)
+        ranks = np.full((len(countries), len(categories)), NULL_RANK, dtype=RANK_DTYPE)
+        offset = 0
+        for name in present:
+            values = np.asarray(columns[name][1], dtype=np.int64)
+            if values.size and (values.min() < 1 or values.max() > MAX_RANK):
+                raise ValueError(f"Rang hors limites dans {name!r} (1..{MAX_RANK})")
+            rows = inverse[offset:offset + len(values)]
+            ranks[rows, categories.index(name)] = values
+            offset += len(values)
+        return cls(countries.tolist(), categories, ranks)
+
+    @classmethod
+    def from_csv(cls, path):
+        """Charge un Rankings.csv existant"""
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            records = list(reader)
+        countries = [record[0] for record in records]
+        cells = np.array([record[1:] for record in records], dtype=object).reshape(len(records), len(header) - 1)
+        cells[cells == NULL] = NULL_RANK
+        return cls(countries, header[1:], cells.astype(RANK_DTYPE))
+
+    def to_csv(self, path):
+        """Écrit la matrice au format Rankings.csv (écriture atomique)"""
+        cells = self.ranks.astype(str).astype(object)
+        cells[self.ranks == NULL_RANK] = NULL
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["Country"] + self.categories)
+            writer.writerows(np.column_stack([np.asarray(self.countries, dtype=object), cells]).tolist())
+        os.replace(tmp, path)
+
+    def rank_bytes(self):
+        """Rangs en int16 petit-boutiste, ordre C (empreinte, Rankings.bin)"""
+        return np.ascontiguousarray(self.ranks, dtype="<i2").tobytes()
+
+    def rank_columns(self):
+        """Rangs de chaque catégorie, en listes"""
+        return np.asarray(self.ranks).T.tolist()
+
+    def column(self, category):
+        """Rangs d'une catégorie pour tous les pays (vue, sans copie)"""
+        return self.ranks[:, self.category_index[category]]
+
+    def row(self, country):
+        """Rangs d'un pays dans toutes les catégories (vue, sans copie)"""
+        return self.ranks[self.country_index[country]]
+
+    def mask(self):
+        """Booléens : True là où un rang est disponible"""
+        return self.ranks != NULL_RANK
@@ -0,0 +1,173 @@
+"""Fusion hors mémoire par partitions de hachage, pour les très grandes sources
+
+La fusion en mémoire (rankings.values, rankings.compact) garde toutes les
+colonnes et toute la matrice à la fois : c'est sans importance pour 193 pays,
+pas pour des classements de communes ou de régions (des millions de lignes sur
+des centaines de fichiers). Ce mode ne garde jamais plus d'une colonne, puis
+d'une partition, en mémoire :
+
+    1. chaque colonne est reclassée seule (les rangs recalculés ne dépendent
+       que de la colonne), puis ses cases (entité, catégorie, rang) sont
+       réparties dans des fichiers de débordement selon un hachage stable
+       (crc32) du nom canonique de l'entité ;
+    2. chaque partition est relue et jointe en lignes complètes, triées dans
+       l'ordre final, et écrite dans un fichier de run ;
+    3. les runs sont fusionnés (`heapq.merge`) en écrivant Rankings.csv et
+       Rankings.bin au fil des lignes.
+
+Le nombre de partitions est choisi d'après la taille des sources et le budget
+mémoire : la mémoire de pointe ne dépend que de la plus grosse colonne et de la
+taille d'une partition, pas du volume total. Les sorties sont identiques octet
+par octet à celles de la fusion en mémoire.
+"""
+
+import csv
+import heapq
+import math
+import os
+import struct
+import tempfile
+import zlib
+from array import array
+
+from .binary import BinaryWriter
+from .compact import MAX_RANK, NULL, NULL_RANK, assign_ranks
+
+# Budget mémoire d'une partition pendant la jointure
+MEMORY_LIMIT = 64 << 20
+MAX_PARTITIONS = 256
+# Case débordée : catégorie, rang, longueur du nom (suivi du nom en UTF-8)
+SPILL = struct.Struct("<HhH")
+# Ligne d'un run : position dans l'ordre de référence, longueur du nom (suivi du nom et des rangs)
+RUN = struct.Struct("<QH")
+_BUFFER = 1 << 16
+
+
+def partition_count(input_bytes, memory=MEMORY_LIMIT):
+    """Nombre de partitions pour que chacune tienne dans `memory` octets"""
+    return max(1, min(MAX_PARTITIONS, math.ceil(input_bytes / memory)))
+
+
+def rank_column(countries, ranks, values, schema, order_key):
+    """Rangs recalculés d'une seule colonne : {pays: rang ou NULL_RANK}
+
+    Mêmes règles que ValueMatrix.from_columns puis ranks : un pays répété garde
+    sa première ligne (comme parse_category), une valeur manquante donne
+    NULL_RANK, les valeurs égales sont départagées par le rang source puis par
+    l'ordre des lignes de sortie (`order_key`).
+    """
+    has_value = schema.value is not None
+    kept = {}
+    for country, rank, value in zip(countries, ranks, values):
+        if not 1 <= rank <= MAX_RANK:
+            raise ValueError(f"Rang hors limites dans {schema.column!r} (1..{MAX_RANK})")
+        kept.setdefault(country, (rank, (None if value is None else float(value)) if has_value else float(rank)))
+    sign = -1.0 if has_value and schema.direction == "desc" else 1.0
+    ordered = sorted((sign * value, rank, order_key(country), country)
+                     for country, (rank, value) in kept.items()
+                     if value is not None and not math.isnan(value))
+    if len(ordered) > MAX_RANK:
+        raise ValueError(f"Plus de {MAX_RANK} pays classés dans une catégorie")
+    result = dict.fromkeys(kept, NULL_RANK)
+    for entry, rank in zip(ordered, assign_ranks(ordered, schema.ties)):
+        result[entry[3]] = rank
+    return result
+
+
+def _spill_records(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        column, rank, length = SPILL.unpack_from(data, offset)
+        offset += SPILL.size
+        yield column, rank, data[offset:offset + length].decode("utf-8")
+        offset += length
+
+
+def _run_records(path, width, by_name):
+    with open(path, "rb", buffering=_BUFFER) as f:
+        while header := f.read(RUN.size):
+            position, length = RUN.unpack(header)
+            name = f.read(length).decode("utf-8")
+            cells = array("h")
+            cells.frombytes(f.read(2 * width))
+            yield (name if by_name else position), name, cells
+
+
+def merge_partitioned(columns, schemas, output_path, binary_path, workdir, partitions,
+                      country_order=None):
+    """Fusionne un flux de colonnes en Rankings.csv et Rankings.bin, en mémoire bornée
+
+    `columns` produit des paires (catégorie, {"countries", "ranks", "values"}),
+    consommées une à une. Les lignes suivent `country_order` s'il est fourni,
+    l'ordre alphabétique sinon, comme pour la fusion en mémoire. Retourne
+    (cases lues, lignes écrites).
+    """
+    categories = [schema.column for schema in schemas]
+    by_column = {schema.column: schema for schema in schemas}
+    width = len(categories)
+    if country_order is not None:
+        position = {name: i for i, name in enumerate(country_order)}
+        order_key = position.__getitem__
+    else:
+        def order_key(name):
+            return name
+
+    workdir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=workdir) as spill_dir:
+        spill_paths = [os.path.join(spill_dir, f"part-{p:03d}.spill") for p in range(partitions)]
+        run_paths = [os.path.join(spill_dir, f"part-{p:03d}.run") for p in range(partitions)]
+
+        # 1. Reclassement colonne par colonne et débordement par hachage de l'entité
+        rows_in = 0
+        spills = [open(path, "wb", buffering=_BUFFER) for path in spill_paths]
+        try:
+            for name, data in columns:
+                if country_order is not None:
+                    unknown = sorted(set(data["countries"]) - position.keys())
+                    if unknown:
+                        raise ValueError(f"Pays absents de l'ordre de référence : {unknown}")
+                j = categories.index(name)
+                ranked = rank_column(data["countries"], data["ranks"], data["values"], by_column[name], order_key)
+                rows_in += len(data["countries"])
+                for country, rank in ranked.items():
+                    encoded = country.encode("utf-8")
+                    spills[zlib.crc32(encoded) % partitions].write(SPILL.pack(j, rank, len(encoded)) + encoded)
+        finally:
+            for spill in spills:
+                spill.close()
+
+        # 2. Jointure de chaque partition en lignes complètes, triées dans l'ordre final
+        for spill_path, run_path in zip(spill_paths, run_paths):
+            rows = {}
+            for j, rank, country in _spill_records(spill_path):
+                cells = rows.get(country)
+                if cells is None:
+                    cells = rows[country] = array("h", [NULL_RANK]) * width
+                cells[j] = rank
+            os.remove(spill_path)
+            with open(run_path, "wb", buffering=_BUFFER) as run:
+                for country in sorted(rows, key=order_key):
+                    encoded = country.encode("utf-8")
+                    run.write(RUN.pack(position[country] if country_order is not None else 0, len(encoded)))
+                    run.write(encoded)
+                    run.write(rows[country].tobytes())
+            del rows
+
+        # 3. Fusion des runs triés, écriture des deux sorties au fil des lignes
+        rows_out = 0
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        # Écrit en même temps que Rankings.bin, dont le temporaire est Rankings.tmp
+        csv_tmp = output_path.with_suffix(".csv.tmp")
+        runs = [_run_records(path, width, country_order is None) for path in run_paths]
+        with open(csv_tmp, "w", newline="", encoding="utf-8") as f, BinaryWriter(binary_path, categories) as binary:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["Country"] + categories)
+            for _, country, cells in heapq.merge(*runs, key=lambda record: record[0]):
+                writer.writerow([country] + [NULL if rank == NULL_RANK else rank for rank in cells])
+                binary.add(country, cells)
+                rows_out += 1
+            binary.close()
+        os.replace(csv_tmp, output_path)
+    return rows_in, rows_out
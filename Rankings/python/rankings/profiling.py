@@ -0,0 +1,201 @@
+"""Instrumentation des étapes de la chaîne (build, chargement)
+
+Chaque étape mesure son temps réel, son temps CPU, la mémoire (pic RSS du
+processus et, avec `memory`, pic alloué par Python pendant l'étape via
+tracemalloc) et des compteurs libres : lignes en entrée et en sortie, noms non
+résolus, succès de cache... Le rapport est un JSON lisible par machine.
+
+Une étape « chaude » peut en plus être passée sous cProfile (fichier .prof à
+ouvrir avec pstats ou snakeviz) et, avec `memory`, sous un instantané
+tracemalloc des plus grosses allocations.
+
+Les travaux faits dans des workers (lecture et résolution des fichiers) sont
+mesurés dans le worker et ajoutés par `add` : leurs temps sont des sommes sur
+les workers, pas du temps écoulé.
+"""
+
+import io
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Fonctions et allocations listées dans le rapport pour l'étape chaude
+TOP_ENTRIES = 20
+
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+class Stage:
+    """Mesures d'une étape"""
+
+    def __init__(self, name, in_workers=False):
+        self.name = name
+        self.in_workers = in_workers
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.max_rss_kb = None
+        self.peak_traced_kb = None
+        self.counters = {}
+
+    def record(self, **counters):
+        """Ajoute des compteurs (additionnés si l'étape est répétée)"""
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        data = {"name": self.name, "calls": self.calls, "wall_s": round(self.wall, 6),
+                "cpu_s": round(self.cpu, 6)}
+        if self.in_workers:
+            data["in_workers"] = True
+        if self.max_rss_kb is not None:
+            data["max_rss_kb"] = self.max_rss_kb
+        if self.peak_traced_kb is not None:
+            data["peak_traced_kb"] = self.peak_traced_kb
+        data["counters"] = self.counters
+        return data
+
+
+class _NullStage:
+    def record(self, **counters):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profiler:
+    """Collecte les mesures par étape d'une commande
+
+    Désactivé (`enabled=False`), il ne mesure rien : les appels à `stage` et
+    `record` restent dans le code sans coût notable.
+    """
+
+    def __init__(self, command, enabled=True, hot_stage=None, memory=False, dump_prefix=None):
+        self.command = command
+        self.enabled = enabled
+        self.hot_stage = hot_stage
+        self.memory = memory and enabled
+        self.dump_prefix = dump_prefix
+        self.stages = {}
+        self.hot = None
+        self._started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        if self.memory:
+            # tracemalloc, cProfile et pstats sont importés à la demande : ils
+            # pèsent sur le démarrage de chaque commande, profilée ou non
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def _stage(self, name, in_workers=False):
+        if name not in self.stages:
+            self.stages[name] = Stage(name, in_workers)
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name):
+        """Mesure le bloc comme étape `name`"""
+        if not self.enabled:
+            yield _NULL_STAGE
+            return
+        stage = self._stage(name)
+        profile = None
+        if name == self.hot_stage:
+            import cProfile
+
+            profile = cProfile.Profile()
+        if self.memory:
+            import tracemalloc
+
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield stage
+        finally:
+            if profile is not None:
+                profile.disable()
+            stage.calls += 1
+            stage.wall += time.perf_counter() - wall
+            stage.cpu += time.process_time() - cpu
+            stage.max_rss_kb = _max_rss_kb()
+            if self.memory:
+                import tracemalloc
+
+                peak = tracemalloc.get_traced_memory()[1] // 1024
+                stage.peak_traced_kb = max(stage.peak_traced_kb or 0, peak)
+            if profile is not None:
+                self._dump_hot(name, profile)
+
+    def add(self, name, wall=0.0, cpu=0.0, calls=1, **counters):
+        """Ajoute des mesures faites ailleurs (workers) à l'étape `name`"""
+        if not self.enabled:
+            return
+        stage = self._stage(name, in_workers=True)
+        stage.calls += calls
+        stage.wall += wall
+        stage.cpu += cpu
+        stage.record(**counters)
+
+    def _dump_hot(self, name, profile):
+        import pstats
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats("cumulative").print_stats(TOP_ENTRIES)
+        self.hot = {"stage": name, "cprofile_top": stream.getvalue().strip().splitlines()}
+        if self.dump_prefix is not None:
+            path = f"{self.dump_prefix}.{name}.prof"
+            profile.dump_stats(path)
+            self.hot["cprofile"] = path
+        if self.memory:
+            import tracemalloc
+
+            snapshot = tracemalloc.take_snapshot()
+            self.hot["tracemalloc_top"] = [str(stat) for stat in snapshot.statistics("lineno")[:TOP_ENTRIES]]
+            if self.dump_prefix is not None:
+                path = f"{self.dump_prefix}.{name}.tracemalloc"
+                snapshot.dump(path)
+                self.hot["tracemalloc"] = path
+
+    def report(self):
+        """Rapport sérialisable en JSON"""
+        return {
+            "command": self.command,
+            "started": self._started,
+            "wall_s": round(time.perf_counter() - self._wall, 6),
+            "cpu_s": round(time.process_time() - self._cpu, 6),
+            "max_rss_kb": _max_rss_kb(),
+            "stages": [stage.to_dict() for stage in self.stages.values()],
+            "hot_stage": self.hot,
+        }
+
+    def write(self, path):
+        """Écrit le rapport JSON (écriture atomique)"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+
+def disabled(command=None):
+    """Profiler inactif, utilisé quand aucun rapport n'est demandé"""
+    return Profiler(command, enabled=False)
@@ -0,0 +1,102 @@
+"""Lecture en une passe des fichiers de catégorie, pilotée par leur schéma
+
+Les fichiers de Data/Category ne sont pas homogènes : noms de pays entourés
+d'espaces et de guillemets, décimales à virgule ("90,2"), fichier sans
+en-tête, dates en texte libre avec appels de note. `read_category` les lit
+ligne à ligne selon leur `CategorySchema` et produit des enregistrements
+typés (rang, pays brut, valeur), sans DataFrame.
+"""
+
+import csv
+import re
+
+_FOOTNOTE = re.compile(r"\[[^\]]*\]")
+_SPACES = re.compile(r"[\s  ]+")
+_NUMERIC_DATE = re.compile(r"^(\d{1,2})/(\d{1,2})/(-?\d{1,4})$")
+_TEXT_DATE = re.compile(r"^(\d{1,2})(?:er)?\s+([^\W\d_]+)\s+(-?\d{1,4})$")
+_YEAR = re.compile(r"^-?\d{1,4}$")
+_RANGE = re.compile(r"^(.+?)\s*(?:à|–)\s*(.+)$")
+
+MONTHS = {
+    "janvier": 1, "fevrier": 2, "février": 2, "mars": 3, "avril": 4, "mai": 5, "juin": 6,
+    "juillet": 7, "aout": 8, "août": 8, "septembre": 9, "octobre": 10, "novembre": 11,
+    "decembre": 12, "décembre": 12,
+}
+
+
+class CategoryFormatError(ValueError):
+    """Ligne illisible dans un fichier de catégorie"""
+
+    def __init__(self, path, line, message):
+        super().__init__(f"{path.name}, ligne {line} : {message}")
+        self.path = path
+        self.line = line
+        self.message = message
+
+    def __reduce__(self):
+        # Renvoyée telle quelle par les workers d'un pool de processus
+        return type(self), (self.path, self.line, self.message)
+
+
+def parse_decimal(text):
+    """'90,2' -> 90.2 ; accepte le point, la virgule, les espaces de milliers
+    et les intervalles ('78,00 à 80,00' -> milieu de l'intervalle)"""
+    match = _RANGE.match(text.strip())
+    if match:
+        return (parse_decimal(match.group(1)) + parse_decimal(match.group(2))) / 2
+    text = _SPACES.sub("", text)
+    if "," in text and "." not in text:
+        text = text.replace(",", ".")
+    return float(text.replace(",", ""))
+
+
+def _decimal_year(year, month=1, day=1):
+    # Année fractionnaire : croissante avec la date, y compris avant notre ère
+    return year + (month - 1) / 12 + (day - 1) / 372
+
+
+def parse_date(text):
+    """Date en texte libre -> année fractionnaire ('1er août 1291' -> 1291.5...)"""
+    text = _SPACES.sub(" ", _FOOTNOTE.sub("", text)).strip()
+    if _YEAR.match(text):
+        return float(int(text))
+    match = _NUMERIC_DATE.match(text)
+    if match:
+        day, month, year = (int(part) for part in match.groups())
+        return _decimal_year(year, month, day)
+    match = _TEXT_DATE.match(text)
+    if match and match.group(2).lower() in MONTHS:
+        return _decimal_year(int(match.group(3)), MONTHS[match.group(2).lower()], int(match.group(1)))
+    raise ValueError(f"date illisible {text!r}")
+
+
+VALUE_PARSERS = {"decimal": parse_decimal, "date": parse_date}
+
+
+def read_category(path, schema):
+    """Itère sur les enregistrements (rang, pays brut, valeur) d'un fichier
+
+    Les lignes vides ou sans rang ni pays sont ignorées ; la valeur vaut None
+    si le schéma n'en déclare pas ou si la case est vide. Une ligne mal formée
+    lève CategoryFormatError avec son numéro.
+    """
+    parse_value = VALUE_PARSERS[schema.value] if schema.value else None
+    width = max(schema.rank_field, schema.country_field) + 1
+    with open(path, newline="", encoding=schema.encoding) as f:
+        reader = csv.reader(f)
+        if schema.header:
+            next(reader, None)
+        for record in reader:
+            if len(record) < width:
+                continue
+            rank = record[schema.rank_field].strip()
+            country = record[schema.country_field].strip()
+            if not rank or not country:
+                continue
+            try:
+                value = None
+                if parse_value and len(record) > schema.value_field and record[schema.value_field].strip():
+                    value = parse_value(record[schema.value_field])
+                yield int(rank), country, value
+            except ValueError as exc:
+                raise CategoryFormatError(path, reader.line_num, str(exc)) from None
@@ -0,0 +1,84 @@
+"""Régions du jeu, pour les modes de partie restreints (Europe seule, îles...)
+
+Les continents suivent le découpage M49 des Nations unies (Chypre, Türkiye et
+le Caucase sont en Asie, la Russie en Europe). Un pays peut appartenir à
+plusieurs régions : chaque région est un bit, et `region_bits` donne pour
+chaque pays l'union de ses bits. Le masque d'une ou plusieurs régions se
+calcule ensuite par un seul `&` vectorisé sur la colonne des bits.
+"""
+
+regions = {
+    "Africa": (
+        "Algeria", "Angola", "Benin", "Botswana", "Burkina Faso", "Burundi", "Cameroon", "Cape Verde",
+        "Central African Republic", "Chad", "Comoros", "Congo", "Democratic Republic of the Congo",
+        "Djibouti", "Egypt", "Equatorial Guinea", "Eritrea", "Eswatini", "Ethiopia", "Gabon", "Gambia",
+        "Ghana", "Guinea", "Guinea-Bissau", "Ivory Coast", "Kenya", "Lesotho", "Liberia", "Libya",
+        "Madagascar", "Malawi", "Mali", "Mauritania", "Mauritius", "Morocco", "Mozambique", "Namibia",
+        "Niger", "Nigeria", "Rwanda", "São Tomé and Príncipe", "Senegal", "Seychelles", "Sierra Leone",
+        "Somalia", "South Africa", "South Sudan", "Sudan", "Tanzania", "Togo", "Tunisia", "Uganda",
+        "Zambia", "Zimbabwe",
+    ),
+    "Americas": (
+        "Antigua and Barbuda", "Argentina", "Bahamas", "Barbados", "Belize", "Bolivia", "Brazil", "Canada",
+        "Chile", "Colombia", "Costa Rica", "Cuba", "Dominica", "Dominican Republic", "Ecuador",
+        "El Salvador", "Grenada", "Guatemala", "Guyana", "Haiti", "Honduras", "Jamaica", "Mexico",
+        "Nicaragua", "Panama", "Paraguay", "Peru", "Saint Kitts and Nevis", "Saint Lucia",
+        "Saint Vincent and the Grenadines", "Suriname", "Trinidad and Tobago", "United States", "Uruguay",
+        "Venezuela",
+    ),
+    "Asia": (
+        "Afghanistan", "Armenia", "Azerbaijan", "Bahrain", "Bangladesh", "Bhutan", "Brunei", "Cambodia",
+        "China", "Cyprus", "East Timor", "Georgia", "India", "Indonesia", "Iran", "Iraq", "Israel", "Japan",
+        "Jordan", "Kazakhstan", "Kuwait", "Kyrgyzstan", "Laos", "Lebanon", "Malaysia", "Maldives",
+        "Mongolia", "Myanmar", "Nepal", "North Korea", "Oman", "Pakistan", "Philippines", "Qatar",
+        "Saudi Arabia", "Singapore", "South Korea", "Sri Lanka", "Syria", "Tajikistan", "Thailand",
+        "Türkiye", "Turkmenistan", "United Arab Emirates", "Uzbekistan", "Vietnam", "Yemen",
+    ),
+    "Europe": (
+        "Albania", "Andorra", "Austria", "Belarus", "Belgium", "Bosnia and Herzegovina", "Bulgaria",
+        "Croatia", "Czech Republic", "Denmark", "Estonia", "Finland", "France", "Germany", "Greece",
+        "Hungary", "Iceland", "Ireland", "Italy", "Latvia", "Liechtenstein", "Lithuania", "Luxembourg",
+        "Malta", "Moldova", "Monaco", "Montenegro", "Netherlands", "North Macedonia", "Norway", "Poland",
+        "Portugal", "Romania", "Russia", "San Marino", "Serbia", "Slovakia", "Slovenia", "Spain", "Sweden",
+        "Switzerland", "Ukraine", "United Kingdom",
+    ),
+    "Oceania": (
+        "Australia", "Fiji", "Kiribati", "Marshall Islands", "Micronesia", "Nauru", "New Zealand", "Palau",
+        "Papua New Guinea", "Samoa", "Solomon Islands", "Tonga", "Tuvalu", "Vanuatu",
+    ),
+    # États entièrement insulaires, sans frontière terrestre
+    "Islands": (
+        "Antigua and Barbuda", "Bahamas", "Bahrain", "Barbados", "Cape Verde", "Comoros", "Cuba", "Cyprus",
+        "Dominica", "Fiji", "Grenada", "Iceland", "Jamaica", "Japan", "Kiribati", "Madagascar", "Maldives",
+        "Malta", "Marshall Islands", "Mauritius", "Micronesia", "Nauru", "New Zealand", "Palau",
+        "Philippines", "Saint Kitts and Nevis", "Saint Lucia", "Saint Vincent and the Grenadines", "Samoa",
+        "São Tomé and Príncipe", "Seychelles", "Singapore", "Solomon Islands", "Sri Lanka", "Tonga",
+        "Trinidad and Tobago", "Tuvalu", "Vanuatu",
+    ),
+}
+
+# Au plus 64 régions : une par bit d'un uint64
+REGION_BITS = 64
+region_names = list(regions)
+
+
+def region_bits(countries, names=region_names):
+    """Bits de région de chaque pays (0 pour un pays hors de toute région)"""
+    if len(names) > REGION_BITS:
+        raise ValueError(f"Trop de régions ({len(names)}) pour un masque sur {REGION_BITS} bits")
+    bits = {}
+    for bit, name in enumerate(names):
+        for country in regions[name]:
+            bits[country] = bits.get(country, 0) | (1 << bit)
+    return [bits.get(country, 0) for country in countries]
+
+
+def selector(selected, names=region_names):
+    """Masque de bits des régions `selected`"""
+    unknown = [name for name in selected if name not in names]
+    if unknown:
+        raise ValueError(f"Régions inconnues : {unknown} (connues : {', '.join(names)})")
+    value = 0
+    for name in selected:
+        value |= 1 << names.index(name)
+    return value
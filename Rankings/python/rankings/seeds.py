@@ -0,0 +1,188 @@
+"""Réserve de parties pré-tirées, indexée par difficulté
+
+Chaque graine est une partie complète tirée hors ligne : 8 catégories et
+l'ordre de tirage des 8 pays (un par manche, sans remise, comme
+`getRandomCountry`), avec son meilleur score atteignable (cf. rankings.solver).
+Les graines sont triées par meilleur score puis réparties en tranches de
+difficulté de même effectif : la tranche 0 est la plus facile. Tirer « une
+graine de difficulté d » revient à lire une case au hasard dans la tranche,
+en O(1), sans aucun calcul par requête.
+
+Disposition du fichier seeds.bin (petit-boutiste) :
+
+    en-tête      HEADER (magic, version, taille de partie, tranches, graines,
+                 dimensions et empreinte de la matrice, graine maîtresse)
+    tranches     offsets (uint64, tranches + 1) puis scores min et max (int32)
+    graines      enregistrements SEED_DTYPE contigus, alignés sur 64 octets,
+                 projetés en mémoire en lecture seule
+
+Les identifiants de pays et de catégories se rapportent à la matrice dont
+l'empreinte est dans l'en-tête : une réserve n'est valable que pour cette
+version des classements.
+"""
+
+import hashlib
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .simulate import GAME_SIZE, _matrix, draw_games
+from .solver import cost_tensor, solve
+
+MAGIC = b"GZSP"
+# 2 : meilleurs scores calculés avec NULL_COST (une case NULL compte 0)
+FORMAT_VERSION = 2
+BUCKETS = 10
+CHUNK_SIZE = 100_000
+RECORDS_ALIGNMENT = 64
+SEED_DTYPE = np.dtype([("categories", "u1", (GAME_SIZE,)), ("countries", "<u2", (GAME_SIZE,)),
+                       ("optimal", "<u4")])
+# magic, version, taille de partie, tranches, graines, nb pays, nb catégories,
+# empreinte de la matrice, graine maîtresse, offset des graines
+HEADER = struct.Struct("<4sHHIQII16sQQ")
+
+
+def _generate_chunk(matrix_path, batch, seed):
+    matrix = _matrix(matrix_path)
+    rng = np.random.default_rng(seed)
+    categories, countries = draw_games(rng, len(matrix.categories), len(matrix.countries), batch)
+    optimal, _ = solve(cost_tensor(matrix, categories, countries), with_assignment=False)
+    records = np.empty(batch, dtype=SEED_DTYPE)
+    records["categories"] = categories
+    records["countries"] = countries
+    records["optimal"] = optimal
+    return records
+
+
+class SeedPool:
+    """Réserve de graines triées par difficulté"""
+
+    def __init__(self, records, offsets, fingerprint, shape, master_seed=0):
+        self.records = records
+        self.offsets = np.asarray(offsets, dtype=np.uint64)
+        self.fingerprint = fingerprint
+        self.shape = tuple(shape)
+        self.master_seed = master_seed
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def buckets(self):
+        return len(self.offsets) - 1
+
+    def bucket(self, difficulty):
+        """Graines d'une tranche de difficulté (vue, sans copie)"""
+        if not 0 <= difficulty < self.buckets:
+            raise ValueError(f"Difficulté {difficulty} hors de 0..{self.buckets - 1}")
+        return self.records[int(self.offsets[difficulty]):int(self.offsets[difficulty + 1])]
+
+    def score_range(self, difficulty):
+        """Meilleurs scores minimal et maximal d'une tranche"""
+        seeds = self.bucket(difficulty)
+        if not len(seeds):
+            return None, None
+        return int(seeds["optimal"][0]), int(seeds["optimal"][-1])
+
+    def random(self, difficulty, rng=None):
+        """Une graine au hasard dans la tranche, en O(1)"""
+        seeds = self.bucket(difficulty)
+        if not len(seeds):
+            raise LookupError(f"Tranche {difficulty} vide")
+        rng = rng or np.random.default_rng()
+        return seeds[int(rng.integers(len(seeds)))]
+
+    def daily(self, day, difficulty):
+        """Graine du jour : la même pour tous les joueurs à une date donnée"""
+        digest = hashlib.blake2b(f"{self.fingerprint}:{day}:{difficulty}".encode("utf-8"), digest_size=8)
+        seeds = self.bucket(difficulty)
+        if not len(seeds):
+            raise LookupError(f"Tranche {difficulty} vide")
+        return seeds[int.from_bytes(digest.digest(), "little") % len(seeds)]
+
+    def describe(self, seed, matrix):
+        """Graine lisible : catégories (clés de la table) et pays dans l'ordre des manches"""
+        from .categories import db_columns
+
+        if matrix.fingerprint() != self.fingerprint:
+            raise ValueError("La réserve a été générée pour une autre version de la matrice")
+        return {
+            "categories": [db_columns.get(matrix.categories[j], matrix.categories[j])
+                           for j in seed["categories"].tolist()],
+            "countries": [matrix.countries[i] for i in seed["countries"].tolist()],
+            "optimal_score": int(seed["optimal"]),
+        }
+
+
+def generate(matrix_path, games, buckets=BUCKETS, seed=None, jobs=1, chunk_size=CHUNK_SIZE):
+    """Tire `games` graines sur la matrice et retourne une SeedPool
+
+    Comme pour la simulation, chaque lot a sa propre graine dérivée de `seed` :
+    la réserve ne dépend pas du nombre de processus.
+    """
+    matrix = _matrix(matrix_path)
+    if len(matrix.categories) > np.iinfo(np.uint8).max or len(matrix.countries) > np.iinfo(np.uint16).max:
+        raise ValueError(f"Matrice {matrix.shape} trop grande pour le format des graines")
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2 ** 64)
+    sizes = [min(chunk_size, games - start) for start in range(0, games, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = [(matrix_path, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    if jobs > 1 and len(arguments) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            chunks = list(pool.map(_generate_chunk, *zip(*arguments)))
+    else:
+        chunks = [_generate_chunk(*args) for args in arguments]
+    records = np.concatenate(chunks) if chunks else np.empty(0, dtype=SEED_DTYPE)
+
+    # Tri par meilleur score, puis tranches de même effectif
+    records = records[np.argsort(records["optimal"], kind="stable")]
+    offsets = (np.arange(buckets + 1) * len(records)) // buckets
+    return SeedPool(records, offsets, matrix.fingerprint(), matrix.shape, seed)
+
+
+def write_pool(pool, path):
+    """Écrit la réserve au format seeds.bin (écriture atomique)"""
+    ranges = [pool.score_range(d) for d in range(pool.buckets)]
+    lows = np.array([-1 if low is None else low for low, _ in ranges], dtype="<i4")
+    highs = np.array([-1 if high is None else high for _, high in ranges], dtype="<i4")
+    table = pool.offsets.astype("<u8").tobytes() + lows.tobytes() + highs.tobytes()
+    records_offset = HEADER.size + len(table)
+    records_offset += -records_offset % RECORDS_ALIGNMENT
+    rows, cols = pool.shape
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, GAME_SIZE, pool.buckets, len(pool), rows, cols,
+                         bytes.fromhex(pool.fingerprint), pool.master_seed, records_offset)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(table)
+        f.write(b"\0" * (records_offset - HEADER.size - len(table)))
+        f.write(np.ascontiguousarray(pool.records).tobytes())
+    os.replace(tmp, path)
+
+
+def load_pool(path):
+    """Ouvre seeds.bin sans copie : les graines sont un np.memmap en lecture seule"""
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} : fichier tronqué")
+        magic, version, size, buckets, count, rows, cols, digest, master_seed, records_offset = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} : ce n'est pas une réserve de graines")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} : version de format {version} non supportée")
+        if size != GAME_SIZE:
+            raise ValueError(f"{path} : parties de {size} manches, {GAME_SIZE} attendues")
+        offsets = np.frombuffer(f.read(8 * (buckets + 1)), dtype="<u8")
+
+    if count:
+        records = np.memmap(path, dtype=SEED_DTYPE, mode="r", offset=records_offset, shape=(count,))
+    else:
+        records = np.empty(0, dtype=SEED_DTYPE)
+    return SeedPool(records, offsets, digest.hex(), (rows, cols), master_seed)
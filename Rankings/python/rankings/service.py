@@ -0,0 +1,289 @@
+"""Service HTTP en lecture seule des classements (aiohttp)
+
+Chaque chargement de page du jeu relit toute la table `rankings` dans
+Supabase. Ce service charge une fois Rankings.bin (et seeds.bin, combos.bin
+s'ils existent) et répond en mémoire :
+
+    GET /version                          empreinte et dimensions de la matrice
+    GET /countries/{pays}                 rangs d'un pays dans toutes les catégories
+    GET /categories/{catégorie}?n=10      n meilleurs pays d'une catégorie
+    GET /games/new?difficulty=3&day=...   nouvelle partie (réserve de graines)
+    GET /category-sets/new?difficulty=4&redundancy=low   catégories d'un jeu (index
+                                          des combinaisons ; low, medium, high ou maximum)
+    GET /optimal?categories=a,b&countries=x,y   meilleur score atteignable
+
+Les catégories sont désignées par leur clé de table (`fifa`, `hdi`...) ou leur
+en-tête CSV. Les corps des lignes et l'ordre de chaque catégorie sont calculés
+au chargement ; les meilleurs scores passent par un cache LRU, la même partie
+étant demandée par tous les joueurs du défi du jour. Les parties libres sont
+tirées et résolues par lots de FRESH_BATCH (solveur vectorisé), puis servies
+une à une.
+
+Toute réponse qui ne dépend que des données porte un ETag égal à l'empreinte
+de la matrice : un client qui renvoie `If-None-Match` reçoit un 304 sans
+corps tant que la matrice n'a pas changé. Une partie tirée au hasard n'est
+jamais mise en cache. Le service est à redémarrer après un build qui modifie
+la matrice.
+"""
+
+import json
+from functools import lru_cache
+
+import numpy as np
+
+from .categories import db_columns
+from .games import category_lookup
+from .matrix import NULL_RANK
+from .simulate import GAME_SIZE, draw_games
+from .solver import best_score, cost_tensor, solve
+
+HOST = "127.0.0.1"
+PORT = 8787
+TOP = 10
+MAX_TOP = 1000
+SOLVER_CACHE = 4096
+# Parties libres tirées et résolues d'un bloc, servies ensuite une à une
+FRESH_BATCH = 1024
+# Au-delà, la programmation dynamique du solveur (2^k états) devient coûteuse
+MAX_CATEGORIES = GAME_SIZE
+MAX_COUNTRIES = 4 * GAME_SIZE
+CACHE_CONTROL = "public, max-age=300"
+NO_STORE = "no-store"
+
+
+class ServiceError(ValueError):
+    """Requête invalide : statut HTTP et message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _encode(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _names(text, what):
+    names = [name.strip() for name in (text or "").split(",") if name.strip()]
+    if not names:
+        raise ServiceError(400, f"Paramètre {what} manquant (noms séparés par des virgules)")
+    return names
+
+
+class RankingService:
+    """Réponses du service, sans dépendance à HTTP"""
+
+    def __init__(self, matrix, pool=None, solver_cache=SOLVER_CACHE, seed=None, combos=None):
+        if pool is not None and pool.fingerprint != matrix.fingerprint():
+            raise ValueError("La réserve de graines a été générée pour une autre version de la matrice")
+        if combos is not None and combos.fingerprint != matrix.fingerprint():
+            raise ValueError("L'index des combinaisons a été calculé pour une autre version de la matrice")
+        self.matrix = matrix
+        self.pool = pool
+        self.combos = combos
+        self.version = matrix.fingerprint()
+        self.etag = f'"{self.version}"'
+        self.keys = [db_columns.get(category, category) for category in matrix.categories]
+        self.lookup = category_lookup(matrix)
+
+        ranks = np.asarray(matrix.ranks)
+        self._rows = {
+            country: _encode({"country": country, "version": self.version,
+                              "ranks": {key: None if rank == NULL_RANK else rank
+                                        for key, rank in zip(self.keys, row)}})
+            for country, row in zip(matrix.countries, ranks.tolist())
+        }
+        # Lignes classées de chaque catégorie, du meilleur rang au moins bon (tri stable)
+        self._order = []
+        for j in range(len(matrix.categories)):
+            column = ranks[:, j]
+            ranked = np.flatnonzero(column != NULL_RANK)
+            self._order.append(ranked[np.argsort(column[ranked], kind="stable")].tolist())
+        self._best = lru_cache(maxsize=solver_cache)(self._solve)
+        self.solver_cache_info = self._best.cache_info
+        self.rng = np.random.default_rng(seed)
+        self._fresh = []
+
+    def describe(self):
+        return {"version": self.version, "countries": len(self.matrix.countries), "categories": self.keys,
+                "difficulties": self.pool.buckets if self.pool is not None else 0,
+                "set_difficulties": self.combos.buckets if self.combos is not None else 0}
+
+    def country(self, name):
+        """Corps JSON des rangs d'un pays"""
+        try:
+            return self._rows[name]
+        except KeyError:
+            raise ServiceError(404, f"Pays inconnu : {name!r}") from None
+
+    def _category(self, name):
+        try:
+            return self.lookup[name]
+        except KeyError:
+            raise ServiceError(404, f"Catégorie inconnue : {name!r}") from None
+
+    def top(self, category, n=TOP):
+        """n meilleurs pays d'une catégorie"""
+        if not 1 <= n <= MAX_TOP:
+            raise ServiceError(400, f"n hors de 1..{MAX_TOP}")
+        j = self._category(category)
+        ranks = self.matrix.ranks
+        return {"category": self.keys[j], "version": self.version,
+                "top": [{"country": self.matrix.countries[i], "rank": int(ranks[i, j])}
+                        for i in self._order[j][:n]]}
+
+    def _solve(self, categories, countries):
+        return best_score(self.matrix, categories, countries)
+
+    def optimal(self, categories, countries):
+        """Meilleur score atteignable et placement, mis en cache
+
+        L'ordre des noms ne change ni le score ni le placement : la clé du
+        cache est la liste triée des identifiants de colonnes et de lignes.
+        """
+        if not 1 <= len(categories) <= MAX_CATEGORIES:
+            raise ServiceError(400, f"De 1 à {MAX_CATEGORIES} catégories")
+        if not len(categories) <= len(countries) <= MAX_COUNTRIES:
+            raise ServiceError(400, f"De {len(categories)} à {MAX_COUNTRIES} pays")
+        columns = sorted({self._category(name) for name in categories})
+        if len(columns) != len(categories):
+            raise ServiceError(400, "Catégorie répétée")
+        unknown = [name for name in countries if name not in self.matrix.country_index]
+        if unknown:
+            raise ServiceError(404, f"Pays inconnus : {unknown}")
+        rows = sorted({self.matrix.country_index[name] for name in countries})
+        if len(rows) != len(countries):
+            raise ServiceError(400, "Pays répété")
+        score, placement = self._best(tuple(self.matrix.categories[j] for j in columns),
+                                      tuple(self.matrix.countries[i] for i in rows))
+        return {"version": self.version, "optimal_score": score,
+                "placement": {db_columns.get(category, category): country
+                              for category, country in placement.items()}}
+
+    def _draw(self):
+        """Une partie libre ; le solveur est vectorisé sur tout un lot de tirages"""
+        if not self._fresh:
+            categories, countries = draw_games(self.rng, len(self.matrix.categories),
+                                               len(self.matrix.countries), FRESH_BATCH)
+            optimal, _ = solve(cost_tensor(self.matrix, categories, countries), with_assignment=False)
+            self._fresh = list(zip(categories.tolist(), countries.tolist(), optimal.tolist()))
+        return self._fresh.pop()
+
+    def new_game(self, difficulty=None, day=None):
+        """Nouvelle partie : graine de la réserve (difficulté, jour) ou tirage libre"""
+        if difficulty is None:
+            if day is not None:
+                raise ServiceError(400, "Le défi du jour demande une difficulté")
+            categories, countries, score = self._draw()
+            game = {"categories": [self.keys[j] for j in categories],
+                    "countries": [self.matrix.countries[i] for i in countries], "optimal_score": score}
+        else:
+            if self.pool is None:
+                raise ServiceError(404, "Aucune réserve de graines chargée (python -m rankings seeds generate)")
+            if not 0 <= difficulty < self.pool.buckets:
+                raise ServiceError(400, f"Difficulté hors de 0..{self.pool.buckets - 1}")
+            try:
+                seed = self.pool.daily(day, difficulty) if day else self.pool.random(difficulty, self.rng)
+            except LookupError as error:
+                raise ServiceError(404, str(error)) from None
+            game = self.pool.describe(seed, self.matrix)
+        return {"version": self.version, "difficulty": difficulty, "day": day, **game}
+
+    def category_set(self, difficulty, redundancy=None):
+        """Catégories d'un jeu : une combinaison de l'index, par difficulté et redondance"""
+        from .combos import REDUNDANCY_LEVELS
+
+        if self.combos is None:
+            raise ServiceError(404, "Aucun index de combinaisons chargé (python -m rankings combos build)")
+        if difficulty is None:
+            raise ServiceError(400, "Paramètre difficulty manquant")
+        if not 0 <= difficulty < self.combos.buckets:
+            raise ServiceError(400, f"Difficulté hors de 0..{self.combos.buckets - 1}")
+        if redundancy is not None and redundancy not in REDUNDANCY_LEVELS:
+            try:
+                redundancy = float(redundancy)
+            except ValueError:
+                raise ServiceError(400, f"Redondance {redundancy!r} : {', '.join(REDUNDANCY_LEVELS)} "
+                                        "ou une valeur maximale") from None
+        try:
+            combo = self.combos.pick(difficulty, redundancy, self.rng)
+        except LookupError as error:
+            raise ServiceError(404, str(error)) from None
+        return {"version": self.version, "difficulty": difficulty, **self.combos.describe(combo, self.matrix)}
+
+
+def create_app(service):
+    """Application aiohttp du service"""
+    from aiohttp import web
+
+    def respond(request, body, cacheable=True):
+        headers = {"Access-Control-Allow-Origin": "*"}
+        if not cacheable:
+            headers["Cache-Control"] = NO_STORE
+            return web.Response(body=body, content_type="application/json", headers=headers)
+        headers.update({"ETag": service.etag, "Cache-Control": CACHE_CONTROL})
+        tags = request.headers.get("If-None-Match", "")
+        if tags.strip() == "*" or service.etag in (tag.strip().removeprefix("W/") for tag in tags.split(",")):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    def integer(request, name, default=None):
+        value = request.query.get(name)
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ServiceError(400, f"Paramètre {name} non entier : {value!r}") from None
+
+    @web.middleware
+    async def errors(request, handler):
+        try:
+            return await handler(request)
+        except ServiceError as error:
+            return web.Response(status=error.status, body=_encode({"error": str(error)}),
+                                content_type="application/json",
+                                headers={"Access-Control-Allow-Origin": "*", "Cache-Control": NO_STORE})
+
+    async def version(request):
+        return respond(request, _encode(service.describe()))
+
+    async def country(request):
+        return respond(request, service.country(request.match_info["country"]))
+
+    async def category(request):
+        top = service.top(request.match_info["category"], integer(request, "n", TOP))
+        return respond(request, _encode(top))
+
+    async def new_game(request):
+        day = request.query.get("day")
+        game = service.new_game(integer(request, "difficulty"), day)
+        # Le défi du jour est le même pour tous : seul un tirage libre n'est pas cacheable
+        return respond(request, _encode(game), cacheable=day is not None)
+
+    async def category_set(request):
+        result = service.category_set(integer(request, "difficulty"), request.query.get("redundancy"))
+        return respond(request, _encode(result), cacheable=False)
+
+    async def optimal(request):
+        result = service.optimal(_names(request.query.get("categories"), "categories"),
+                                 _names(request.query.get("countries"), "countries"))
+        return respond(request, _encode(result))
+
+    app = web.Application(middlewares=[errors])
+    app.router.add_get("/version", version)
+    app.router.add_get("/countries/{country}", country)
+    app.router.add_get("/categories/{category}", category)
+    app.router.add_get("/games/new", new_game)
+    app.router.add_get("/category-sets/new", category_set)
+    app.router.add_get("/optimal", optimal)
+    return app
+
+
+def serve(service, host=HOST, port=PORT):
+    """Lance le service jusqu'à interruption (Ctrl-C)"""
+    try:
+        from aiohttp import web
+    except ImportError:
+        raise RuntimeError("Le service nécessite aiohttp (pip install aiohttp)") from None
+    web.run_app(create_app(service), host=host, port=port, access_log=None, print=None)
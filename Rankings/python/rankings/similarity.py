@@ -0,0 +1,206 @@
+"""Index de similarité entre pays, pour les indices et les tirages équilibrés
+
+Chaque ligne de la matrice est le profil d'un pays sur toutes les catégories.
+Les rangs sont d'abord ramenés en centiles (0 = premier, 1 = dernier) pour que
+les catégories de tailles différentes pèsent autant, puis comparés sur les
+seules catégories où les deux pays sont classés (au moins MIN_COMMON) :
+
+    spearman    1 - corrélation des rangs (Pearson sur les centiles), de 0 à 2
+    euclidean   écart quadratique moyen des centiles, de 0 à 1
+
+Toutes les sommes par paire (effectifs, sommes, produits croisés) sont des
+produits matriciels sur les centiles mis à zéro là où le rang manque : aucune
+boucle sur les paires. Les distances sont calculées par blocs de lignes et
+seuls les `k` plus proches voisins de chaque pays sont gardés : « les pays les
+plus proches de X » est une lecture de k cases, et « un pays différent de ceux
+déjà vus » un tirage hors de l'union de leurs voisins.
+
+Disposition du fichier similarity.bin (petit-boutiste) :
+
+    en-tête      HEADER (magic, version, métrique, k, dimensions et empreinte
+                 de la matrice, offset des tables)
+    voisins      uint16 (pays x k), alignés sur 64 octets, NO_NEIGHBOR en fin
+                 de ligne si un pays a moins de k voisins comparables
+    distances    float32 (pays x k), croissantes, inf pour NO_NEIGHBOR
+
+Comme pour seeds.bin, l'index n'est valable que pour la matrice dont
+l'empreinte est dans l'en-tête.
+"""
+
+import os
+import struct
+
+import numpy as np
+
+from .matrix import NULL_RANK
+
+METRICS = ("spearman", "euclidean")
+NEIGHBORS = 20
+# Catégories communes minimales pour comparer deux pays
+MIN_COMMON = 5
+# Lignes de la matrice des distances calculées à la fois
+BLOCK_ROWS = 1024
+MAGIC = b"GZSM"
+FORMAT_VERSION = 1
+TABLE_ALIGNMENT = 64
+NO_NEIGHBOR = 0xFFFF
+# magic, version, métrique, k, nb pays, nb catégories, empreinte de la matrice, offset des tables
+HEADER = struct.Struct("<4sHHIII16sQ")
+
+
+def percentiles(ranks):
+    """Centiles des rangs par catégorie (float64, NaN là où le rang manque)"""
+    ranks = np.asarray(ranks)
+    valid = ranks != NULL_RANK
+    counts = valid.sum(axis=0)
+    scale = np.where(counts > 1, counts - 1, 1).astype(np.float64)
+    return np.where(valid, (ranks - 1) / scale, np.nan)
+
+
+def distances(profile, rows=None, metric="spearman", min_common=MIN_COMMON):
+    """Distances des lignes `rows` (toutes si None) à tous les pays, shape (len(rows), pays)
+
+    `profile` est la matrice des centiles. Les paires ayant moins de
+    `min_common` catégories communes, ou un profil constant (corrélation
+    indéfinie), sont à inf.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Métrique inconnue : {metric!r} (connues : {', '.join(METRICS)})")
+    valid = (~np.isnan(profile)).astype(np.float64)
+    x = np.nan_to_num(profile)
+    squares = x * x
+    if rows is None:
+        rows = slice(None)
+    common = valid[rows] @ valid.T
+    cross = x[rows] @ x.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if metric == "euclidean":
+            total = squares[rows] @ valid.T + valid[rows] @ squares.T - 2 * cross
+            result = np.sqrt(np.maximum(total, 0) / common)
+        else:
+            # Sommes restreintes aux catégories communes de chaque paire
+            sum_a, sum_b = x[rows] @ valid.T, valid[rows] @ x.T
+            covariance = cross - sum_a * sum_b / common
+            variance_a = squares[rows] @ valid.T - sum_a * sum_a / common
+            variance_b = valid[rows] @ squares.T - sum_b * sum_b / common
+            result = 1 - covariance / np.sqrt(variance_a * variance_b)
+    result[(common < min_common) | ~np.isfinite(result)] = np.inf
+    return result
+
+
+class SimilarityIndex:
+    """k plus proches voisins de chaque pays, du plus proche au plus lointain"""
+
+    def __init__(self, neighbors, distances, metric, fingerprint, shape):
+        self.neighbors = neighbors
+        self.distances = distances
+        self.metric = metric
+        self.fingerprint = fingerprint
+        self.shape = tuple(shape)
+
+    def __len__(self):
+        return len(self.neighbors)
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    def similar(self, country, k=None):
+        """(voisins, distances) d'un pays, au plus `k`, en O(k)"""
+        count = self.k if k is None else min(k, self.k)
+        neighbors = self.neighbors[country, :count]
+        kept = neighbors != NO_NEIGHBOR
+        return neighbors[kept], self.distances[country, :count][kept]
+
+    def dissimilar(self, seen, rng=None, k=None):
+        """Un pays au hasard, hors de `seen` et de leurs `k` plus proches voisins
+
+        O(k) par pays vu, puis un tirage par rejet : l'ensemble exclu est petit
+        devant le nombre de pays. Retourne None si tous les pays sont exclus.
+        """
+        excluded = set(int(country) for country in seen)
+        for country in seen:
+            excluded.update(self.similar(country, k)[0].tolist())
+        if len(excluded) >= len(self):
+            return None
+        rng = rng or np.random.default_rng()
+        while True:
+            country = int(rng.integers(len(self)))
+            if country not in excluded:
+                return country
+
+    def describe(self, country, matrix, k=None):
+        """Voisins lisibles d'un pays : [{country, distance}]"""
+        if matrix.fingerprint() != self.fingerprint:
+            raise ValueError("L'index a été calculé pour une autre version de la matrice")
+        neighbors, gaps = self.similar(country, k)
+        return [{"country": matrix.countries[i], "distance": round(float(gap), 4)}
+                for i, gap in zip(neighbors.tolist(), gaps.tolist())]
+
+
+def build_index(matrix, metric="spearman", k=NEIGHBORS, min_common=MIN_COMMON, block_rows=BLOCK_ROWS):
+    """Calcule l'index des `k` plus proches voisins de chaque pays de `matrix`"""
+    count = len(matrix.countries)
+    if count > NO_NEIGHBOR:
+        raise ValueError(f"Matrice {matrix.shape} trop grande pour le format de l'index")
+    k = min(k, max(count - 1, 0))
+    profile = percentiles(matrix.ranks)
+    neighbors = np.full((count, k), NO_NEIGHBOR, dtype=np.uint16)
+    nearest = np.full((count, k), np.inf, dtype=np.float32)
+    for start in range(0, count, block_rows):
+        rows = np.arange(start, min(start + block_rows, count))
+        block = distances(profile, rows, metric, min_common)
+        block[np.arange(len(rows)), rows] = np.inf
+        if not k:
+            continue
+        # k plus petites distances sans trier toute la ligne, puis tri des k
+        candidates = np.argpartition(block, k - 1, axis=1)[:, :k]
+        gaps = np.take_along_axis(block, candidates, axis=1)
+        order = np.lexsort((candidates, gaps), axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        gaps = np.take_along_axis(gaps, order, axis=1)
+        neighbors[rows] = np.where(np.isfinite(gaps), candidates, NO_NEIGHBOR)
+        nearest[rows] = gaps
+    return SimilarityIndex(neighbors, nearest, metric, matrix.fingerprint(), matrix.shape)
+
+
+def write_index(index, path):
+    """Écrit l'index au format similarity.bin (écriture atomique)"""
+    table_offset = HEADER.size + (-HEADER.size % TABLE_ALIGNMENT)
+    rows, cols = index.shape
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, METRICS.index(index.metric), index.k, rows, cols,
+                         bytes.fromhex(index.fingerprint), table_offset)
+    neighbors = np.ascontiguousarray(index.neighbors, dtype="<u2").tobytes()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(b"\0" * (table_offset - HEADER.size))
+        f.write(neighbors)
+        f.write(b"\0" * (-len(neighbors) % TABLE_ALIGNMENT))
+        f.write(np.ascontiguousarray(index.distances, dtype="<f4").tobytes())
+    os.replace(tmp, path)
+
+
+def load_index(path):
+    """Ouvre similarity.bin sans copie : voisins et distances en np.memmap lecture seule"""
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} : fichier tronqué")
+    magic, version, metric, k, rows, cols, digest, table_offset = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} : ce n'est pas un index de similarité")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} : version de format {version} non supportée")
+    if metric >= len(METRICS):
+        raise ValueError(f"{path} : métrique {metric} inconnue")
+
+    if rows and k:
+        neighbors = np.memmap(path, dtype="<u2", mode="r", offset=table_offset, shape=(rows, k))
+        distances_offset = table_offset + neighbors.nbytes + (-neighbors.nbytes % TABLE_ALIGNMENT)
+        nearest = np.memmap(path, dtype="<f4", mode="r", offset=distances_offset, shape=(rows, k))
+    else:
+        neighbors = np.empty((rows, k), dtype=np.uint16)
+        nearest = np.empty((rows, k), dtype=np.float32)
+    return SimilarityIndex(neighbors, nearest, METRICS[metric], digest.hex(), (rows, cols))
@@ -0,0 +1,224 @@
+"""Simulation Monte-Carlo de parties pour calibrer la difficulté et le seuil de victoire
+
+Les règles sont celles de game-geozone/src/lib/utils/gameLogic.ts : 8
+catégories tirées parmi les colonnes de la matrice, puis un pays par manche
+tiré sans remise (`getRandomCountry` exclut les pays déjà vus), placé dans une
+catégorie encore libre. Les relances (reroll) ne sont pas simulées.
+
+Stratégies disponibles :
+
+    random   catégorie libre choisie au hasard
+    greedy   catégorie libre où le pays a le meilleur rang
+    optimal  affectation optimale a posteriori (borne haute, cf. rankings.solver)
+
+Les parties sont simulées par lots vectorisés ; avec plusieurs processus,
+chaque worker ouvre la même matrice Rankings.bin (pages partagées).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .binary import load_matrix
+from .compact import NULL_COST
+from .games import GAME_SIZE
+from .solver import cost_tensor, solve
+
+STRATEGIES = ("random", "greedy", "optimal")
+WIN_THRESHOLD = 200
+CHUNK_SIZE = 100_000
+
+_matrices = {}
+
+
+def _matrix(path):
+    # Une seule ouverture par processus worker
+    if path not in _matrices:
+        _matrices[path] = load_matrix(path)
+    return _matrices[path]
+
+
+def draw_countries(rng, n_countries, batch, size=GAME_SIZE):
+    """Tire `batch` suites de `size` pays sans remise (B, size), dans l'ordre du tirage"""
+    countries = rng.integers(n_countries, size=(batch, size))
+    # Retirage des seules suites où un pays est sorti deux fois
+    while True:
+        ordered = np.sort(countries, axis=1)
+        repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not repeated.any():
+            return countries
+        countries[repeated] = rng.integers(n_countries, size=(int(repeated.sum()), size))
+
+
+def draw_games(rng, n_categories, n_countries, batch, size=GAME_SIZE):
+    """Tire `batch` parties : catégories (B, size) et pays par manche (B, size), sans remise"""
+    categories = np.argsort(rng.random((batch, n_categories)), axis=1)[:, :size]
+    return categories, draw_countries(rng, n_countries, batch, size)
+
+
+def set_keys(categories, n_categories):
+    """Clé entière d'une combinaison : identifiants triés écrits en base n_categories"""
+    if n_categories ** categories.shape[1] >= 2 ** 63:
+        raise ValueError(f"{n_categories} catégories : clés de combinaison hors int64")
+    ordered = np.sort(categories, axis=1).astype(np.int64)
+    weights = n_categories ** np.arange(categories.shape[1], dtype=np.int64)
+    return ordered @ weights
+
+
+def decode_set_key(key, n_categories, size=GAME_SIZE):
+    """Identifiants de catégories d'une clé de combinaison"""
+    return [int(key // n_categories ** i % n_categories) for i in range(size)]
+
+
+def play(cost, strategy, rng):
+    """Scores d'un lot de parties (B, manches, catégories) selon une stratégie"""
+    batch, rounds, size = cost.shape
+    games = np.arange(batch)
+    if strategy == "random":
+        placement = np.argsort(rng.random((batch, rounds)), axis=1)[:, :size]
+        return cost[games[:, None], np.arange(rounds), placement].sum(axis=1)
+    if strategy == "greedy":
+        scores = np.zeros(batch, dtype=np.int64)
+        taken = np.zeros((batch, size), dtype=bool)
+        for i in range(rounds):
+            options = np.where(taken, np.iinfo(np.int32).max, cost[:, i, :])
+            choice = options.argmin(axis=1)
+            scores += cost[games, i, choice]
+            taken[games, choice] = True
+        return scores
+    if strategy == "optimal":
+        scores, _ = solve(cost, with_assignment=False)
+        return scores.astype(np.int64)
+    raise ValueError(f"Stratégie inconnue : {strategy!r}")
+
+
+def _simulate_chunk(matrix_path, strategies, batch, seed, threshold):
+    matrix = _matrix(matrix_path)
+    rng = np.random.default_rng(seed)
+    n_countries, n_categories = matrix.shape
+    categories, countries = draw_games(rng, n_categories, n_countries, batch)
+    cost = cost_tensor(matrix, categories, countries)
+
+    # Agrégation par combinaison de catégories
+    keys, inverse = np.unique(set_keys(categories, n_categories), return_inverse=True)
+    partial = {"keys": keys, "games": np.bincount(inverse, minlength=len(keys)), "strategies": {}}
+    max_score = GAME_SIZE * max(int(np.asarray(matrix.ranks).max(initial=0)), NULL_COST)
+    for strategy in strategies:
+        scores = play(cost, strategy, rng)
+        won = scores < threshold
+        partial["strategies"][strategy] = {
+            "histogram": np.bincount(scores, minlength=max_score + 1),
+            "wins": np.bincount(inverse, weights=won, minlength=len(keys)),
+            "score_sums": np.bincount(inverse, weights=scores, minlength=len(keys)),
+        }
+    return partial
+
+
+class SimulationResult:
+    """Agrégats d'une simulation : histogrammes de scores et victoires par combinaison"""
+
+    def __init__(self, categories, strategies, threshold):
+        self.categories = categories
+        self.strategies = list(strategies)
+        self.threshold = threshold
+        self.games = 0
+        self.histograms = {}
+        self.set_keys = np.empty(0, dtype=np.int64)
+        self.set_games = np.empty(0)
+        self.set_wins = {strategy: np.empty(0) for strategy in self.strategies}
+        self.set_scores = {strategy: np.empty(0) for strategy in self.strategies}
+
+    def add(self, partial):
+        """Fusionne les agrégats d'un lot"""
+        self.games += int(partial["games"].sum())
+        keys, inverse = np.unique(np.concatenate([self.set_keys, partial["keys"]]), return_inverse=True)
+
+        def merge(current, added):
+            return np.bincount(inverse, weights=np.concatenate([current, added]), minlength=len(keys))
+
+        self.set_games = merge(self.set_games, partial["games"])
+        for strategy, data in partial["strategies"].items():
+            histogram = self.histograms.get(strategy)
+            self.histograms[strategy] = data["histogram"] if histogram is None else histogram + data["histogram"]
+            self.set_wins[strategy] = merge(self.set_wins[strategy], data["wins"])
+            self.set_scores[strategy] = merge(self.set_scores[strategy], data["score_sums"])
+        self.set_keys = keys
+
+    def win_rate(self, strategy):
+        return float(self.histograms[strategy][:self.threshold].sum() / max(self.games, 1))
+
+    def quantiles(self, strategy, levels=(0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)):
+        """Quantiles du score lus sur la distribution cumulée"""
+        cdf = np.cumsum(self.histograms[strategy]) / max(self.games, 1)
+        return {str(level): int(np.searchsorted(cdf, level)) for level in levels}
+
+    def threshold_for(self, strategy, win_rate):
+        """Seuil de victoire qui donnerait le taux de victoire visé"""
+        cdf = np.cumsum(self.histograms[strategy]) / max(self.games, 1)
+        return int(np.searchsorted(cdf, win_rate)) + 1
+
+    def category_sets(self, strategy, min_games=1):
+        """(catégories, parties, taux de victoire, score moyen) par combinaison jouée"""
+        enough = self.set_games >= min_games
+        games = self.set_games[enough]
+        rates = self.set_wins[strategy][enough] / games
+        means = self.set_scores[strategy][enough] / games
+        return [
+            ([self.categories[j] for j in decode_set_key(key, len(self.categories))],
+             int(count), float(rate), float(mean))
+            for key, count, rate, mean in zip(self.set_keys[enough], games, rates, means)
+        ]
+
+    def report(self, top=20, min_games=20):
+        """Rapport sérialisable en JSON"""
+        strategies = {}
+        for strategy in self.strategies:
+            histogram = self.histograms[strategy]
+            scores = np.arange(len(histogram))
+            mean = float((histogram * scores).sum() / max(self.games, 1))
+            variance = float((histogram * (scores - mean) ** 2).sum() / max(self.games, 1))
+            sets = sorted(self.category_sets(strategy, min_games), key=lambda item: (item[2], -item[3]))
+
+            def describe(item):
+                return {"categories": item[0], "games": item[1], "win_rate": item[2], "mean_score": item[3]}
+
+            strategies[strategy] = {
+                "mean_score": mean,
+                "std_score": variance ** 0.5,
+                "win_rate": self.win_rate(strategy),
+                "quantiles": self.quantiles(strategy),
+                "threshold_for_win_rate": {str(rate): self.threshold_for(strategy, rate)
+                                           for rate in (0.1, 0.25, 0.5)},
+                "hardest_sets": [describe(item) for item in sets[:top]],
+                "easiest_sets": [describe(item) for item in reversed(sets[-top:])],
+                "histogram": histogram[:int(np.flatnonzero(histogram).max()) + 1].tolist() if self.games else [],
+            }
+        return {"games": self.games, "threshold": self.threshold,
+                "category_sets": len(self.set_keys), "strategies": strategies}
+
+
+def simulate(matrix_path, games, strategies=STRATEGIES, threshold=WIN_THRESHOLD, jobs=1,
+             seed=None, chunk_size=CHUNK_SIZE):
+    """Simule `games` parties et retourne un SimulationResult
+
+    Chaque lot a sa propre graine dérivée de `seed` : le résultat ne dépend
+    pas du nombre de processus.
+    """
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Stratégie inconnue : {strategy!r}")
+    matrix = _matrix(matrix_path)
+    sizes = [min(chunk_size, games - start) for start in range(0, games, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = [(matrix_path, tuple(strategies), size, chunk_seed, threshold)
+                 for size, chunk_seed in zip(sizes, seeds)]
+
+    result = SimulationResult(matrix.categories, strategies, threshold)
+    if jobs > 1 and len(arguments) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for partial in pool.map(_simulate_chunk, *zip(*arguments)):
+                result.add(partial)
+    else:
+        for args in arguments:
+            result.add(_simulate_chunk(*args))
+    return result
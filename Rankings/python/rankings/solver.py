@@ -0,0 +1,175 @@
+"""Meilleur score atteignable d'une partie (affectation optimale pays -> catégories)
+
+`calculateTheoreticalBest` côté jeu additionne le meilleur rang de chaque
+catégorie sur tous les pays, ce qui est inatteignable : chaque pays tiré ne
+remplit qu'une catégorie. Ici le meilleur score est celui de l'affectation
+optimale des pays réellement tirés aux catégories de la partie.
+
+L'affectation est résolue par programmation dynamique sur les sous-ensembles
+de catégories déjà remplies (2^8 = 256 états), vectorisée sur tout un lot de
+parties : le nombre d'opérations NumPy ne dépend que de la taille d'une partie,
+pas du nombre de parties.
+
+Une case NULL coûte NULL_COST, comme dans le score du jeu et dans
+rankings.verify : les meilleurs scores et les regrets sont ceux des règles
+réellement jouées.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from .compact import NULL_COST, NULL_RANK
+
+# Lot traité d'un bloc (la reconstruction des affectations garde n x 2^k octets par partie)
+CHUNK_SIZE = 16384
+_INFINITY = np.iinfo(np.int32).max // 2
+
+
+def cost_tensor(matrix, category_ids, country_ids, null_cost=NULL_COST):
+    """Rangs des pays (lignes) dans les catégories (colonnes) de chaque partie
+
+    `category_ids` (B, k) et `country_ids` (B, n) donnent un tenseur (B, n, k).
+    Les cases NULL valent `null_cost`.
+    """
+    category_ids = np.asarray(category_ids, dtype=np.intp)
+    country_ids = np.asarray(country_ids, dtype=np.intp)
+    ranks = np.asarray(matrix.ranks)[country_ids[:, :, None], category_ids[:, None, :]]
+    cost = ranks.astype(np.int32)
+    cost[ranks == NULL_RANK] = null_cost
+    return cost
+
+
+@lru_cache(maxsize=None)
+def _transitions(n, k):
+    """États sources utiles pour chaque (pays i, catégorie j)
+
+    Au pays i, un état (ensemble de catégories remplies) n'est atteignable que
+    si son cardinal est entre i - (n - k) et i ; on ne parcourt que ceux-là.
+    Avec moins de pays que de catégories, tout pays est placé : cardinal i.
+    """
+    masks = np.arange(1 << k)
+    popcount = np.array([bin(mask).count("1") for mask in masks])
+    table = []
+    for i in range(n):
+        low, high = max(0, i - max(n - k, 0)), min(i, k - 1)
+        layer = masks[(popcount >= low) & (popcount <= high)]
+        table.append([layer[(layer >> j) & 1 == 0] for j in range(k)])
+    return table
+
+
+def _solve_chunk(cost, with_assignment=True):
+    batch, n, k = cost.shape
+    states = 1 << k
+    # États en lignes, parties en colonnes : chaque gather lit des lignes contiguës
+    dp = np.full((states, batch), _INFINITY, dtype=np.int32)
+    dp[0] = 0
+    cost = np.ascontiguousarray(cost.transpose(1, 2, 0))
+    choices = []
+
+    for i, sources in enumerate(_transitions(n, k)):
+        # Sans pays en surplus, sources (cardinal i) et cibles (i + 1) sont disjointes :
+        # la mise à jour peut se faire sur place
+        previous = dp.copy() if n > k else dp
+        choice = np.zeros((states, batch), dtype=np.int8) if with_assignment else None
+        for j, source in enumerate(sources):
+            if not len(source):
+                continue
+            target = source | (1 << j)
+            candidate = previous[source] + cost[i, j]
+            current = dp[target]
+            if with_assignment:
+                better = candidate < current
+                dp[target] = np.where(better, candidate, current)
+                choice[target] = np.where(better, j + 1, choice[target])
+            else:
+                dp[target] = np.minimum(candidate, current)
+        if with_assignment:
+            choices.append(choice)
+
+    scores = dp[states - 1].copy()
+    if not with_assignment:
+        return scores, None
+
+    # Reconstruction : pays placé dans chaque catégorie (-1 si aucun)
+    assignment = np.full((batch, k), -1, dtype=np.int16)
+    state = np.full(batch, states - 1, dtype=np.intp)
+    games = np.arange(batch)
+    for i in range(n - 1, -1, -1):
+        taken = choices[i][state, games].astype(np.intp) - 1
+        placed = taken >= 0
+        assignment[games[placed], taken[placed]] = i
+        state[placed] ^= 1 << taken[placed]
+    return scores, assignment
+
+
+def solve(cost, with_assignment=True, jobs=1, chunk_size=CHUNK_SIZE):
+    """Affectation optimale pour un lot de parties
+
+    `cost` est un tenseur (B, n, k) avec n >= k pays tirés et k catégories.
+    Retourne les scores optimaux (B,) et, si demandé, pour chaque catégorie
+    l'indice du pays qui y est placé (B, k). Avec `jobs` > 1 les blocs sont
+    répartis sur un pool de processus.
+    """
+    cost = np.asarray(cost, dtype=np.int32)
+    batch, n, k = cost.shape
+    if n < k:
+        raise ValueError(f"{n} pays pour {k} catégories : affectation impossible")
+    chunks = [cost[start:start + chunk_size] for start in range(0, batch, chunk_size)] or [cost]
+
+    if jobs > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_solve_chunk, chunks, [with_assignment] * len(chunks)))
+    else:
+        results = [_solve_chunk(chunk, with_assignment) for chunk in chunks]
+
+    scores = np.concatenate([scores for scores, _ in results])
+    if not with_assignment:
+        return scores, None
+    return scores, np.concatenate([assignment for _, assignment in results])
+
+
+def remainders(cost):
+    """Meilleur placement de k - 1 pays sur k catégories, pour chaque catégorie laissée libre
+
+    `cost` est un tenseur (B, k - 1, k) ; retourne (B, k) : en j, le meilleur
+    score des pays placés dans toutes les catégories sauf j. Une seule
+    programmation dynamique donne les k cas (états de cardinal k - 1).
+    """
+    cost = np.asarray(cost, dtype=np.int32)
+    batch, n, k = cost.shape
+    if n != k - 1:
+        raise ValueError(f"{n} pays pour {k} catégories : il en faut une de moins")
+    full = (1 << k) - 1
+    dp = np.full((1 << k, batch), _INFINITY, dtype=np.int32)
+    dp[0] = 0
+    cost = np.ascontiguousarray(cost.transpose(1, 2, 0))
+    # Sources (cardinal i) et cibles (i + 1) disjointes : mise à jour sur place
+    for i, sources in enumerate(_transitions(n, k)):
+        for j, source in enumerate(sources):
+            if len(source):
+                target = source | (1 << j)
+                dp[target] = np.minimum(dp[target], dp[source] + cost[i, j])
+    return dp[[full ^ (1 << j) for j in range(k)]].T
+
+
+def best_score(matrix, categories, countries, null_cost=NULL_COST):
+    """Meilleur score d'une partie et affectation {catégorie: pays} correspondante"""
+    category_ids = [matrix.category_index[name] for name in categories]
+    country_ids = [matrix.country_index[name] for name in countries]
+    cost = cost_tensor(matrix, [category_ids], [country_ids], null_cost)
+    scores, assignment = solve(cost)
+    placement = {name: countries[i] for name, i in zip(categories, assignment[0])}
+    return int(scores[0]), placement
+
+
+def backfill(matrix, games, jobs=1, null_cost=NULL_COST):
+    """Score optimal et regret (score joué - optimal) d'un lot de parties
+
+    `games` est un `GameArrays` (cf. rankings.games). Retourne deux tableaux
+    alignés sur `games.ids`.
+    """
+    cost = cost_tensor(matrix, games.categories, games.countries, null_cost)
+    optimal, _ = solve(cost, with_assignment=False, jobs=jobs)
+    return optimal, games.scores - optimal
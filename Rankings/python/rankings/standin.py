@@ -0,0 +1,114 @@
+"""Serveur compatible PostgREST en mémoire, pour tester rankings.upload sans base
+
+Ne sert que ce qu'utilise le chargement, sur une table dont `country` est la
+clé :
+
+    GET    /{table}?select=a,b&order=country&limit=&offset=   lecture par pages
+    POST   /{table}?on_conflict=country                       insertion ou upsert
+           (Prefer: resolution=merge-duplicates)
+    DELETE /{table}?country=in.("a","b")                      suppression
+
+`failures` donne, par méthode, des statuts HTTP renvoyés avant de servir les
+requêtes suivantes (503 pour exercer la reprise, 400 pour une erreur
+définitive) ; `log` garde la méthode et la taille de chaque requête servie.
+"""
+
+import json
+import re
+from contextlib import asynccontextmanager
+
+from .upload import TABLE
+
+KEY = "country"
+_QUOTED = re.compile(r'\s*"((?:[^"\\]|\\.)*)"\s*|([^,]+)')
+_ESCAPE = re.compile(r"\\(.)")
+
+
+def parse_in(text):
+    """Valeurs d'un filtre PostgREST `in.(...)` (entre guillemets ou nues)"""
+    if not (text.startswith("in.(") and text.endswith(")")):
+        raise ValueError(f"Filtre non supporté : {text!r}")
+    return [_ESCAPE.sub(r"\1", quoted) if quoted else bare.strip()
+            for quoted, bare in _QUOTED.findall(text[4:-1])]
+
+
+class StandIn:
+    """Table `rankings` en mémoire servie par une application aiohttp"""
+
+    def __init__(self, rows=(), table=TABLE):
+        self.table = table
+        self.rows = {row[KEY]: dict(row) for row in rows}
+        self.failures = {}
+        self.log = []
+
+    def _error(self, status, message):
+        from aiohttp import web
+
+        headers = {"Retry-After": "0"} if status == 503 else {}
+        return web.json_response({"message": message}, status=status, headers=headers)
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        pending = self.failures.get(request.method)
+        if pending:
+            return self._error(pending.pop(0), "Erreur simulée")
+        if request.match_info["table"] != self.table:
+            return self._error(404, f"Table inconnue : {request.match_info['table']}")
+
+        query = request.query
+        if request.method == "GET":
+            rows = [self.rows[key] for key in sorted(self.rows)]
+            offset = int(query.get("offset", 0))
+            rows = rows[offset:offset + int(query["limit"])] if "limit" in query else rows[offset:]
+            if "select" in query:
+                columns = query["select"].split(",")
+                rows = [{column: row.get(column) for column in columns} for row in rows]
+            self.log.append(("GET", len(rows)))
+            return web.json_response(rows)
+
+        if request.method == "POST":
+            batch = json.loads(await request.text())
+            merge = "resolution=merge-duplicates" in request.headers.get("Prefer", "")
+            if query.get("on_conflict") != KEY:
+                return self._error(400, "on_conflict=country attendu")
+            conflicts = [row[KEY] for row in batch if row[KEY] in self.rows]
+            if conflicts and not merge:
+                return self._error(409, f"Clé déjà présente : {conflicts[0]}")
+            for row in batch:
+                self.rows.setdefault(row[KEY], {}).update(row)
+            self.log.append(("POST", len(batch)))
+            return web.Response(status=201)
+
+        if request.method == "DELETE":
+            try:
+                names = parse_in(query.get(KEY, ""))
+            except ValueError as error:
+                return self._error(400, str(error))
+            for name in names:
+                self.rows.pop(name, None)
+            self.log.append(("DELETE", len(names)))
+            return web.Response(status=204)
+        return self._error(405, f"Méthode non supportée : {request.method}")
+
+    def app(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_route("*", "/{table}", self._handle)
+        return app
+
+    @asynccontextmanager
+    async def running(self, host="127.0.0.1"):
+        """Sert la table sur un port libre ; donne l'URL de base à passer à `upload`"""
+        from aiohttp import web
+
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, 0)
+        await site.start()
+        try:
+            address, port = runner.addresses[0][:2]
+            yield f"http://{address}:{port}"
+        finally:
+            await runner.cleanup()
@@ -0,0 +1,139 @@
+"""Génération de fichiers de catégorie synthétiques, aux formats réels de Data/Category
+
+Les fichiers reproduisent les variantes rencontrées dans les vrais fichiers :
+noms entourés d'espaces ou de guillemets, variantes françaises tirées de
+`country_mapping`, décimales à virgule, dates en texte libre, fichier sans
+en-tête, noms inconnus ou territoires exclus à ignorer. Les entités sont les
+vrais pays complétés par des noms inventés, uniques après normalisation.
+
+La génération est déterministe pour une graine donnée. Les rangs tiennent sur
+int16 (cf. rankings.matrix) : au-delà de MAX_RANK entités, chaque catégorie
+n'en classe qu'un sous-ensemble.
+"""
+
+import csv
+import random
+
+from .categories import CategorySchema
+from .countries import (CountryResolver, canonical_countries, country_mapping, excluded_territories,
+                        normalize_key)
+from .matrix import MAX_RANK
+
+# Variantes de mise en forme, dans les proportions approximatives des vrais fichiers
+LAYOUTS = [
+    {"header": ["Rank", "Country"], "name": '  {}', "quoted": True},
+    {"header": ["Rank", "Country"], "name": " {}", "quoted": False},
+    {"header": ["Rank", "Country"], "name": " {} ", "quoted": False},
+    {"header": ["Rank", "Country"], "name": "{}", "quoted": False},
+    {"header": ["Rank", "Country", "Rate"], "name": " {}", "quoted": False, "value": "decimal"},
+    {"header": ["Rank", "Country", "Superficie"], "name": "  {}", "quoted": False, "value": "decimal"},
+    {"header": None, "name": "  {}", "quoted": False, "value": "decimal"},
+    {"header": ["Rank", "Country", "Date"], "name": "  {}", "quoted": False, "value": "date"},
+]
+# Part des lignes écrites avec une variante (française, casse, accents)
+ALIAS_RATE = 0.3
+# Part des lignes de bruit (noms inconnus, territoires exclus)
+NOISE_RATE = 0.005
+# Part des entités classées dans chaque catégorie
+COVERAGE = 0.95
+
+_SYLLABLES = ["ka", "ro", "mi", "ta", "lo", "ne", "su", "va", "ri", "do", "pe", "li", "ma", "zo",
+              "be", "ha", "tu", "ni", "sa", "go", "fe", "ju", "ra", "wi"]
+_MONTHS = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre",
+           "octobre", "novembre", "décembre"]
+
+
+def _invented_name(index):
+    # Quatre syllabes écrivent l'indice en base len(_SYLLABLES) : noms distincts
+    rest, digits = divmod(index, len(_SYLLABLES) ** 4)
+    name = ""
+    for _ in range(4):
+        digits, digit = divmod(digits, len(_SYLLABLES))
+        name += _SYLLABLES[digit]
+    return name.capitalize() + "land" + (f" {rest}" if rest else "")
+
+
+def entities(count):
+    """Vrais pays suivis de noms inventés, `count` au total"""
+    names = list(canonical_countries[:count])
+    keys = {normalize_key(name) for name in list(canonical_countries) + list(country_mapping)}
+    index = 0
+    while len(names) < count:
+        name = _invented_name(index)
+        index += 1
+        if normalize_key(name) not in keys:
+            keys.add(normalize_key(name))
+            names.append(name)
+    return names
+
+
+def _variants(names):
+    """Pays -> variantes qui doivent se résoudre vers lui"""
+    variants = {name: [] for name in names}
+    for alias, target in country_mapping.items():
+        if target in variants:
+            variants[target].append(alias)
+    return variants
+
+
+def _variant(name, aliases, rng):
+    if aliases and rng.random() < 0.7:
+        return rng.choice(aliases)
+    if rng.random() < 0.5:
+        return name.upper()
+    return name.replace("a", "à", 1) if "a" in name else name.lower()
+
+
+def _value(kind, rank, count, rng):
+    # Valeurs cohérentes avec le rang : décroissantes (décimales), croissantes (dates)
+    if kind == "decimal":
+        return f"{100 * (count - rank) / count:.2f}".replace(".", ",")
+    year = -500 + (2520 * rank) // count
+    style = rng.random()
+    if style < 0.4:
+        return str(year)
+    if style < 0.7:
+        return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{max(year, 1)}"
+    day = rng.randint(1, 28)
+    return f"{'1er' if day == 1 else day} {rng.choice(_MONTHS)} {max(year, 1)}[notes {rng.randint(1, 9)}]"
+
+
+def generate(directory, categories, count, seed=0):
+    """Écrit `categories` fichiers sur `count` entités dans `directory`
+
+    Retourne (schémas, résolveur) à passer à `build` : le résolveur connaît
+    les entités et leurs variantes.
+    """
+    rng = random.Random(seed)
+    names = entities(count)
+    variants = _variants(names)
+    covered = min(int(count * COVERAGE) or count, MAX_RANK)
+    noise = ["Atlantis", "Zubrowka", "Freedonia"] + sorted(excluded_territories)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    generated = []
+    for j in range(categories):
+        layout = LAYOUTS[j % len(LAYOUTS)]
+        schema = CategorySchema(f"Category {j:04d}", f"Category {j:04d}.csv",
+                                header=layout["header"] is not None, value=layout.get("value"),
+                                direction="desc" if layout.get("value") == "decimal" else "asc")
+        ranked = rng.sample(names, covered)
+        with open(directory / schema.filename, "w", newline="", encoding="utf-8") as f:
+            # En-tête jamais entre guillemets ; ",," pour les fichiers sans en-tête
+            f.write(",".join(layout["header"] or ["", "", ""]) + "\n")
+            writer = csv.writer(f, lineterminator="\n",
+                                quoting=csv.QUOTE_NONNUMERIC if layout["quoted"] else csv.QUOTE_MINIMAL)
+            for rank, name in enumerate(ranked, start=1):
+                if rng.random() < ALIAS_RATE:
+                    name = _variant(name, variants[name], rng)
+                record = [rank, layout["name"].format(name)]
+                if schema.value:
+                    record.append(_value(schema.value, rank, covered, rng))
+                writer.writerow(record)
+                if rng.random() < NOISE_RATE:
+                    writer.writerow([rank, layout["name"].format(rng.choice(noise))])
+        generated.append(schema)
+
+    resolver = CountryResolver(countries=names, mapping={alias: target for target, aliases in variants.items()
+                                                         for alias in aliases})
+    return generated, resolver
@@ -0,0 +1,234 @@
+"""Chargement des classements dans la table `rankings` par l'API PostgREST
+
+Remplace le chargement de game-geozone/scripts/loadData.js : au lieu de
+réinsérer toutes les lignes avec de nouveaux identifiants, on lit l'état de la
+table, on calcule le différentiel avec la matrice construite et on n'envoie
+que les lignes nouvelles ou modifiées, en upsert sur la colonne `country`.
+Les lots partent en parallèle sur une session HTTP partagée (aiohttp), avec
+reprise sur erreur et un nombre borné de requêtes en vol.
+
+Fonctionne avec Supabase (`<projet>/rest/v1`) comme avec tout serveur
+compatible PostgREST. L'upsert demande une contrainte d'unicité :
+
+    alter table rankings add constraint rankings_country_key unique (country);
+"""
+
+import asyncio
+import os
+import random
+
+from .categories import db_columns
+from .matrix import NULL, NULL_RANK
+from .profiling import disabled
+
+TABLE = "rankings"
+BATCH_SIZE = 100
+CONCURRENCY = 4
+RETRIES = 5
+PAGE_SIZE = 1000
+# Statuts pour lesquels une requête est retentée
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class UploadError(RuntimeError):
+    """Réponse d'erreur définitive de l'API"""
+
+
+def rest_url_from_env():
+    """URL REST et clé à partir des variables utilisées par le jeu (.env)"""
+    url = os.environ.get("PUBLIC_SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("PUBLIC_SUPABASE_ANON_KEY")
+    return (url.rstrip("/") + "/rest/v1" if url else None), key
+
+
+def snapshot_rows(matrix):
+    """Lignes de la table `rankings` correspondant à la matrice, indexées par pays"""
+    columns = [db_columns.get(category, category) for category in matrix.categories]
+    rows = {}
+    for country, ranks in zip(matrix.countries, matrix.ranks.tolist()):
+        row = {"country": country}
+        for column, rank in zip(columns, ranks):
+            row[column] = None if rank == NULL_RANK else rank
+        rows[country] = row
+    return rows
+
+
+def _normalize(value):
+    # Les anciens chargements ont pu écrire "NULL" ou des rangs en texte
+    if value is None or value == NULL:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def diff_rows(current, target):
+    """Lignes à upserter (nouvelles ou modifiées) et pays à supprimer"""
+    upserts = []
+    for country, row in target.items():
+        existing = current.get(country)
+        if existing is None or any(_normalize(existing.get(column)) != value
+                                   for column, value in row.items()):
+            upserts.append(row)
+    deletions = [country for country in current if country not in target]
+    return upserts, deletions
+
+
+class UploadReport:
+    """Résumé d'un chargement"""
+
+    def __init__(self):
+        self.existing = 0
+        self.upserted = 0
+        self.deleted = 0
+        self.unchanged = 0
+        self.requests = 0
+        self.retries = 0
+
+
+class RestClient:
+    """Client PostgREST minimal sur une session aiohttp partagée"""
+
+    def __init__(self, session, base_url, key=None, retries=RETRIES, report=None):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.report = report or UploadReport()
+        self.headers = {"Content-Type": "application/json"}
+        if key:
+            self.headers.update({"apikey": key, "Authorization": f"Bearer {key}"})
+
+    async def request(self, method, path, params=None, json=None, headers=None):
+        """Requête avec reprise (backoff exponentiel, Retry-After) sur les erreurs transitoires"""
+        import aiohttp
+
+        url = f"{self.base_url}/{path}"
+        for attempt in range(self.retries + 1):
+            self.report.requests += 1
+            delay = None
+            try:
+                async with self.session.request(method, url, params=params, json=json,
+                                                headers={**self.headers, **(headers or {})}) as response:
+                    if response.status < 400:
+                        if response.content_type == "application/json":
+                            return await response.json()
+                        return None
+                    body = await response.text()
+                    if response.status not in RETRY_STATUSES or attempt == self.retries:
+                        raise UploadError(f"{method} {path} : HTTP {response.status} {body[:200]}")
+                    retry_after = response.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        delay = int(retry_after)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    raise
+            self.report.retries += 1
+            await asyncio.sleep(delay if delay is not None else 0.25 * 2 ** attempt + random.random() * 0.1)
+
+    async def fetch_all(self, table, columns):
+        """Toutes les lignes d'une table, par pages"""
+        rows = []
+        params = {"select": ",".join(columns), "order": "country"}
+        while True:
+            page = await self.request("GET", table, params={**params, "limit": PAGE_SIZE,
+                                                            "offset": len(rows)})
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+
+
+async def _run_batches(batches, worker, concurrency):
+    """Exécute `worker` sur chaque lot avec au plus `concurrency` lots en vol
+
+    Le sémaphore fait office de contre-pression : un lot n'est lancé que
+    lorsqu'un précédent est terminé. La première erreur interrompt le reste.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = []
+
+    async def guarded(batch):
+        try:
+            await worker(batch)
+        finally:
+            semaphore.release()
+
+    try:
+        for batch in batches:
+            await semaphore.acquire()
+            for task in tasks:
+                if task.done() and task.exception():
+                    raise task.exception()
+            tasks.append(asyncio.create_task(guarded(batch)))
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Les lots annulés ne sont terminés qu'une fois attendus (connexions rendues à la session)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def upload(matrix, base_url, key=None, table=TABLE, batch_size=BATCH_SIZE,
+                 concurrency=CONCURRENCY, prune=False, dry_run=False, profiler=None):
+    """Synchronise la table avec la matrice et retourne un UploadReport
+
+    Avec `prune`, les pays absents de la matrice sont supprimés de la table.
+    Avec `dry_run`, seul le différentiel est calculé.
+    """
+    profiler = profiler or disabled("upload")
+    try:
+        import aiohttp
+    except ImportError:
+        raise RuntimeError("Le chargement nécessite aiohttp (pip install aiohttp)") from None
+
+    report = UploadReport()
+    target = snapshot_rows(matrix)
+    columns = ["country"] + [db_columns.get(category, category) for category in matrix.categories]
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        client = RestClient(session, base_url, key, report=report)
+        with profiler.stage("fetch") as stage:
+            current = {row["country"]: row for row in await client.fetch_all(table, columns)}
+            stage.record(rows_out=len(current), requests=report.requests)
+        with profiler.stage("diff") as stage:
+            upserts, deletions = diff_rows(current, target)
+            report.existing = len(current)
+            report.unchanged = len(target) - len(upserts)
+            if not prune:
+                deletions = []
+            stage.record(rows_in=len(target), upserts=len(upserts), deletions=len(deletions),
+                         unchanged=report.unchanged)
+        if dry_run:
+            report.upserted, report.deleted = len(upserts), len(deletions)
+            return report
+
+        async def send_upserts(batch):
+            await client.request("POST", table, params={"on_conflict": "country"}, json=batch,
+                                 headers={"Prefer": "resolution=merge-duplicates,return=minimal"})
+            report.upserted += len(batch)
+
+        async def send_deletions(batch):
+            # Antislash échappé avant les guillemets (syntaxe des valeurs entre guillemets de PostgREST)
+            names = ",".join('"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"' for name in batch)
+            await client.request("DELETE", table, params={"country": f"in.({names})"},
+                                 headers={"Prefer": "return=minimal"})
+            report.deleted += len(batch)
+
+        with profiler.stage("send") as stage:
+            requests, retries = report.requests, report.retries
+            await _run_batches(_batches(upserts, batch_size), send_upserts, concurrency)
+            await _run_batches(_batches(deletions, batch_size), send_deletions, concurrency)
+            stage.record(rows_out=report.upserted + report.deleted, requests=report.requests - requests,
+                         retries=report.retries - retries)
+    return report
+
+
+def run_upload(matrix, base_url, key=None, **options):
+    """Version synchrone de `upload`"""
+    return asyncio.run(upload(matrix, base_url, key, **options))
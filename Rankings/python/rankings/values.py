@@ -0,0 +1,166 @@
+"""Valeurs brutes des catégories et reclassement vectorisé
+
+Les rangs publiés ne sont plus recopiés des fichiers : ils sont recalculés à
+partir des valeurs (Superficie de Forest.csv, Rate de Suicide rate.csv, Date
+de Sovereignty.csv...) selon le sens et la règle d'égalité du schéma. Une
+catégorie sans colonne de valeur est classée sur son rang source. Les rangs
+sont ainsi toujours contigus (1..n) sur les pays effectivement publiés.
+
+Le tri est fait une seule fois, pour toute la matrice, par un `np.lexsort`
+colonne par colonne (valeur orientée, puis rang source pour départager). Le
+reclassement sur un sous-ensemble de pays (une région, les pays encore en
+jeu) n'a ensuite plus besoin de trier : dans l'ordre global, le rang d'un pays
+du sous-ensemble est le nombre de membres qui le précèdent, soit une somme
+cumulée du masque. Quelques dizaines de microsecondes pour 193 x 19.
+
+Règles d'égalité (`CategorySchema.ties`) :
+
+    min       rang de compétition, les ex aequo partagent le rang (1, 2, 2, 4) :
+              règle par défaut, celle des fichiers de rangs
+    ordinal   le rang source départage les valeurs égales (1, 2, 3) :
+              celle des fichiers à valeurs
+    dense     rangs sans trou après des ex aequo (1, 2, 2, 3)
+"""
+
+import numpy as np
+
+from .matrix import MAX_RANK, NULL_RANK, RANK_DTYPE, RankMatrix, intern_columns
+from .regions import region_bits, region_names, selector
+
+DIRECTIONS = ("asc", "desc")
+TIES = ("min", "ordinal", "dense")
+VALUE_DTYPE = np.float64
+REGION_DTYPE = np.uint64
+
+
+class ValueMatrix:
+    """Valeurs de chaque pays (lignes) dans chaque catégorie (colonnes)
+
+    `values` vaut NaN là où un pays n'a pas de valeur ; `source_ranks` sont
+    les rangs des fichiers (NULL_RANK si absents), utilisés pour départager.
+    `descending[j]` indique que la plus grande valeur est classée première.
+    """
+
+    def __init__(self, countries, categories, values, source_ranks, descending, ties,
+                 regions=None, bits=None):
+        self.countries = list(countries)
+        self.categories = list(categories)
+        self.values = np.asarray(values, dtype=VALUE_DTYPE)
+        self.source_ranks = np.asarray(source_ranks, dtype=RANK_DTYPE)
+        self.descending = np.asarray(descending, dtype=bool)
+        self.ties = list(ties)
+        unknown = sorted(set(self.ties) - set(TIES))
+        if unknown:
+            raise ValueError(f"Règles d'égalité inconnues : {unknown}")
+        self.regions = list(region_names if regions is None else regions)
+        self.bits = np.asarray(region_bits(self.countries, self.regions) if bits is None else bits,
+                               dtype=REGION_DTYPE)
+        self._country_index = None
+        self._prepare()
+
+    def _prepare(self):
+        """Ordre global de chaque colonne et début du groupe d'ex aequo de chaque position"""
+        valid = ~np.isnan(self.values)
+        if valid.size and valid.sum(axis=0).max() > MAX_RANK:
+            raise ValueError(f"Plus de {MAX_RANK} pays classés dans une catégorie")
+        keys = np.where(self.descending, -self.values, self.values)
+        keys[~valid] = np.inf
+        order = np.lexsort((self.source_ranks, keys), axis=0)
+        sorted_keys = np.take_along_axis(keys, order, axis=0)
+
+        rows = len(self.countries)
+        starts = np.ones(keys.shape, dtype=bool)
+        starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+        starts[:, [tie == "ordinal" for tie in self.ties]] = True
+        positions = np.broadcast_to(np.arange(rows, dtype=np.intp)[:, None], keys.shape)
+        group_start = np.maximum.accumulate(np.where(starts, positions, 0), axis=0)
+        # Indices à plat (ordre C) : une lecture ou un scatter 1-D coûte moins que *_along_axis
+        columns = np.arange(keys.shape[1], dtype=np.intp)
+        self._order = order
+        self._order_flat = (order * keys.shape[1] + columns).ravel()
+        self._group_start_flat = (group_start * keys.shape[1] + columns).ravel()
+        self._valid_sorted = np.take_along_axis(valid, order, axis=0)
+        self._dense = np.array([tie == "dense" for tie in self.ties], dtype=bool)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def country_index(self):
+        if self._country_index is None:
+            self._country_index = {name: i for i, name in enumerate(self.countries)}
+        return self._country_index
+
+    @classmethod
+    def from_columns(cls, columns, schemas, country_order=None):
+        """Fusionne des colonnes {catégorie: (pays, rangs, valeurs)} en une matrice
+
+        Mêmes règles que RankMatrix.from_columns (un pays par colonne, cf.
+        parse_category). Une valeur None donne NaN ; une catégorie sans
+        colonne de valeur prend son rang source comme valeur.
+        """
+        categories = [schema.column for schema in schemas]
+        present, countries, inverse = intern_columns(columns, categories, country_order)
+        shape = (len(countries), len(categories))
+        values = np.full(shape, np.nan, dtype=VALUE_DTYPE)
+        source_ranks = np.full(shape, NULL_RANK, dtype=RANK_DTYPE)
+        by_column = {schema.column: schema for schema in schemas}
+        offset = 0
+        for name in present:
+            _, ranks, column_values = columns[name]
+            ranks = np.asarray(ranks, dtype=np.int64)
+            if ranks.size and (ranks.min() < 1 or ranks.max() > MAX_RANK):
+                raise ValueError(f"Rang hors limites dans {name!r} (1..{MAX_RANK})")
+            rows = inverse[offset:offset + len(ranks)]
+            j = categories.index(name)
+            source_ranks[rows, j] = ranks
+            values[rows, j] = (np.array(column_values, dtype=VALUE_DTYPE) if by_column[name].value
+                               else ranks)
+            offset += len(ranks)
+        descending = [schema.value is not None and schema.direction == "desc" for schema in schemas]
+        return cls(countries.tolist(), categories, values, source_ranks, descending,
+                   [schema.ties for schema in schemas])
+
+    def ranks(self, mask=None):
+        """Rangs recalculés sur les pays de `mask` (tous si None)
+
+        Retourne une matrice int16 de la forme complète : NULL_RANK hors du
+        masque et là où la valeur manque. Aucun tri : O(pays x catégories).
+        """
+        members = self._valid_sorted
+        if mask is not None:
+            members = members & np.asarray(mask, dtype=bool)[self._order]
+        before = np.cumsum(members, axis=0, dtype=RANK_DTYPE)
+        before -= members
+        at_start = before.ravel()[self._group_start_flat].reshape(self.shape)
+        ranks = at_start + 1
+        if self._dense.any():
+            first = members & (before == at_start)
+            ranks = np.where(self._dense, np.cumsum(first, axis=0, dtype=RANK_DTYPE), ranks)
+        ranks[~members] = NULL_RANK
+        result = np.empty(self.shape, dtype=RANK_DTYPE)
+        result.ravel()[self._order_flat] = ranks.ravel()
+        return result
+
+    def rank_matrix(self, mask=None):
+        """RankMatrix des pays de `mask` (tous si None), rangs recalculés"""
+        ranks = self.ranks(mask)
+        if mask is None:
+            return RankMatrix(self.countries, self.categories, ranks)
+        mask = np.asarray(mask, dtype=bool)
+        return RankMatrix([name for name, kept in zip(self.countries, mask.tolist()) if kept],
+                          self.categories, ranks[mask])
+
+    def region_mask(self, *names):
+        """Pays appartenant à au moins une des régions `names`"""
+        return (self.bits & REGION_DTYPE(selector(names, self.regions))) != 0
+
+    def country_mask(self, countries):
+        """Masque d'une liste de pays (par exemple ceux encore en jeu)"""
+        mask = np.zeros(len(self.countries), dtype=bool)
+        unknown = [name for name in countries if name not in self.country_index]
+        if unknown:
+            raise ValueError(f"Pays inconnus : {unknown}")
+        mask[[self.country_index[name] for name in countries]] = True
+        return mask
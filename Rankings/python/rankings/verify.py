@@ -0,0 +1,327 @@
+"""Vérification côté serveur des parties soumises
+
+Le jeu calcule le score côté client (`calculateScore`, `checkWin`) et insère
+la partie dans `games` telle quelle : rien ne recontrôle `country_selections`,
+`score` ni `won`. Ce module revérifie chaque partie contre la matrice :
+
+    categories   GAME_SIZE catégories connues et distinctes, une sélection chacune
+    countries    pays connus de la matrice
+    repeated     aucun pays placé deux fois
+    rankings     chaque classement déclaré est celui de la matrice, à la
+                 version en vigueur à la date de la partie si un historique
+                 est fourni (rankings.history)
+    score        le score est la somme des classements (une case NULL coûte
+                 NULL_COST, 0 comme dans `calculateScore`)
+    won          `won` vaut score < WIN_THRESHOLD
+
+La matrice est chargée une fois. Les parties sont lues par lots : un seul
+passage Python par partie pour en extraire les noms, puis tous les contrôles
+sont des opérations NumPy sur le lot entier. Chaque partie reçoit un masque
+des contrôles en échec (FLAGS) ; `rankings`, `score` et `won` ne sont
+contrôlés que si catégories et pays sont reconnus.
+
+Deux usages : backfill sur des exports complets, ou contrôle des seules
+nouvelles soumissions d'un export NDJSON en ajout seul, en reprenant à l'octet
+où la dernière exécution s'était arrêtée (comme rankings.analytics).
+"""
+
+import bisect
+import csv
+import json
+import os
+from itertools import repeat
+from operator import itemgetter
+
+import numpy as np
+
+from .analytics import stream_export
+from .codec import ARCHIVE_SUFFIX, NO_TIME, WON, iter_archive, micros
+from .compact import NULL_COST, NULL_RANK
+from .games import GAME_SIZE, category_lookup
+from .history import _parse_time
+from .simulate import WIN_THRESHOLD
+
+FLAGS = {"categories": 1, "countries": 2, "repeated": 4, "rankings": 8, "score": 16, "won": 32}
+BATCH_SIZE = 65536
+CHECKPOINT_VERSION = 1
+# Classement déclaré absent ou non entier : ne correspond à aucun rang de la matrice
+_INVALID = NULL_RANK - 1
+
+
+def _lookup(table, names):
+    """Identifiants des noms (-1 si inconnu ou si ce n'est pas un nom)"""
+    try:
+        return np.fromiter(map(table.get, names, repeat(-1)), dtype=np.intp, count=len(names))
+    except TypeError:
+        # Valeur non hachable soumise à la place d'un nom
+        return np.array([table.get(name, -1) if isinstance(name, str) else -1 for name in names], dtype=np.intp)
+
+
+def _remap(codec, categories_of, countries_of):
+    """Identifiants du codec -> identifiants d'une matrice (-1 si inconnu)"""
+    return (_lookup(categories_of, codec.categories), _lookup(countries_of, codec.countries))
+
+
+class VerificationBatch:
+    """Verdicts d'un lot, alignés sur les parties lues"""
+
+    def __init__(self, ids, users, timestamps, scores, expected, flags, versions):
+        self.ids = ids
+        self.users = users
+        self.timestamps = timestamps
+        self.scores = scores
+        # Score recalculé depuis la matrice (-1 si catégories ou pays inconnus)
+        self.expected = expected
+        self.flags = flags
+        # Version de l'historique utilisée (-1 : matrice courante)
+        self.versions = versions
+
+    def __len__(self):
+        return len(self.ids)
+
+    def failed(self):
+        return np.flatnonzero(self.flags)
+
+    def counts(self):
+        """{contrôle: parties en échec}"""
+        return {name: int(np.count_nonzero(self.flags & bit)) for name, bit in FLAGS.items()}
+
+    def rows(self):
+        """Parties en échec : (id, joueur, date, score, score attendu, version, contrôles)"""
+        for i in self.failed().tolist():
+            flag = int(self.flags[i])
+            reasons = ";".join(name for name, bit in FLAGS.items() if flag & bit)
+            yield (self.ids[i], self.users[i], self.timestamps[i], int(self.scores[i]),
+                   int(self.expected[i]), int(self.versions[i]), reasons)
+
+
+class Verifier:
+    """Matrice (ou historique de matrices) chargée une fois, parties vérifiées par lots"""
+
+    def __init__(self, matrix, history=None, threshold=WIN_THRESHOLD, size=GAME_SIZE):
+        self.threshold = threshold
+        self.size = size
+        self.history = history if history is not None and len(history) else None
+        self._matrices = {-1: self._prepare(matrix)}
+        if self.history is not None:
+            self._times = [_parse_time(entry["timestamp"]) for entry in self.history.versions]
+            self._micros = np.array([micros(entry["timestamp"]) for entry in self.history.versions], dtype=np.int64)
+
+    @staticmethod
+    def _prepare(matrix):
+        return category_lookup(matrix), matrix.country_index, np.asarray(matrix.ranks)
+
+    def _matrix(self, version):
+        if version not in self._matrices:
+            self._matrices[version] = self._prepare(self.history.matrix_at(version))
+        return self._matrices[version]
+
+    def _version(self, timestamp):
+        """Version en vigueur à la date de la partie ; la plus ancienne si la partie la précède"""
+        if not timestamp:
+            return len(self._times) - 1
+        try:
+            moment = _parse_time(timestamp)
+        except ValueError:
+            return len(self._times) - 1
+        return max(bisect.bisect_right(self._times, moment) - 1, 0)
+
+    def verify(self, games):
+        """Vérifie un lot de parties exportées ; retourne un VerificationBatch"""
+        size = self.size
+        ids, users, timestamps, scores, won, structure = [], [], [], [], [], []
+        category_names, country_names, declared = [], [], []
+        pad = [None] * size
+        country_of, ranking_of = itemgetter("country"), itemgetter("ranking")
+
+        # Seul passage Python : noms et valeurs déclarées, contrôles de structure
+        for game in games:
+            used = game.get("categories_used") or []
+            selections = game.get("country_selections") or {}
+            if isinstance(selections, str):
+                selections = json.loads(selections)
+            try:
+                # Catégories répétées : contrôlées sur le lot entier, avec les pays répétés
+                if len(used) != size or len(selections) != size:
+                    raise KeyError
+                chosen = [selections[name] for name in used]
+                country_names += map(country_of, chosen)
+                declared += map(ranking_of, chosen)
+                structure.append(0)
+            except (KeyError, TypeError):
+                # Partie mal formée : complétée à GAME_SIZE cases, contrôlée sur ce qui est lisible
+                used = ([name if isinstance(name, str) else None for name in used]
+                        if isinstance(used, list) else []) + pad
+                used = used[:size]
+                if not isinstance(selections, dict):
+                    selections = {}
+                chosen = [selections.get(name) for name in used]
+                chosen = [selection if isinstance(selection, dict) else {} for selection in chosen]
+                country_names += [selection.get("country") for selection in chosen]
+                declared += [selection.get("ranking") for selection in chosen]
+                structure.append(FLAGS["categories"])
+            category_names += used
+            ids.append(game.get("id"))
+            users.append(game.get("user_id"))
+            timestamps.append(game.get("created_at") or game.get("completed_at") or "")
+            scores.append(game.get("score"))
+            won.append(game.get("won"))
+
+        count = len(ids)
+        versions = np.full(count, -1, dtype=np.int32)
+        if self.history is not None:
+            versions[:] = [self._version(timestamp) for timestamp in timestamps]
+
+        def resolve(version, rows):
+            categories_of, countries_of, _ = self._matrix(version)
+            if len(rows) == count:
+                group_categories, group_countries = category_names, country_names
+            else:
+                cells = (rows[:, None] * size + np.arange(size)).ravel().tolist()
+                group_categories = [category_names[cell] for cell in cells]
+                group_countries = [country_names[cell] for cell in cells]
+            return (_lookup(categories_of, group_categories).reshape(-1, size),
+                    _lookup(countries_of, group_countries).reshape(-1, size))
+
+        declared = np.fromiter((NULL_RANK if rank is None else rank if type(rank) is int else _INVALID
+                                for rank in declared), dtype=np.int64, count=count * size).reshape(count, size)
+        scores = np.fromiter((score if type(score) is int else -1 for score in scores), dtype=np.int64, count=count)
+        won = np.fromiter(map(bool, won), dtype=bool, count=count)
+        flags, expected = self._check(np.array(structure, dtype=np.uint8), versions, resolve, declared, scores, won)
+        return VerificationBatch(ids, users, timestamps, scores, expected, flags, versions)
+
+    def verify_records(self, records, codec):
+        """Vérifie des enregistrements binaires (rankings.codec), sans passage Python par partie"""
+        count = len(records)
+        versions = np.full(count, -1, dtype=np.int32)
+        if self.history is not None:
+            # Parties sans date : dernière version, comme pour les exports
+            created = records["created_at"]
+            versions[:] = np.maximum(np.searchsorted(self._micros, created, side="right") - 1, 0)
+            versions[created == NO_TIME] = len(self._micros) - 1
+        remaps = {}
+
+        def resolve(version, rows):
+            if version not in remaps:
+                remaps[version] = _remap(codec, *self._matrix(version)[:2])
+            categories, countries = remaps[version]
+            return categories[records["categories"][rows]], countries[records["countries"][rows]]
+
+        scores = records["score"].astype(np.int64)
+        flags, expected = self._check(np.zeros(count, dtype=np.uint8), versions, resolve,
+                                      records["rankings"].astype(np.int64), scores, (records["flags"] & WON) != 0)
+        return VerificationBatch(codec.ids(records), codec.ids(records, "user_id"), codec.timestamps(records),
+                                 scores, expected, flags, versions)
+
+    def _check(self, flags, versions, resolve, declared, scores, won):
+        """Contrôles vectorisés ; `resolve(version, lignes)` donne leurs catégories et pays dans cette version"""
+        count, size = declared.shape
+        categories = np.full((count, size), -1, dtype=np.intp)
+        countries = np.full((count, size), -1, dtype=np.intp)
+        truth = np.full((count, size), NULL_RANK, dtype=np.int64)
+
+        # Identifiants et rangs de référence, matrice par matrice (une seule sans historique)
+        for version in np.unique(versions).tolist():
+            rows = np.flatnonzero(versions == version)
+            group_categories, group_countries = resolve(version, rows)
+            categories[rows], countries[rows] = group_categories, group_countries
+            known = (group_categories >= 0) & (group_countries >= 0)
+            group_truth = np.full(known.shape, NULL_RANK, dtype=np.int64)
+            group_truth[known] = self._matrix(version)[2][group_countries[known], group_categories[known]]
+            truth[rows] = group_truth
+
+        ordered = np.sort(categories, axis=1)
+        flags[(categories < 0).any(axis=1) | (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)] |= FLAGS["categories"]
+        flags[(countries < 0).any(axis=1)] |= FLAGS["countries"]
+        placed = np.sort(countries, axis=1)
+        flags[((placed[:, 1:] == placed[:, :-1]) & (placed[:, 1:] >= 0)).any(axis=1)] |= FLAGS["repeated"]
+
+        checked = (flags & (FLAGS["categories"] | FLAGS["countries"])) == 0
+        expected = np.where(truth == NULL_RANK, NULL_COST, truth).sum(axis=1)
+        expected[~checked] = -1
+        flags[checked & (declared != truth).any(axis=1)] |= FLAGS["rankings"]
+        flags[checked & (scores != expected)] |= FLAGS["score"]
+        flags[checked & (won != (expected < self.threshold))] |= FLAGS["won"]
+        return flags, expected
+
+    def stream(self, games, batch_size=BATCH_SIZE):
+        """Vérifie un flux de parties, lot par lot"""
+        batch = []
+        for game in games:
+            batch.append(game)
+            if len(batch) == batch_size:
+                yield self.verify(batch)
+                batch = []
+        if batch:
+            yield self.verify(batch)
+
+
+class VerificationState:
+    """Totaux et positions de reprise des exports NDJSON déjà vérifiés"""
+
+    def __init__(self):
+        self.games = 0
+        self.flagged = 0
+        self.counts = dict.fromkeys(FLAGS, 0)
+        self.sources = {}
+
+    def add(self, batch):
+        self.games += len(batch)
+        self.flagged += len(batch.failed())
+        for name, count in batch.counts().items():
+            self.counts[name] += count
+
+    def save(self, path):
+        """Écrit le point de reprise (écriture atomique)"""
+        state = {"version": CHECKPOINT_VERSION, "games": self.games, "flagged": self.flagged,
+                 "counts": self.counts, "sources": self.sources}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Reprend un point de reprise, ou un état vide s'il n'existe pas"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} : version de point de reprise non supportée")
+        result = cls()
+        result.games, result.flagged, result.sources = state["games"], state["flagged"], state["sources"]
+        result.counts.update(state["counts"])
+        return result
+
+
+def verify_exports(verifier, paths, output, checkpoint=None, batch_size=BATCH_SIZE):
+    """Vérifie les exports `paths` et ajoute les parties en échec au CSV `output`
+
+    Avec un point de reprise, les exports NDJSON ne sont relus qu'à partir de
+    la position atteinte à l'exécution précédente ; les autres formats sont
+    revérifiés en entier. Les archives binaires (rankings.codec) sont
+    vérifiées bloc par bloc sans décoder les parties. Retourne (VerificationState, parties vérifiées).
+    """
+    state = VerificationState.load(checkpoint) if checkpoint else VerificationState()
+    before = state.games
+    new_file = not output.exists() or output.stat().st_size == 0
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        if new_file:
+            writer.writerow(["id", "user_id", "created_at", "score", "expected_score", "version", "reasons"])
+        for path in paths:
+            if path.suffix == ARCHIVE_SUFFIX:
+                codec, blocks = iter_archive(path)
+                batches = (verifier.verify_records(block, codec) for block in blocks)
+            else:
+                batches = verifier.stream(stream_export(path, state.sources), batch_size)
+            for batch in batches:
+                state.add(batch)
+                writer.writerows(batch.rows())
+    if checkpoint:
+        state.save(checkpoint)
+    return state, state.games - before
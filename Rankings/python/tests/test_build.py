@@ -0,0 +1,61 @@
+"""rankings.build : moteurs et fusions donnent les mêmes fichiers sur un jeu synthétique
+
+    cd Rankings/python && python -m unittest discover tests
+"""
+
+import copy
+import tempfile
+import unittest
+from pathlib import Path
+
+from rankings.bench import reference_csv
+from rankings.build import build, values_path
+from rankings.synthetic import generate
+
+CATEGORIES = 12
+ENTITIES = 300
+# Budget qui force plusieurs partitions de la fusion hors mémoire
+MEMORY_LIMIT = 4 << 10
+
+
+class BuildEquivalenceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.root = Path(cls.tmp.name)
+        cls.category_dir = cls.root / "Category"
+        cls.schemas, cls.resolver = generate(cls.category_dir, CATEGORIES, ENTITIES, seed=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def build(self, name, **options):
+        """Build frais dans son propre répertoire ; retourne Rankings.csv et le rapport"""
+        output = self.root / name / "Rankings.csv"
+        report = build(output_path=output, category_dir=self.category_dir, cache_dir=self.root / name / "cache",
+                       force=True, jobs=2, history_dir=None, bundle_dir=None, schemas=self.schemas,
+                       resolver=copy.deepcopy(self.resolver), **options)
+        self.assertEqual(report.failed, {})
+        return output, report
+
+    def test_engines_give_identical_outputs(self):
+        outputs = [self.build(engine, engine=engine)[0] for engine in ("compact", "numpy")]
+        compact, numpy = [[path.read_bytes() for path in (output, output.with_suffix(".bin"), values_path(output))]
+                          for output in outputs]
+        self.assertEqual(compact, numpy)
+        self.assertEqual(compact[0], reference_csv(self.schemas, self.category_dir, copy.deepcopy(self.resolver)))
+
+    def test_chunked_merge_matches_memory_merge(self):
+        memory, _ = self.build("memory")
+        chunked, report = self.build("chunked", merge="chunked", memory_limit=MEMORY_LIMIT)
+        self.assertGreater(report.partitions, 1)
+        for suffix in (".csv", ".bin"):
+            self.assertEqual(chunked.with_suffix(suffix).read_bytes(), memory.with_suffix(suffix).read_bytes())
+        # La fusion hors mémoire ne publie ni valeurs, ni historique, ni bundle
+        self.assertFalse(values_path(chunked).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
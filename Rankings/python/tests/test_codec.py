@@ -0,0 +1,96 @@
+"""rankings.codec : aller-retour parties -> enregistrements -> parties, et archives
+
+    cd Rankings/python && python -m unittest discover tests
+"""
+
+import tempfile
+import unittest
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from rankings.codec import ARCHIVE_SUFFIX, FOOTER, GameCodec, read_archive, write_archive
+from rankings.compact import NULL_RANK
+from rankings.matrix import RankMatrix
+
+CATEGORIES = ["Alcohol", "Army", "FIFA", "HDI", "EEZ", "Forest", "Obesity", "Olympics"]
+COUNTRIES = [f"C{i}" for i in range(10)]
+
+
+def codec():
+    ranks = np.arange(1, 81, dtype=np.int16).reshape(10, 8)
+    return GameCodec.for_build(RankMatrix(COUNTRIES, CATEGORIES, ranks))
+
+
+def game(index, columns=("alcohol", "army", "fifa", "hdi", "eez", "forest", "obesity", "olympics"),
+         countries=COUNTRIES[:8], completed_at="2025-03-01T12:05:00.250000+00:00"):
+    """Partie exportée ; la première catégorie n'a pas de classement (null)"""
+    selections = {column: {"country": country, "ranking": None if i == 0 else index * 10 + i}
+                  for i, (column, country) in enumerate(zip(columns, countries))}
+    return {"id": str(uuid.UUID(int=index + 1)), "user_id": str(uuid.UUID(int=1000 + index)),
+            "score": sum(selection["ranking"] or 0 for selection in selections.values()),
+            "categories_used": list(columns), "country_selections": selections,
+            "created_at": f"2025-03-0{index + 1}T12:00:00+00:00", "completed_at": completed_at,
+            "won": index % 2 == 0}
+
+
+class CodecTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        games = [game(0), game(1, completed_at=None)]
+        games[1]["created_at"] = None
+        source = codec()
+        records, rejected = source.encode(games)
+        self.assertEqual(rejected, [])
+        self.assertEqual(records.dtype.itemsize, 101)
+        # Colonnes de la base et pays déjà dans les tables : rien n'est interné
+        self.assertEqual((len(source.countries), len(source.categories)), (10, 8))
+        self.assertEqual(records["rankings"][:, 0].tolist(), [NULL_RANK, NULL_RANK])
+        self.assertEqual(codec().decode(records), games)
+
+    def test_names_not_in_the_tables_are_interned(self):
+        source = codec()
+        known = (len(source.countries), len(source.categories))
+        new = game(2, columns=("alcohol", "army", "fifa", "hdi", "eez", "forest", "obesity", "happiness"),
+                   countries=COUNTRIES[:7] + ["Atlantis"])
+        records, rejected = source.encode([new])
+        self.assertEqual(rejected, [])
+        self.assertEqual(source.countries[known[0]:], ["Atlantis"])
+        self.assertEqual(source.categories[known[1]:], ["happiness"])
+        self.assertEqual(source.decode(records), [new])
+
+    def test_rejected_games(self):
+        too_short = dict(game(3), categories_used=game(3)["categories_used"][:7])
+        text_ranking = game(4)
+        text_ranking["country_selections"]["army"]["ranking"] = "12"
+        not_uuid = dict(game(5), id="42")
+        records, rejected = codec().encode([too_short, game(6), text_ranking, not_uuid])
+        self.assertEqual(len(records), 1)
+        self.assertEqual([game_id for game_id, _ in rejected], [too_short["id"], text_ranking["id"], "42"])
+
+    def test_archive_footer_and_fields(self):
+        games = [game(i) for i in range(3)] + [game(3, countries=COUNTRIES[:7] + ["Atlantis"])]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / ("games" + ARCHIVE_SUFFIX)
+            written, rejected = write_archive(path, games, codec(), batch_size=3)
+            self.assertEqual((written, rejected), (4, []))
+            # Tables du pied : le nom interné pendant l'écriture y figure, sans matrice pour décoder
+            decoded, records = read_archive(path)
+            self.assertEqual(decoded.countries[-1], "Atlantis")
+            self.assertEqual(decoded.decode(records), games)
+            _, scores = read_archive(path, fields=("score", "user_id"))
+            self.assertEqual(scores.dtype.names, ("user_id", "score"))
+            self.assertEqual(scores["score"].tolist(), [game["score"] for game in games])
+
+            data = path.read_bytes()
+            path.write_bytes(data[:-FOOTER.size])
+            with self.assertRaises(ValueError):
+                read_archive(path)
+            path.write_bytes(b"XXXX" + data[4:])
+            with self.assertRaises(ValueError):
+                read_archive(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
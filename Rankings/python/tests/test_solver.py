@@ -0,0 +1,104 @@
+"""rankings.solver contre une recherche exhaustive sur de petites matrices
+
+    cd Rankings/python && python -m unittest discover tests
+"""
+
+import itertools
+import unittest
+
+import numpy as np
+
+from rankings.compact import NULL_COST, NULL_RANK
+from rankings.games import GameArrays
+from rankings.matrix import RankMatrix
+from rankings.solver import backfill, best_score, cost_tensor, remainders, solve
+
+SIZE = 8
+
+
+def random_matrix(seed, countries=SIZE, categories=SIZE, null_share=0.2):
+    """Matrice de rangs aléatoire avec des cases NULL"""
+    rng = np.random.default_rng(seed)
+    ranks = rng.integers(1, 200, size=(countries, categories)).astype(np.int16)
+    ranks[rng.random(ranks.shape) < null_share] = NULL_RANK
+    return RankMatrix([f"C{i}" for i in range(countries)], [f"K{j}" for j in range(categories)], ranks)
+
+
+def brute_force(cost, skip=None):
+    """Meilleur score d'un tenseur (n, k) en essayant toutes les affectations
+
+    Avec `skip`, la catégorie `skip` reste libre (n = k - 1 pays placés).
+    """
+    columns = [j for j in range(cost.shape[1]) if j != skip]
+    return min(sum(int(cost[i, j]) for i, j in zip(rows, columns))
+               for rows in itertools.permutations(range(cost.shape[0]), len(columns)))
+
+
+class SolverTest(unittest.TestCase):
+
+    def test_cost_tensor_scores_null_cells_at_null_cost(self):
+        matrix = random_matrix(1)
+        cost = cost_tensor(matrix, [list(range(SIZE))], [list(range(SIZE))])[0]
+        ranks = np.asarray(matrix.ranks)
+        self.assertTrue((cost[ranks == NULL_RANK] == NULL_COST).all())
+        self.assertTrue((cost[ranks != NULL_RANK] == ranks[ranks != NULL_RANK]).all())
+        cost = cost_tensor(matrix, [list(range(SIZE))], [list(range(SIZE))], null_cost=500)[0]
+        self.assertTrue((cost[ranks == NULL_RANK] == 500).all())
+
+    def test_best_score_matches_brute_force(self):
+        for seed in range(3):
+            matrix = random_matrix(seed)
+            self.assertTrue((np.asarray(matrix.ranks) == NULL_RANK).any())
+            cost = cost_tensor(matrix, [list(range(SIZE))], [list(range(SIZE))])[0]
+            score, placement = best_score(matrix, matrix.categories, matrix.countries)
+            self.assertEqual(score, brute_force(cost))
+            # L'affectation rendue place chaque pays une fois et atteint le score
+            self.assertEqual(sorted(placement.values()), matrix.countries)
+            self.assertEqual(sum(int(cost[matrix.country_index[country], matrix.category_index[category]])
+                                 for category, country in placement.items()), score)
+
+    def test_null_cost_changes_the_optimum(self):
+        matrix = random_matrix(4, null_share=0.4)
+        cost = cost_tensor(matrix, [list(range(SIZE))], [list(range(SIZE))], null_cost=1000)[0]
+        score, _ = best_score(matrix, matrix.categories, matrix.countries, null_cost=1000)
+        self.assertEqual(score, brute_force(cost))
+        self.assertGreater(score, best_score(matrix, matrix.categories, matrix.countries)[0])
+
+    def test_batch_with_more_countries_than_categories(self):
+        rng = np.random.default_rng(5)
+        cost = rng.integers(0, 50, size=(20, 6, 4))
+        for chunk_size in (1, 7, 1000):
+            scores, assignment = solve(cost, chunk_size=chunk_size)
+            self.assertEqual(scores.tolist(), [brute_force(game) for game in cost])
+            for game, rows, score in zip(cost, assignment, scores):
+                self.assertEqual(len(set(rows.tolist())), 4)
+                self.assertEqual(sum(int(game[i, j]) for j, i in enumerate(rows)), score)
+
+    def test_too_few_countries(self):
+        with self.assertRaises(ValueError):
+            solve(np.zeros((1, 3, 4)))
+
+    def test_remainders_match_brute_force(self):
+        rng = np.random.default_rng(6)
+        cost = rng.integers(0, 50, size=(5, SIZE - 1, SIZE))
+        expected = [[brute_force(game, skip=j) for j in range(SIZE)] for game in cost]
+        self.assertEqual(remainders(cost).tolist(), expected)
+        with self.assertRaises(ValueError):
+            remainders(cost[:, :-1])
+
+    def test_backfill_regret(self):
+        matrix = random_matrix(7)
+        rng = np.random.default_rng(7)
+        categories = np.array([rng.permutation(SIZE) for _ in range(4)])
+        countries = np.array([rng.permutation(SIZE) for _ in range(4)])
+        cost = cost_tensor(matrix, categories, countries)
+        played = cost[:, np.arange(SIZE), np.arange(SIZE)].sum(axis=1)
+        games = GameArrays(np.arange(4), categories, countries, played, played < 200, [])
+        optimal, regret = backfill(matrix, games)
+        self.assertEqual(optimal.tolist(), [brute_force(game) for game in cost])
+        self.assertEqual(regret.tolist(), (played - optimal).tolist())
+        self.assertTrue((regret >= 0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""rankings.upload contre le serveur PostgREST de substitution (rankings.standin)
+
+    cd Rankings/python && python -m unittest discover tests
+"""
+
+import asyncio
+import unittest
+
+import numpy as np
+
+from rankings.matrix import NULL_RANK, RankMatrix
+from rankings.standin import StandIn, parse_in
+from rankings.upload import UploadError, _run_batches, snapshot_rows, upload
+
+CATEGORIES = ["FIFA", "HDI"]
+COUNTRIES = ["Chad", "France", "Japan", "Peru", "Togo"]
+RANKS = [[90, 180], [2, 25], [18, NULL_RANK], [23, 80], [120, 160]]
+
+
+def matrix():
+    return RankMatrix(COUNTRIES, CATEGORIES, np.array(RANKS, dtype=np.int16))
+
+
+def table(**changes):
+    """Lignes déjà en base : la matrice, avec des lignes modifiées (None pour supprimer)"""
+    rows = snapshot_rows(matrix())
+    for country, row in changes.items():
+        if row is None:
+            del rows[country]
+        else:
+            rows[country] = row
+    return rows.values()
+
+
+class UploadTest(unittest.IsolatedAsyncioTestCase):
+
+    async def _upload(self, standin, **options):
+        async with standin.running() as url:
+            return await upload(matrix(), url, **options)
+
+    async def test_diff_upserts_only_changed_rows(self):
+        # Chad modifié (rang en texte "NULL" des anciens chargements), Japan absent, Atlantis en trop
+        standin = StandIn(table(Chad={"country": "Chad", "fifa": 91, "hdi": "180"}, Japan=None,
+                                Atlantis={"country": "Atlantis", "fifa": 1, "hdi": 1}))
+        report = await self._upload(standin, batch_size=1, concurrency=2)
+        self.assertEqual((report.existing, report.upserted, report.unchanged, report.deleted), (5, 2, 3, 0))
+        self.assertEqual(sorted(size for method, size in standin.log if method == "POST"), [1, 1])
+        expected = snapshot_rows(matrix())
+        self.assertEqual({country: standin.rows[country] for country in expected}, expected)
+        self.assertIn("Atlantis", standin.rows)
+
+        # Table à jour : rien n'est renvoyé
+        standin.log.clear()
+        report = await self._upload(standin)
+        self.assertEqual((report.upserted, report.unchanged), (0, len(COUNTRIES)))
+        self.assertEqual([method for method, _ in standin.log], ["GET"])
+
+    async def test_dry_run_sends_nothing(self):
+        standin = StandIn(table(Peru=None))
+        report = await self._upload(standin, dry_run=True, prune=True)
+        self.assertEqual((report.upserted, report.deleted), (1, 0))
+        self.assertNotIn("Peru", standin.rows)
+        self.assertEqual([method for method, _ in standin.log], ["GET"])
+
+    async def test_transient_errors_are_retried(self):
+        standin = StandIn(table(Togo=None, France=None))
+        standin.failures = {"GET": [503], "POST": [503, 429]}
+        report = await self._upload(standin, batch_size=1)
+        self.assertEqual(report.retries, 3)
+        self.assertEqual(report.upserted, 2)
+        self.assertEqual(standin.rows["Togo"], snapshot_rows(matrix())["Togo"])
+
+    async def test_prune_deletes_quoted_names(self):
+        extra = ['Bosnia, "Herzegovina"', "Côte d'Ivoire", "Atlantis", "Back\\slash\\"]
+        standin = StandIn([*table(), *({"country": name, "fifa": 1, "hdi": 1} for name in extra)])
+        report = await self._upload(standin, batch_size=2)
+        self.assertEqual(report.deleted, 0)
+        self.assertEqual(len(standin.rows), len(COUNTRIES) + len(extra))
+
+        report = await self._upload(standin, prune=True, batch_size=2)
+        self.assertEqual(report.deleted, len(extra))
+        self.assertEqual(sorted(standin.rows), COUNTRIES)
+
+    async def test_permanent_error_stops_the_upload(self):
+        standin = StandIn([])
+        standin.failures = {"POST": [400]}
+        with self.assertRaises(UploadError):
+            await self._upload(standin, batch_size=1, concurrency=3)
+        self.assertLess(len(standin.rows), len(COUNTRIES))
+
+    async def test_failed_batch_cancels_and_awaits_the_others(self):
+        started = []
+
+        async def worker(batch):
+            started.append(asyncio.current_task())
+            if batch == 0:
+                raise UploadError("lot 0")
+            await asyncio.sleep(60)
+
+        with self.assertRaises(UploadError):
+            await _run_batches(range(10), worker, 3)
+        self.assertEqual(len(started), 3)
+        self.assertTrue(all(task.done() for task in started))
+
+
+class ParseInTest(unittest.TestCase):
+
+    def test_quoted_and_bare_values(self):
+        self.assertEqual(parse_in('in.("Bosnia, \\"Herzegovina\\"",Chad, "Côte d\'Ivoire")'),
+                         ['Bosnia, "Herzegovina"', "Chad", "Côte d'Ivoire"])
+
+
+if __name__ == "__main__":
+    unittest.main()
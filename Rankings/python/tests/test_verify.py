@@ -0,0 +1,129 @@
+"""rankings.verify : un contrôle par drapeau, cases NULL et historique
+
+    cd Rankings/python && python -m unittest discover tests
+"""
+
+import json
+import tempfile
+import unittest
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from rankings.codec import GameCodec
+from rankings.compact import NULL_RANK
+from rankings.history import RankingHistory
+from rankings.matrix import RankMatrix
+from rankings.verify import FLAGS, Verifier
+
+CATEGORIES = [f"K{j}" for j in range(8)]
+COUNTRIES = [f"C{i}" for i in range(10)]
+
+
+def matrix(changes=()):
+    """Matrice 10 x 8, C0 sans classement en K0 ; `changes` : (pays, catégorie, rang)"""
+    ranks = (np.arange(80, dtype=np.int16).reshape(10, 8) % 37) + 1
+    ranks[0, 0] = NULL_RANK
+    for i, j, rank in changes:
+        ranks[i, j] = rank
+    return RankMatrix(COUNTRIES, CATEGORIES, ranks)
+
+
+def game(source=None, countries=COUNTRIES[:8], categories=CATEGORIES, created_at="2025-03-01T12:00:00+00:00",
+         **overrides):
+    """Partie exportée jouée honnêtement sur `source` (rangs déclarés, score et won cohérents)"""
+    source = source or matrix()
+    selections = {}
+    for category, country in zip(categories, countries):
+        known = country in source.country_index and category in source.category_index
+        rank = int(source.ranks[source.country_index[country], source.category_index[category]]) if known else 1
+        selections[category] = {"country": country, "ranking": None if rank == NULL_RANK else rank}
+    score = sum(selection["ranking"] or 0 for selection in selections.values())
+    result = {"id": str(uuid.uuid4()), "user_id": str(uuid.uuid4()), "created_at": created_at,
+              "categories_used": list(categories), "country_selections": selections,
+              "score": score, "won": score < 200}
+    result.update(overrides)
+    return result
+
+
+def flags(verifier, *games):
+    batch = verifier.verify(list(games))
+    return [{name for name, bit in FLAGS.items() if flag & bit} for flag in batch.flags.tolist()]
+
+
+class VerifierTest(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = Verifier(matrix())
+
+    def test_honest_game_with_null_cell_submitted_as_null(self):
+        honest = game()
+        self.assertIsNone(honest["country_selections"]["K0"]["ranking"])
+        as_text = dict(honest, country_selections=json.dumps(honest["country_selections"]))
+        self.assertEqual(flags(self.verifier, honest, as_text), [set(), set()])
+        self.assertEqual(self.verifier.verify([honest]).expected.tolist(), [honest["score"]])
+
+    def test_null_cell_submitted_as_zero(self):
+        # Même score (une case NULL compte 0), mais le classement déclaré n'est pas celui de la matrice
+        zero = game()
+        zero["country_selections"]["K0"]["ranking"] = 0
+        self.assertEqual(flags(self.verifier, zero), [{"rankings"}])
+
+    def test_categories(self):
+        repeated = game(categories=CATEGORIES[:7] + ["K0"])
+        unknown = game(categories=CATEGORIES[:7] + ["Atlantis"])
+        short = game(categories=CATEGORIES[:7], countries=COUNTRIES[:7])
+        for bad in (repeated, unknown, short):
+            self.assertIn("categories", flags(self.verifier, bad)[0])
+        # Ni classement ni score recalculés sans catégories reconnues
+        self.assertEqual(flags(self.verifier, unknown), [{"categories"}])
+        self.assertEqual(self.verifier.verify([unknown]).expected.tolist(), [-1])
+
+    def test_countries(self):
+        self.assertEqual(flags(self.verifier, game(countries=COUNTRIES[:7] + ["Atlantis"])), [{"countries"}])
+
+    def test_repeated(self):
+        self.assertEqual(flags(self.verifier, game(countries=COUNTRIES[:7] + ["C0"])), [{"repeated"}])
+
+    def test_rankings(self):
+        lied = game()
+        lied["country_selections"]["K3"]["ranking"] = 1
+        self.assertEqual(flags(self.verifier, lied), [{"rankings"}])
+
+    def test_score(self):
+        honest = game()
+        self.assertEqual(flags(self.verifier, dict(honest, score=honest["score"] - 1)), [{"score"}])
+
+    def test_won(self):
+        honest = game()
+        self.assertEqual(flags(self.verifier, dict(honest, won=not honest["won"])), [{"won"}])
+
+    def test_records_give_the_same_flags(self):
+        zero = game()
+        zero["country_selections"]["K0"]["ranking"] = 0
+        games = [game(), zero, game(countries=COUNTRIES[:7] + ["C0"])]
+        codec = GameCodec.for_build(matrix())
+        records, rejected = codec.encode(games)
+        self.assertEqual(rejected, [])
+        self.assertEqual(self.verifier.verify_records(records, codec).flags.tolist(),
+                         self.verifier.verify(games).flags.tolist())
+
+    def test_history_checks_the_version_in_force(self):
+        before, after = matrix(), matrix([(3, 3, 99)])
+        with tempfile.TemporaryDirectory() as tmp:
+            history = RankingHistory(Path(tmp))
+            history.append(before, timestamp="2025-01-01T00:00:00+00:00")
+            history.append(after, timestamp="2025-06-01T00:00:00+00:00")
+            verifier = Verifier(after, history)
+            old = game(before, created_at="2025-03-01T12:00:00+00:00")
+            new = game(after, created_at="2025-07-01T12:00:00+00:00")
+            stale = game(before, created_at="2025-07-01T12:00:00+00:00")
+            batch = verifier.verify([old, new, stale])
+        self.assertEqual(batch.versions.tolist(), [0, 1, 1])
+        self.assertEqual(batch.flags.tolist()[:2], [0, 0])
+        self.assertTrue(batch.flags[2] & FLAGS["rankings"])
+
+
+if __name__ == "__main__":
+    unittest.main()
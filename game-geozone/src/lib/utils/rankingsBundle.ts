@@ -0,0 +1,42 @@
+// Bundle statique des classements produit par `python -m rankings build`
+// (static/rankings/manifest.json -> static/rankings/rankings.<hash>.json)
+
+export interface RankingsBundle {
+	format: number;
+	fingerprint: string;
+	countries: string[];
+	index: { [country: string]: number };
+	categories: string[];
+	ranks: { [category: string]: (number | null)[] };
+	best: { [category: string]: number[] };
+	min: { [category: string]: number | null };
+	// Plus petit coût d'une case (une case sans classement compte 0, comme dans calculateScore)
+	min_cost: { [category: string]: number | null };
+}
+
+/**
+ * Charge le bundle courant (le fichier haché est cacheable indéfiniment)
+ */
+export async function loadRankingsBundle(fetchFn: typeof fetch = fetch): Promise<RankingsBundle> {
+	const manifest = await (await fetchFn('/rankings/manifest.json', { cache: 'no-cache' })).json();
+	return (await fetchFn(`/rankings/${manifest.bundle}`)).json();
+}
+
+/**
+ * Rang d'un pays dans une catégorie, en O(1) (null si pas de classement)
+ */
+export function getRank(bundle: RankingsBundle, country: string, category: string): number | null {
+	const row = bundle.index[country];
+	return row === undefined ? null : (bundle.ranks[category]?.[row] ?? null);
+}
+
+/**
+ * Meilleur score théorique : somme des plus petits coûts des catégories
+ * (même règle que le solveur Python, une case sans classement compte 0)
+ */
+export function theoreticalBestFromBundle(
+	bundle: RankingsBundle,
+	selectedCategories: string[]
+): number {
+	return selectedCategories.reduce((sum, category) => sum + (bundle.min_cost[category] ?? 0), 0);
+}